@@ -0,0 +1,82 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The email dashboard and the survey converter import their sibling modules
+# by bare name, as when they are run from their own directories
+root = os.path.dirname(os.path.abspath(__file__))
+for directory in ('email_marketing_dashboard', 'src'):
+    sys.path.insert(0, os.path.join(root, directory))
+
+
+def _prepared_lines(rows=6_000, seed=0):
+    """Retail lines shaped like prepare_retail_data() output"""
+    rng = np.random.default_rng(seed)
+    slip = np.sort(rng.integers(0, rows // 3, rows))
+    site = slip % 4 + 1
+    sale_date = pd.Timestamp('2024-12-01') + pd.to_timedelta(slip % 10, unit='D')
+    is_return = rng.random(rows) < 0.05
+    df = pd.DataFrame({
+        'SALE_DATE': sale_date,
+        'SALE_DATE_TIME': sale_date + pd.to_timedelta(9 + slip % 8, unit='h'),
+        'STORE_FORMAT': pd.Categorical(np.where(site % 2, 'MAIN STORE', 'MARINE MART')),
+        'COMMAND_NAME': pd.Categorical(np.where(site <= 2, 'YUMA', 'LEJEUNE')),
+        'SITE_ID': site,
+        'SITE_NAME': pd.Categorical([f'STORE {value}' for value in site]),
+        'SLIP_NO': slip,
+        'ITEM_ID': rng.integers(1, 300, rows),
+        'EXTENSION_AMOUNT': np.round(rng.uniform(1, 60, rows) * np.where(is_return, -1, 1), 2),
+        'QTY': rng.integers(1, 4, rows).astype(float),
+        'RETURN_IND': pd.Categorical(np.where(is_return, 'Y', 'N')),
+        'PRICE_STATUS': pd.Categorical(rng.choice(['R', 'P'], rows)),
+    })
+    df['MONTH'] = df['SALE_DATE'].dt.month
+    df['DAY_OF_WEEK'] = df['SALE_DATE'].dt.dayofweek
+    df['HOUR'] = df['SALE_DATE_TIME'].dt.hour
+    df['IS_RETURN'] = is_return
+    return df
+
+
+def _extract(days, seed):
+    """A small retail extract in the CSV layout, one receipt of a few lines per store and hour"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    slip = seed * 1_000_000
+    for day in days:
+        for site, command, store_format in [(101, 'YUMA', 'MARINE MART'), (202, 'LEJEUNE', 'MAIN STORE')]:
+            for hour in range(9, 12):
+                slip += 1
+                for line in range(1, rng.integers(2, 5)):
+                    is_return = rng.random() < 0.1
+                    rows.append({
+                        'SALE_DATE': day.strftime('%Y-%m-%d'),
+                        'SALE_DATE_TIME': f"{day:%Y-%m-%d} {hour:02d}:{line:02d}:00",
+                        'STORE_FORMAT': store_format,
+                        'COMMAND_NAME': command,
+                        'SITE_ID': site,
+                        'SITE_NAME': f'STORE {site}',
+                        'SLIP_NO': slip,
+                        'LINE': line,
+                        'ITEM_ID': int(rng.integers(1, 40)),
+                        'ITEM_DESC': 'ITEM',
+                        'EXTENSION_AMOUNT': round(float(rng.uniform(1, 50)) * (-1 if is_return else 1), 2),
+                        'QTY': float(rng.integers(1, 4)),
+                        'RETURN_IND': 'Y' if is_return else 'N',
+                        'PRICE_STATUS': 'R',
+                    })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def prepared_lines():
+    """Seeded retail lines shaped like prepare_retail_data() output"""
+    return _prepared_lines()
+
+
+@pytest.fixture
+def retail_extract():
+    """Factory for small seeded retail extracts in the CSV layout: retail_extract(days, seed)"""
+    return _extract
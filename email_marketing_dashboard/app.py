@@ -22,11 +22,15 @@ from visualizations import (
 )
 from llm_insights import generate_insights
 from prompts import email_key_performance_response, email_performance_over_time_response, social_media_key_performance_response, email_domain_day_of_week_response, email_final_result_response, social_media_posts_over_time_response, social_media_hourly_engagements_response, social_media_final_result_response
-from raw_data_loader import (load_raw_data, get_engagement_summary,get_post_engagement_scorecard_ac, get_media_type,
+from raw_data_loader import (base_path, SocialMediaData, get_engagement_summary,get_post_engagement_scorecard_ac, get_media_type,
                              get_post_performance_summary, get_total_engagement_metrics_on, get_social_engagement_by_time_of)
 
+from workbook_cache import load_cached_workbook, workbook_digest
+
 from PDF_generator_util import generate_pdf, show_pdf
 
+SOCIAL_MEDIA_WORKBOOK = "Social_Media_Perfomance_Jan25.xlsx"
+
 # Page configuration
 st.set_page_config(
     page_title="MCCS Email Marketing Analytics",
@@ -58,21 +62,33 @@ def get_llm_client(env_api_key, sidebar_api_key):
 
 
 # Load data
-@st.cache_data
+# The catalog is shared by all sessions and reads each table on first
+# access, so a page only pays for the tables it renders. Every access returns
+# the caller's own copy of the table, as st.cache_data did
+@st.cache_resource
 def get_data():
     return load_data()
 
-@st.cache_data
+# Parsed once per workbook version on disk and shared by every worker. The
+# loaded workbook and its derived views are kept per version for all sessions,
+# so reruns reuse the merged and renamed frames
+@st.cache_resource(max_entries=1)
+def _social_media_data(version):
+    return SocialMediaData(load_cached_workbook(SOCIAL_MEDIA_WORKBOOK), version=version)
+
 def get_raw_data():
-    return load_raw_data()
+    return _social_media_data(workbook_digest(os.path.join(base_path, SOCIAL_MEDIA_WORKBOOK)))
+
+def get_social_media_data():
+    """Social media workbook, read only by the pages that use it"""
+    try:
+        return get_raw_data()
+    except Exception as e:
+        st.error(f"Error loading social media data: {e}")
+        st.stop()
 
 
-try:
-    data = get_data()
-    sm_data = get_raw_data()
-except Exception as e:
-    st.error(f"Error loading data: {e}")
-    st.stop()
+data = get_data()
 
 # 初始化 session_state 的字段
 if 'email_key_performance_response' not in st.session_state:
@@ -519,6 +535,7 @@ elif page == "Audience Analysis":
 
 # Dashboard page
 elif page == "Social Media Dashboard":
+    sm_data = get_social_media_data()
     st.title("📧 Social Media Marketing Dashboard")
 
     # Overview metrics
@@ -751,6 +768,7 @@ elif page == "LLM Insights":
 elif page == "AI Data Analysis Agent":
     st.title("📊 Report Generator")
     if st.button("Start Generate"):
+        sm_data = get_social_media_data()
         progress = st.progress(0)
         status_text = st.empty()
 
@@ -930,6 +948,7 @@ def generate_email_report():
     return email_final_report
 
 def generate_social_media_report():
+    sm_data = get_social_media_data()
     # Step 1: 数据预处理
     engagement_summary_data = get_engagement_summary(sm_data)
     post_performance_summary = get_post_performance_summary(sm_data)
@@ -984,6 +1003,11 @@ def generate_social_media_report():
     return social_media_final_report
 
 
+# Tables read so far this server session and how long each took
+with st.sidebar.expander("Data load times"):
+    st.dataframe(pd.Series(data.load_times, name='Seconds').rename_axis('Table').reset_index(),
+                 hide_index=True)
+
 # Footer
 st.sidebar.markdown("---")
 st.sidebar.info("MCCS Email Marketing Analytics Dashboard v1.0")
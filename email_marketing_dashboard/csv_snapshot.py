@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Get the directory where the current script is located
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Go up one level to the project root
+project_root = os.path.dirname(current_dir)
+
+# The converted sheets live one directory per workbook; files directly under
+# convertedcsv (the retail extract) have their own Parquet dataset and are
+# not part of the snapshot
+source_dir = os.path.join(project_root, "data", "convertedcsv")
+snapshot_dir = os.path.join(project_root, "data", "snapshot")
+manifest_path = os.path.join(snapshot_dir, "snapshot_manifest.json")
+
+# Column typing shared by the snapshot and the CSV fallback, so a table has
+# the same dtypes whichever way it was loaded
+DATE_COLUMNS = {'Daily', 'Date', 'Send Date'}
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+WEEKDAY_COLUMNS = {'Weekday', 'Day Of Week'}
+CATEGORY_COLUMNS = {'Email Domain', 'Audience Type', 'Social Network', 'Media Type'}
+
+
+def source_tables():
+    """Relative paths of every converted sheet, e.g. 'Advertising_Email_Deliveries/...-Sends.csv'"""
+    tables = []
+    for workbook in sorted(os.listdir(source_dir)):
+        workbook_dir = os.path.join(source_dir, workbook)
+        if os.path.isdir(workbook_dir):
+            tables += [f'{workbook}/{name}' for name in sorted(os.listdir(workbook_dir)) if name.endswith('.csv')]
+    return tables
+
+
+def _snapshot_file(table):
+    return os.path.join(snapshot_dir, os.path.splitext(table)[0] + '.feather')
+
+
+def _source_stat(table):
+    stat = os.stat(os.path.join(source_dir, table))
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def apply_schema(df):
+    """Give a freshly parsed sheet its explicit column types
+
+    Date columns become datetimes, weekdays an ordered Monday-Sunday
+    categorical and other low-cardinality labels categoricals. Complete
+    count columns are already int64 and rates float64 from parsing; the
+    snapshot stores them with those types, so loading it infers nothing.
+    """
+    for column in df.columns:
+        name = column.strip()
+        values = df[column]
+        if name in DATE_COLUMNS and not pd.api.types.is_datetime64_any_dtype(values.dtype):
+            df[column] = pd.to_datetime(values, format='ISO8601')
+        elif name in WEEKDAY_COLUMNS:
+            df[column] = pd.Categorical(values, categories=WEEKDAYS, ordered=True)
+        elif name in CATEGORY_COLUMNS:
+            df[column] = values.astype('category')
+    return df
+
+
+def read_source(table):
+    """Parse one converted sheet from its CSV"""
+    return apply_schema(pd.read_csv(os.path.join(source_dir, table)))
+
+
+def load_manifest():
+    """Source size and modification time of every table in the snapshot, or {} without one"""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def is_fresh(table, manifest):
+    """Whether the snapshot of a table was built from the CSV as it is now"""
+    entry = manifest.get(table)
+    return (entry is not None and os.path.exists(_snapshot_file(table))
+            and entry['source'] == _source_stat(table))
+
+
+def read_table(table, manifest=None):
+    """Load one sheet, memory-mapping its snapshot when fresh and falling back to the CSV otherwise
+
+    Args:
+        table (str): Path of the sheet relative to data/convertedcsv
+        manifest (dict, optional): Snapshot manifest, read from disk if not given
+
+    Returns:
+        pd.DataFrame: The sheet with the types from apply_schema()
+    """
+    manifest = load_manifest() if manifest is None else manifest
+    if is_fresh(table, manifest):
+        return feather.read_table(_snapshot_file(table), memory_map=True).to_pandas()
+    return read_source(table)
+
+
+def build_snapshot(tables=None):
+    """Convert the CSV sheets to typed, uncompressed Feather files and record their sources
+
+    Uncompressed Arrow IPC files can be memory-mapped on load instead of
+    parsed. Only tables whose CSV changed since the last build are rewritten.
+
+    Args:
+        tables (list, optional): Sheets to convert. Defaults to every sheet under data/convertedcsv.
+
+    Returns:
+        list: The tables that were (re)written
+    """
+    manifest = load_manifest()
+    written = []
+    for table in tables or source_tables():
+        if is_fresh(table, manifest):
+            continue
+        source = _source_stat(table)
+        df = read_source(table)
+        path = _snapshot_file(table)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed')
+        manifest[table] = {'source': source, 'schema': {column: str(dtype) for column, dtype in df.dtypes.items()}}
+        written.append(table)
+
+    # Drop sheets whose CSV no longer exists
+    for table in [table for table in manifest if not os.path.exists(os.path.join(source_dir, table))]:
+        del manifest[table]
+        if os.path.exists(_snapshot_file(table)):
+            os.remove(_snapshot_file(table))
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return written
+
+
+def stale_tables():
+    """Sheets whose snapshot is missing or older than their CSV"""
+    manifest = load_manifest()
+    return [table for table in source_tables() if not is_fresh(table, manifest)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the typed Feather snapshot of the converted CSV sheets')
+    parser.add_argument('--check', action='store_true', help='Only list the sheets whose snapshot is stale')
+
+    args = parser.parse_args()
+
+    if args.check:
+        stale = stale_tables()
+        print(f"{len(stale)} stale sheets" + (':' if stale else ''))
+        for table in stale:
+            print(f"  {table}")
+    else:
+        written = build_snapshot()
+        print(f"Snapshot in {snapshot_dir}: {len(written)} sheets written, "
+              f"{len(source_tables()) - len(written)} already up to date")
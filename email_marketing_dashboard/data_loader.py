@@ -1,121 +1,162 @@
 import pandas as pd
 import os
+import threading
+import time
+from collections.abc import Mapping
 
-def load_data():
-    """Load all relevant CSV files and return as structured dictionary"""
+from csv_snapshot import read_table
 
-    
+DELIVERIES = 'Advertising_Email_Deliveries'
+ENGAGEMENT = 'Advertising_Email_Engagement'
 
-    # Get the directory where the current script is located
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    # Go up one level to the project root
-    project_root = os.path.dirname(current_dir)
-    # Construct the path to data directory
-    base_path = os.path.join(project_root, "data", "convertedcsv")
+def _sheet(workbook, sheet):
+    """Read one converted sheet, from the typed snapshot when it is up to date (see csv_snapshot.py)"""
+    return read_table(f'{workbook}/{workbook}.xlsx-{sheet}.csv')
 
-    
-    data = {
-        'summary': {},
-        'time_series': {},
-        'breakdowns': {}
-    }
-    
-    # Load summary metrics
-    data['summary']['deliveries'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-Deliveries.csv'))
-    data['summary']['sends'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-Sends.csv'))
-    data['summary']['bounce_rate'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-Bounce_Rate.csv'))
-    data['summary']['open_rate'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Open_Rate.csv'))
-    data['summary']['unique_opens'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Unique_Opens.csv'))
-    data['summary']['unique_clicks'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Unique_Clicks.csv'))
-    data['summary']['click_to_open_rate'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Click_to_Open_Rate.csv'))
-    data['summary']['unique_unsubscribes'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Unique_Unsubscribes.csv'))
-    data['summary']['unsubscribe_rate'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Unsubscribe_Rate.csv'))
-    
-    # Load time series data - with more detailed debugging
-    csv_path = os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-Email_Deliveries_Delivery_Timel.csv')
-    print(f"Loading CSV from: {csv_path}")
-    print(f"File exists: {os.path.exists(csv_path)}")
-    
-    try:
-        # Try reading the first few lines of the file to see the format
-        with open(csv_path, 'r') as f:
-            print("CSV file first 5 lines:")
-            for i, line in enumerate(f):
-                if i < 5:
-                    print(line.strip())
-                else:
-                    break
-                    
-        delivery_time = pd.read_csv(csv_path)
-        print("Original columns:", delivery_time.columns.tolist())
-        
-        # Display first few rows to debug
-        print("First 2 rows of data:")
-        print(delivery_time.head(2))
-        
-        delivery_time['Daily'] = pd.to_datetime(delivery_time['Daily'])
-        
-        # Strip whitespace from all column names
-        delivery_time.columns = delivery_time.columns.str.strip()
-        print("After stripping whitespace:", delivery_time.columns.tolist())
-        
-        # Create Bounce Rate column if it doesn't exist
-        bounce_rate_col = None
-        for col in delivery_time.columns:
-            if 'bounce' in col.lower() and 'rate' in col.lower():
-                bounce_rate_col = col
-                break
-                
-        if bounce_rate_col and bounce_rate_col != 'Bounce Rate':
-            print(f"Found column '{bounce_rate_col}', renaming to 'Bounce Rate'")
-            delivery_time = delivery_time.rename(columns={bounce_rate_col: 'Bounce Rate'})
-        elif not any('bounce' in col.lower() and 'rate' in col.lower() for col in delivery_time.columns):
-            print("No Bounce Rate column found, creating one from Bounces and Sends")
-            if 'Bounces' in delivery_time.columns and 'Sends' in delivery_time.columns:
-                delivery_time['Bounce Rate'] = delivery_time['Bounces'] / delivery_time['Sends']
-            
-        print("Final columns:", delivery_time.columns.tolist())
-        data['time_series']['delivery'] = delivery_time
-        
-    except Exception as e:
-        print(f"Error loading delivery time data: {e}")
-        # Create an empty DataFrame with the required columns as a fallback
-        data['time_series']['delivery'] = pd.DataFrame(columns=['Daily', 'Sends', 'Deliveries', 'Delivery Rate', 'Bounces', 'Bounce Rate'])
-    
-    # Load engagement time data
-    try:
-        engagement_time = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Email_Engagement_Engagement_Tim.csv'))
-        engagement_time['Daily'] = pd.to_datetime(engagement_time['Daily'])
-        # Make sure all column names are stripped
-        engagement_time.columns = engagement_time.columns.str.strip()
-        data['time_series']['engagement'] = engagement_time
-    except Exception as e:
-        print(f"Error loading engagement time data: {e}")
-        data['time_series']['engagement'] = pd.DataFrame(columns=['Daily', 'Open Rate', 'Click Rate', 'Click to Open Rate', 'Unsubscribe Rate'])
-    
-    # Load breakdowns
-    try:
-        data['breakdowns']['delivery_by_domain'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-By_Email_Domain.csv'))
-        data['breakdowns']['engagement_by_domain'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-By_Email_Domain.csv'))
-        data['breakdowns']['delivery_by_weekday'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-By_Day_of_the_Week.csv'))
-        data['breakdowns']['engagement_by_weekday'] = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-By_Day_of_the_Week.csv'))
-    except Exception as e:
-        print(f"Error loading breakdown data: {e}")
-    
-    # Load details
-    data['details'] = {}
-    try:
-        delivery_details = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-Email_Deliveries_Details.csv'))
-        delivery_details['Send Date'] = pd.to_datetime(delivery_details['Send Date'])
-        data['details']['delivery'] = delivery_details
-        
-        engagement_details = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Email_Engagement_Details.csv'))
-        engagement_details['Send Date'] = pd.to_datetime(engagement_details['Send Date'])
-        data['details']['engagement'] = engagement_details
-    except Exception as e:
-        print(f"Error loading details data: {e}")
-    
-    return data
+def _read_csv(workbook, sheet):
+    def load():
+        return _sheet(workbook, sheet)
+    return load
+
+def _load_delivery_time():
+    # Daily arrives as datetimes from the snapshot schema
+    delivery_time = _sheet(DELIVERIES, 'Email_Deliveries_Delivery_Timel')
+    # Strip whitespace from all column names
+    delivery_time.columns = delivery_time.columns.str.strip()
+
+    # Create Bounce Rate column if it doesn't exist
+    bounce_rate_col = next((col for col in delivery_time.columns
+                            if 'bounce' in col.lower() and 'rate' in col.lower()), None)
+    if bounce_rate_col and bounce_rate_col != 'Bounce Rate':
+        delivery_time = delivery_time.rename(columns={bounce_rate_col: 'Bounce Rate'})
+    elif bounce_rate_col is None and 'Bounces' in delivery_time.columns and 'Sends' in delivery_time.columns:
+        delivery_time['Bounce Rate'] = delivery_time['Bounces'] / delivery_time['Sends']
+    return delivery_time
+
+def _load_engagement_time():
+    engagement_time = _sheet(ENGAGEMENT, 'Email_Engagement_Engagement_Tim')
+    # Make sure all column names are stripped
+    engagement_time.columns = engagement_time.columns.str.strip()
+    return engagement_time
+
+def _with_fallback(load, columns):
+    """Load a table, falling back to an empty frame with the expected columns if it cannot be read"""
+    def load_or_empty():
+        try:
+            return load()
+        except Exception as e:
+            print(f"Error loading table, using an empty one: {e}")
+            return pd.DataFrame(columns=columns)
+    return load_or_empty
+
+# Every table of the email dashboard: group -> table name -> function that
+# reads and parses it. Nothing is read until a page asks for the table. Tables
+# other than the summary cards fall back to an empty frame with their expected
+# columns when they cannot be read.
+TABLES = {
+    'summary': {
+        'deliveries': _read_csv(DELIVERIES, 'Deliveries'),
+        'sends': _read_csv(DELIVERIES, 'Sends'),
+        'bounce_rate': _read_csv(DELIVERIES, 'Bounce_Rate'),
+        'open_rate': _read_csv(ENGAGEMENT, 'Open_Rate'),
+        'unique_opens': _read_csv(ENGAGEMENT, 'Unique_Opens'),
+        'unique_clicks': _read_csv(ENGAGEMENT, 'Unique_Clicks'),
+        'click_to_open_rate': _read_csv(ENGAGEMENT, 'Click_to_Open_Rate'),
+        'unique_unsubscribes': _read_csv(ENGAGEMENT, 'Unique_Unsubscribes'),
+        'unsubscribe_rate': _read_csv(ENGAGEMENT, 'Unsubscribe_Rate'),
+    },
+    'time_series': {
+        'delivery': _with_fallback(_load_delivery_time,
+                                   ['Daily', 'Sends', 'Deliveries', 'Delivery Rate', 'Bounces', 'Bounce Rate']),
+        'engagement': _with_fallback(_load_engagement_time,
+                                     ['Daily', 'Open Rate', 'Click Rate', 'Click to Open Rate', 'Unsubscribe Rate']),
+    },
+    'breakdowns': {
+        'delivery_by_domain': _with_fallback(_read_csv(DELIVERIES, 'By_Email_Domain'), ['Email Domain', 'Sends']),
+        'engagement_by_domain': _with_fallback(_read_csv(ENGAGEMENT, 'By_Email_Domain'),
+                                               ['Email Domain', 'Unique Opens']),
+        'delivery_by_weekday': _with_fallback(_read_csv(DELIVERIES, 'By_Day_of_the_Week'), ['Weekday', 'Sends']),
+        'engagement_by_weekday': _with_fallback(_read_csv(ENGAGEMENT, 'By_Day_of_the_Week'),
+                                                ['Weekday', 'Unique Opens']),
+    },
+    'details': {
+        'delivery': _with_fallback(_read_csv(DELIVERIES, 'Email_Deliveries_Details'),
+                                   ['Email Content Name', 'Send Date', 'Sends', 'Deliveries', ' Bounces ',
+                                    'Bounce Rate']),
+        'engagement': _with_fallback(_read_csv(ENGAGEMENT, 'Email_Engagement_Details'),
+                                     ['Message Name', 'Campaign', 'Send Date', 'Open Rate', 'Click Rate',
+                                      'Click to Open Rate', 'Unsubscribe Rate']),
+    },
+}
+
+class LazyTables(Mapping):
+    """Dict-like group of tables that reads and parses each table on first access
+
+    The catalog is shared by every session, so each access returns a copy of
+    the loaded table (as st.cache_data did): a page changing its copy never
+    affects another page or session. The email tables are a few dozen rows.
+    """
+
+    def __init__(self, group, loaders, load_times, lock):
+        self._group = group
+        self._loaders = loaders
+        self._tables = {}
+        self._load_times = load_times
+        self._lock = lock
+
+    def __getitem__(self, name):
+        if name not in self._tables:
+            load = self._loaders[name]
+            with self._lock:
+                if name not in self._tables:
+                    start = time.perf_counter()
+                    self._tables[name] = load()
+                    self._load_times[f'{self._group}.{name}'] = time.perf_counter() - start
+        return self._tables[name].copy()
+
+    def __contains__(self, name):
+        # Membership must not trigger a load
+        return name in self._loaders
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+class DataCatalog(Mapping):
+    """The email dashboard tables, accessed as data[group][table] and loaded on demand
+
+    Each table is read, parsed and kept on its first access, so a page only
+    pays for the tables it renders. load_times records how long each loaded
+    table took, keyed by 'group.table'.
+    """
+
+    def __init__(self, tables=TABLES):
+        self.load_times = {}
+        lock = threading.RLock()
+        self._groups = {group: LazyTables(group, loaders, self.load_times, lock)
+                        for group, loaders in tables.items()}
+
+    def __getitem__(self, group):
+        return self._groups[group]
+
+    def __contains__(self, group):
+        return group in self._groups
+
+    def __iter__(self):
+        return iter(self._groups)
+
+    def __len__(self):
+        return len(self._groups)
+
+    def loaded_tables(self):
+        """Names of the tables read so far, as 'group.table'"""
+        return list(self.load_times)
+
+def load_data():
+    """Return the catalog of all email dashboard tables; each is loaded when first accessed"""
+    return DataCatalog()
 
 def get_email_funnel_data(data):
     """Extract email funnel metrics from the data"""
@@ -147,29 +188,12 @@ def get_performance_vs_previous(data):
 
 def load_data_simple():
     """Simple version that returns just the three main dataframes"""
+    delivery_daily = _sheet(DELIVERIES, 'Email_Deliveries_Delivery_Timel')
+    engagement_daily = _sheet(ENGAGEMENT, 'Email_Engagement_Engagement_Tim')
 
-
-    # Get the directory where the current script is located
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    # Go up one level to the project root
-    project_root = os.path.dirname(current_dir)
-    # Construct the path to data directory
-    base_path = os.path.join(project_root, "data", "convertedcsv")
-
-    
-    # Load delivery data
-    delivery_daily = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Deliveries', 'Advertising_Email_Deliveries.xlsx-Email_Deliveries_Delivery_Timel.csv'))
-    delivery_daily['Daily'] = pd.to_datetime(delivery_daily['Daily'])
-    
-    # Load engagement data
-    engagement_daily = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Email_Engagement_Engagement_Tim.csv'))
-    engagement_daily['Daily'] = pd.to_datetime(engagement_daily['Daily'])
-    
     # Load email details
     try:
-        email_details = pd.read_csv(os.path.join(base_path, 'Advertising_Email_Engagement', 'Advertising_Email_Engagement.xlsx-Email_Engagement_Details.csv'))
-        if 'Send Date' in email_details.columns:
-            email_details['Send Date'] = pd.to_datetime(email_details['Send Date'])
+        email_details = _sheet(ENGAGEMENT, 'Email_Engagement_Details')
     except:
         email_details = pd.DataFrame()
         
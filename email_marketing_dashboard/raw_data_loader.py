@@ -1,118 +1,276 @@
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
 import re
+import threading
+from collections.abc import Mapping
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
 
 base_path = "data/rawdata"
 
+# 每个 sheet 的前两行是元数据（第一格）和空行，第 3 行才是表头
+METADATA_ROWS = 2
+
+def _convert_cell(cell):
+    """单元格的值，与 pandas 的 openpyxl 读取器一致"""
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+def _sheet_rows(sheet):
+    """一次遍历读取 sheet 的所有行（去掉末尾的空单元格和空行，再补齐到相同宽度）"""
+    sheet.reset_dimensions()
+    rows = []
+    last_row_with_data = -1
+    for row_number, row in enumerate(sheet.rows):
+        values = [_convert_cell(cell) for cell in row]
+        while values and values[-1] == "":
+            values.pop()
+        if values:
+            last_row_with_data = row_number
+        rows.append(values)
+    rows = rows[:last_row_with_data + 1]
+    if rows:
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+    return rows
+
+def parse_metadata(metadata_text):
+    """解析第一格中的 Dashboard 名称、Widget 名称和时间范围"""
+    dashboard_match = re.search(r"Dashboard:\s*(.+)", metadata_text)
+    widget_match = re.search(r"Widget:\s*(.+)", metadata_text)
+    time_match = re.search(r"TIME_INTERVAL:\s*From:(\d{2}-\d{2}-\d{2})\s*To:(\d{2}-\d{2}-\d{2})", metadata_text)
+    return {
+        'dashboard_name': dashboard_match.group(1) if dashboard_match else None,
+        'widget_name': widget_match.group(1) if widget_match else None,
+        'time_range': (time_match.group(1), time_match.group(2)) if time_match else (None, None),
+    }
+
+def read_sheet(sheet):
+    """流式读取一个 sheet：第一行取元数据，其余行在同一次遍历中组成 DataFrame"""
+    rows = _sheet_rows(sheet)
+    first_cell = rows[0][0] if rows and rows[0] else ""
+    metadata_text = "nan" if first_cell == "" else str(first_cell)
+    try:
+        # 与 pd.read_excel(skiprows=2) 的解析方式相同
+        df_data = TextParser(rows, header=0, skiprows=METADATA_ROWS, skip_blank_lines=False).read()
+    except EmptyDataError:
+        df_data = pd.DataFrame()
+    return {**parse_metadata(metadata_text), 'data': df_data}
+
+def _load_sheets(file_path, part=0, parts=1):
+    """读取工作簿中第 part, part + parts, ... 个 sheet，返回 (位置, sheet 名, 数据)"""
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return [(index, sheet.title, read_sheet(sheet))
+                for index, sheet in enumerate(workbook.worksheets) if index % parts == part]
+    finally:
+        workbook.close()
+
 def load_raw_data(path = "Social_Media_Perfomance_Jan25.xlsx"):
+    """以只读模式打开工作簿，每个 sheet 只解析一次"""
     file_path = os.path.join(base_path, path)
-    xls = pd.ExcelFile(file_path)
-
     # 用于存储所有 sheet 的数据
-    all_sheets_data = {}
+    return {sheet_name: info for _, sheet_name, info in _load_sheets(file_path)}
+
+def workbook_names():
+    """data/rawdata 下的所有工作簿（跳过 Excel 的 ~$ 锁文件）"""
+    return sorted(name for name in os.listdir(base_path) if name.endswith('.xlsx') and not name.startswith('~$'))
+
+def load_workbooks(paths=None, workers=None):
+    """在进程池中并行读取多个工作簿
+
+    工作簿少于进程数时，每个工作簿按 sheet 轮流分成几份，由不同进程读取，
+    所以单个大工作簿也能用上多个核。
+
+    Args:
+        paths (list, optional): data/rawdata 下的工作簿，默认全部
+        workers (int, optional): 进程数，默认等于 CPU 数
 
-    # 遍历所有 sheet
+    Returns:
+        dict: {工作簿: load_raw_data() 的结果}，sheet 顺序与工作簿中一致
+    """
+    paths = list(paths or workbook_names())
+    workers = workers or os.cpu_count() or 1
+    parts = max(1, workers // max(len(paths), 1))
+    all_workbooks = {path: [] for path in paths}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_load_sheets, os.path.join(base_path, path), part, parts): path
+                   for path in paths for part in range(parts)}
+        for future in as_completed(futures):
+            all_workbooks[futures[future]] += future.result()
+    return {path: {sheet_name: info for _, sheet_name, info in sorted(sheets, key=lambda sheet: sheet[0])}
+            for path, sheets in all_workbooks.items()}
+
+def _load_raw_data_read_excel(path = "Social_Media_Perfomance_Jan25.xlsx"):
+    """旧的读取方式：每个 sheet 调用两次 pd.read_excel，仅用于基准测试"""
+    file_path = os.path.join(base_path, path)
+    xls = pd.ExcelFile(file_path)
+    all_sheets_data = {}
     for sheet_name in xls.sheet_names:
-        # 读取整个 sheet
         df_raw = pd.read_excel(xls, sheet_name=sheet_name, header=None)
+        metadata = parse_metadata(str(df_raw.iloc[0, 0]))
+        df_data = pd.read_excel(xls, sheet_name=sheet_name, skiprows=2)
+        all_sheets_data[sheet_name] = {**metadata, 'data': df_data}
+    return all_sheets_data
 
-        # 解析第一行第一格中的信息
-        metadata_text = str(df_raw.iloc[0, 0])  # 第一行第一列数据
+def benchmark(path = "Social_Media_Perfomance_Jan25.xlsx", repeat=3):
+    """比较旧的两次 read_excel 与单次流式读取的耗时，并检查两者结果一致
 
-        # 解析 Dashboard 名称
-        dashboard_match = re.search(r"Dashboard:\s*(.+)", metadata_text)
-        dashboard_name = dashboard_match.group(1) if dashboard_match else None
+    Returns:
+        pd.DataFrame: 每种方式的最佳耗时（毫秒）
+    """
+    def best_of(func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(path)
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000, result
 
-        # 解析 Widget 名称
-        widget_match = re.search(r"Widget:\s*(.+)", metadata_text)
-        widget_name = widget_match.group(1) if widget_match else None
+    read_excel_ms, expected = best_of(_load_raw_data_read_excel)
+    streaming_ms, actual = best_of(load_raw_data)
+    for sheet_name, info in expected.items():
+        if {**info, 'data': None} != {**actual[sheet_name], 'data': None}:
+            raise AssertionError(f"{sheet_name}: metadata differs")
+        pd.testing.assert_frame_equal(info['data'], actual[sheet_name]['data'], obj=sheet_name)
+    return pd.DataFrame([
+        {'READER': 'read_excel x2', 'SHEETS': len(expected), 'MS': round(read_excel_ms, 1)},
+        {'READER': 'streaming', 'SHEETS': len(actual), 'MS': round(streaming_ms, 1),
+         'SPEEDUP': round(read_excel_ms / streaming_ms, 1)},
+    ])
 
-        # 解析时间范围
-        time_match = re.search(r"TIME_INTERVAL:\s*From:(\d{2}-\d{2}-\d{2})\s*To:(\d{2}-\d{2}-\d{2})", metadata_text)
-        time_range = (time_match.group(1), time_match.group(2)) if time_match else (None, None)
+def _strip_sum(column):
+    return column.replace(" (SUM)", "")
 
-        # 读取正式数据（从第 3 行开始，跳过前两行）
-        df_data = pd.read_excel(xls, sheet_name=sheet_name, skiprows=2)
+def _sheet_data(sheet_name):
+    def build(sheets):
+        return sheets[sheet_name]['data']
+    return build
 
-        # 存储该 sheet 的数据
-        all_sheets_data[sheet_name] = {
-            'dashboard_name': dashboard_name,
-            'widget_name': widget_name,
-            'time_range': time_range,
-            'data': df_data
-        }
-
-    # 打印解析结果
-    # for sheet_name, info in all_sheets_data.items():
-    #     print(f"Sheet Name: {sheet_name}")
-    #     print(f"Dashboard Name: {info['dashboard_name']}")
-    #     print(f"Widget Name: {info['widget_name']}")
-    #     print(f"Time Interval: {info['time_range']}")
-    #     print("\nExtracted DataFrame:")
-    #     print(info['data'].head())  # 打印前几行数据
-    #     print("\n" + "=" * 50 + "\n")
+def _renamed(sheet_name, rename):
+    def build(sheets):
+        return sheets[sheet_name]['data'].rename(columns=rename)
+    return build
 
-    return all_sheets_data
+def _media_type(sheets):
+    # Engagement Distribution by M 和 Engagement Reach by Media Ty 按 Media Type 合并
+    engagement_distribution_by_m = sheets["Engagement Distribution by M"]['data']
+    engagement_reach_by_media_ty = sheets["Engagement Reach by Media Ty"]['data']
+    media_type = pd.merge(engagement_distribution_by_m, engagement_reach_by_media_ty, on='Media Type')
+    return media_type.rename(columns=_strip_sum)
 
-# Engagement Summary
-def get_engagement_summary(data):
+# 社交媒体页面用到的派生视图：视图名 -> 由 sheet 计算视图的函数
+# 都不修改原始 sheet，每个数据版本只计算一次（见 SocialMediaData）
+VIEWS = {
+    'engagement_summary': _sheet_data("Engagement Summary"),
+    'post_performance_summary': _sheet_data("Post Performance Summary"),
+    'total_engagement_metrics_on': _renamed("Total Engagement Metrics on ",
+                                            lambda x: "Daily" if x == "Date" else _strip_sum(x)),
+    'social_engagement_by_time_of': _renamed("Social Engagement by Time of", _strip_sum),
+    'post_engagement_scorecard_ac': _renamed("Post Engagement Scorecard ac", _strip_sum),
+    'media_type': _media_type,
+}
+
+class SocialMediaData(Mapping):
+    """社交媒体工作簿的 sheet（与 load_raw_data() 的结构相同），派生视图按需计算一次后缓存
+
+    一个实例对应一个数据版本（version，例如工作簿的 sha256），工作簿变化时应创建新实例。
+    view() 返回深拷贝（这些表只有几十行），所以无论 pandas 版本是否启用写时复制，
+    调用方修改返回的表都不会影响缓存的视图。
+    """
+
+    def __init__(self, sheets, version=None):
+        self.version = version
+        self._sheets = sheets
+        self._views = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, sheet_name):
+        return self._sheets[sheet_name]
+
+    def __iter__(self):
+        return iter(self._sheets)
+
+    def __len__(self):
+        return len(self._sheets)
+
+    def view(self, name):
+        if name not in self._views:
+            with self._lock:
+                if name not in self._views:
+                    self._views[name] = VIEWS[name](self._sheets)
+        return self._views[name].copy()
+
+def social_media_view(data, name):
+    """从已加载的数据中取派生视图，不会重新读取工作簿
+
+    Args:
+        data (SocialMediaData | dict): load_raw_data() 的结果；普通 dict 每次调用都重新计算视图
+        name (str): VIEWS 中的视图名
+
+    Returns:
+        pd.DataFrame: 视图，修改它不会影响缓存
+    """
     if data is None:
-        data = load_raw_data()
-    engagement_summary = data["Engagement Summary"].get('data')
+        raise ValueError("Social media data is not loaded; pass the result of load_raw_data()")
+    if not isinstance(data, SocialMediaData):
+        data = SocialMediaData(data)
+    return data.view(name)
 
-    return engagement_summary
+# Engagement Summary
+def get_engagement_summary(data):
+    return social_media_view(data, 'engagement_summary')
 
 # Post Performance Summary
 def get_post_performance_summary(data):
-    if data is None:
-        data = load_raw_data()
-    post_performance_summary = data["Post Performance Summary"].get('data')
-
-    return post_performance_summary
+    return social_media_view(data, 'post_performance_summary')
 
 # Total Engagement Metrics on
 def get_total_engagement_metrics_on(data):
-    if data is None:
-        data = load_raw_data()
-    total_engagement_metrics_on = data["Total Engagement Metrics on "].get('data')
-
-    total_engagement_metrics_on.rename(columns=lambda x: "Daily" if x == "Date" else x.replace(" (SUM)", ""), inplace=True)
-
-    return total_engagement_metrics_on
+    return social_media_view(data, 'total_engagement_metrics_on')
 
 # Social Engagement by Time of
 def get_social_engagement_by_time_of(data):
-    if data is None:
-        data = load_raw_data()
-    social_engagement_by_time_of = data["Social Engagement by Time of"].get('data')
-
-    social_engagement_by_time_of.rename(columns=lambda x: x.replace(" (SUM)", ""),inplace=True)
-
-    return social_engagement_by_time_of
+    return social_media_view(data, 'social_engagement_by_time_of')
 
 # Post Engagement Scorecard ac
 def get_post_engagement_scorecard_ac(data):
-    if data is None:
-        data = load_raw_data()
-    post_engagement_scorecard_ac = data["Post Engagement Scorecard ac"].get('data')
-
-    post_engagement_scorecard_ac.rename(columns=lambda x: x.replace(" (SUM)", ""), inplace=True)
-
-    return post_engagement_scorecard_ac
+    return social_media_view(data, 'post_engagement_scorecard_ac')
 
 # Engagement Distribution by M
 # Engagement Reach by Media Ty
 def get_media_type(data):
-    if data is None:
-        data = load_raw_data()
-    engagement_distribution_by_m = data["Engagement Distribution by M"].get('data')
-    engagement_reach_by_media_ty = data["Engagement Reach by Media Ty"].get('data')
-
-    media_type = pd.merge(engagement_distribution_by_m, engagement_reach_by_media_ty, on='Media Type')
+    return social_media_view(data, 'media_type')
 
-    media_type.rename(columns=lambda x: x.replace(" (SUM)", ""), inplace=True)
 
-    print(media_type)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the streaming workbook reader against pd.read_excel')
+    parser.add_argument('--path', type=str, default="Social_Media_Perfomance_Jan25.xlsx",
+                        help='Workbook under data/rawdata')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions per reader')
+    parser.add_argument('--all', action='store_true',
+                        help='Instead of benchmarking, read every workbook under data/rawdata in parallel')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for --all')
 
-    return media_type
+    args = parser.parse_args()
 
+    if args.all:
+        start = time.perf_counter()
+        all_workbooks = load_workbooks(workers=args.workers)
+        for path, sheets in all_workbooks.items():
+            print(f"{path}: {len(sheets)} sheets")
+        print(f"Read {len(all_workbooks)} workbooks in {time.perf_counter() - start:.2f}s")
+    else:
+        print(benchmark(args.path, args.repeat).to_string(index=False))
@@ -0,0 +1,223 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from raw_data_loader import base_path, load_raw_data, workbook_names
+
+# Get the directory where the current script is located
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Go up one level to the project root
+project_root = os.path.dirname(current_dir)
+
+# One directory per parsed workbook, named after the sha256 of its bytes, so
+# every Streamlit worker and CLI job reading the same file shares one entry
+cache_dir = os.path.join(project_root, "data", "cache", "rawdata")
+MANIFEST_NAME = "manifest.json"
+
+# Bumped whenever load_raw_data() or the entry layout changes, so older
+# entries are parsed again instead of being read with the wrong layout
+CACHE_VERSION = 2
+
+# Columns mixing numbers, text and dates (the Advertising_Email exports) have
+# no Arrow type. Their cells are stored as '<code>:<text>' strings and turned
+# back into the original Python values on read, so no entry is ever unpickled.
+CELL_DECODERS = {
+    'n': lambda text: None,
+    'N': lambda text: pd.NaT,
+    'b': lambda text: text == 'True',
+    'i': int,
+    'f': float,
+    'd': datetime.datetime.fromisoformat,
+    'D': datetime.date.fromisoformat,
+    't': datetime.time.fromisoformat,
+    's': str,
+}
+
+
+def workbook_digest(file_path):
+    """sha256 of a workbook's bytes"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_dir(digest):
+    return os.path.join(cache_dir, f'v{CACHE_VERSION}-{digest}')
+
+
+def _encode_cell(value):
+    """A cell of a mixed-type column as '<code>:<text>' (see CELL_DECODERS)"""
+    if value is None:
+        return 'n:'
+    if value is pd.NaT:
+        return 'N:'
+    if isinstance(value, (bool, np.bool_)):
+        return f'b:{bool(value)}'
+    if isinstance(value, (int, np.integer)):
+        return f'i:{int(value)}'
+    if isinstance(value, (float, np.floating)):
+        return f'f:{float(value)!r}'
+    if isinstance(value, datetime.datetime):
+        return f'd:{value.isoformat()}'
+    if isinstance(value, datetime.date):
+        return f'D:{value.isoformat()}'
+    if isinstance(value, datetime.time):
+        return f't:{value.isoformat()}'
+    return f's:{value}'
+
+
+def _decode_cell(encoded):
+    code, text = encoded.split(':', 1)
+    return CELL_DECODERS[code](text)
+
+
+def _write_sheet(df, entry, index):
+    """Store one sheet as uncompressed Feather
+
+    Returns:
+        tuple: (file name, positions of the columns stored as encoded cells)
+    """
+    encoded = []
+    for position in range(df.shape[1]):
+        if df.dtypes.iloc[position] != object:
+            continue
+        try:
+            pa.array(df.iloc[:, position], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            encoded.append(position)
+    if encoded:
+        df = df.copy()
+        for position in encoded:
+            df.isetitem(position, df.iloc[:, position].map(_encode_cell).astype(object))
+
+    file_name = f'sheet_{index:02d}.feather'
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    feather.write_feather(table, os.path.join(entry, file_name), compression='uncompressed')
+    return file_name, encoded
+
+
+def _read_sheet(entry, sheet):
+    df = feather.read_table(os.path.join(entry, sheet['file']), memory_map=True).to_pandas()
+    for position in sheet['encoded_columns']:
+        df.isetitem(position, pd.Series([_decode_cell(value) for value in df.iloc[:, position]],
+                                        index=df.index, dtype=object))
+    return df
+
+
+def read_entry(digest):
+    """The sheets of a cached workbook in load_raw_data() layout, or None if not cached"""
+    entry = _entry_dir(digest)
+    manifest_file = os.path.join(entry, MANIFEST_NAME)
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    return {
+        sheet['sheet_name']: {
+            'dashboard_name': sheet['dashboard_name'],
+            'widget_name': sheet['widget_name'],
+            'time_range': tuple(sheet['time_range']),
+            'data': _read_sheet(entry, sheet),
+        }
+        for sheet in manifest['sheets']
+    }
+
+
+def write_entry(digest, path, sheets):
+    """Store parsed sheets under the workbook's digest
+
+    The entry is written to a temporary directory and renamed into place, so
+    concurrent readers never see half an entry; if another process stored
+    the same workbook first, its entry is kept.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=cache_dir)
+    try:
+        manifest = {'workbook': os.path.basename(path), 'version': CACHE_VERSION, 'sheets': []}
+        for index, (sheet_name, info) in enumerate(sheets.items()):
+            file_name, encoded = _write_sheet(info['data'], staging, index)
+            manifest['sheets'].append({
+                'sheet_name': sheet_name,
+                'dashboard_name': info['dashboard_name'],
+                'widget_name': info['widget_name'],
+                'time_range': list(info['time_range']),
+                'file': file_name,
+                'encoded_columns': encoded,
+            })
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            os.rename(staging, _entry_dir(digest))
+        except OSError:
+            if not os.path.exists(os.path.join(_entry_dir(digest), MANIFEST_NAME)):
+                raise
+    finally:
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+
+
+def prune_cache(path, keep):
+    """Remove the entries of earlier versions of a workbook, keeping the digest given"""
+    if not os.path.isdir(cache_dir):
+        return []
+    removed = []
+    for name in os.listdir(cache_dir):
+        manifest_file = os.path.join(cache_dir, name, MANIFEST_NAME)
+        if name == os.path.basename(_entry_dir(keep)) or not os.path.exists(manifest_file):
+            continue
+        with open(manifest_file) as f:
+            workbook = json.load(f).get('workbook')
+        if workbook == os.path.basename(path) or not name.startswith(f'v{CACHE_VERSION}-'):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def load_cached_workbook(path = "Social_Media_Perfomance_Jan25.xlsx", refresh=False):
+    """load_raw_data() backed by the on-disk cache
+
+    The workbook is hashed on every call, so an edited or replaced file is
+    parsed again and the entries of its earlier versions are dropped.
+
+    Args:
+        path (str): Workbook under data/rawdata
+        refresh (bool): Parse the workbook even if it is cached
+
+    Returns:
+        dict: {sheet_name: {'dashboard_name', 'widget_name', 'time_range', 'data'}}
+    """
+    digest = workbook_digest(os.path.join(base_path, path))
+    if not refresh:
+        sheets = read_entry(digest)
+        if sheets is not None:
+            return sheets
+    sheets = load_raw_data(path)
+    if refresh and os.path.exists(_entry_dir(digest)):
+        shutil.rmtree(_entry_dir(digest))
+    write_entry(digest, path, sheets)
+    prune_cache(path, keep=digest)
+    return sheets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Parse the raw workbooks into the shared on-disk cache')
+    parser.add_argument('--path', type=str, action='append',
+                        help='Workbook under data/rawdata (repeatable). Defaults to every workbook.')
+    parser.add_argument('--refresh', action='store_true', help='Parse again even if cached')
+
+    args = parser.parse_args()
+
+    for path in args.path or workbook_names():
+        sheets = load_cached_workbook(path, refresh=args.refresh)
+        print(f"{path}: {len(sheets)} sheets cached in {_entry_dir(workbook_digest(os.path.join(base_path, path)))}")
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# 2**14 registers: about 0.8% relative standard error on every estimate,
+# including unions of any number of merged sketches
+PRECISION = 14
+
+
+def hash_values(values):
+    """64-bit hashes of the values, stable across processes and runs"""
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+def _bit_length(values):
+    """Number of significant bits of each uint64 value (0 for 0)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    # 32-bit halves are exact in float64, so frexp's exponent is the bit length
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+
+def register_ranks(hashes, precision=PRECISION):
+    """Split hashes into a register index and the rank stored in that register
+
+    The first precision bits pick the register; the rank is the position of
+    the first 1 bit in the remaining bits.
+
+    Returns:
+        tuple: (register index array, rank array)
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    registers = (hashes >> np.uint64(64 - precision)).astype(np.int32)
+    remaining = hashes << np.uint64(precision)
+    ranks = np.minimum(64 - _bit_length(remaining) + 1, 64 - precision + 1)
+    return registers, ranks.astype(np.int8)
+
+
+def sketch(values, precision=PRECISION):
+    """Dense HyperLogLog registers for a set of values"""
+    registers = np.zeros(1 << precision, dtype=np.int8)
+    index, ranks = register_ranks(hash_values(values), precision)
+    np.maximum.at(registers, index, ranks)
+    return registers
+
+
+def merge(*sketches):
+    """Union of sketches with the same precision: the register-wise maximum"""
+    return np.maximum.reduce(sketches)
+
+
+def _sigma(x):
+    if x == 1:
+        return np.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x):
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = np.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+def estimate(registers):
+    """Estimate the number of distinct values from dense registers
+
+    Uses Ertl's improved estimator ("New cardinality estimation algorithms
+    for HyperLogLog sketches", 2017), which stays unbiased from a handful of
+    values up to billions without empirical bias tables.
+    """
+    registers = np.asarray(registers)
+    m = len(registers)
+    q = 64 - int(np.log2(m))
+    counts = np.bincount(registers.astype(np.int64), minlength=q + 2)
+    z = m * _tau(1 - counts[q + 1] / m)
+    for k in range(q, 0, -1):
+        z = 0.5 * (z + counts[k])
+    z += m * _sigma(counts[0] / m)
+    return m * m / (2 * np.log(2) * z)
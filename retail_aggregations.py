@@ -0,0 +1,300 @@
+import dask
+import pandas as pd
+from dask.diagnostics import ProgressBar
+
+import hyperloglog
+from retail_data import load_item_lookup, with_item_descriptions
+from retail_topk import heavy_hitter_candidates, merge_candidates, verified_top_k
+
+# Registry of every aggregate the retail analysis needs. Each entry maps a
+# result name to a function that takes the prepared Dask DataFrame and returns
+# a *lazy* Dask object. compute_aggregations() evaluates all of them in a
+# single dask.compute() call, so the retail data is read and parsed once no
+# matter how many metrics are registered. String dimensions arrive as
+# categoricals (see retail_data.CATEGORICAL_COLUMNS), so groupbys on them pass
+# observed=True to produce only the combinations present in the data.
+AGGREGATIONS = {}
+
+
+def register_aggregation(name):
+    """Register a lazy aggregation under the given result name"""
+    def decorator(func):
+        AGGREGATIONS[name] = func
+        return func
+    return decorator
+
+
+def compute_aggregations(df, names=None, progress=True):
+    """Evaluate the registered aggregations over one shared Dask graph
+
+    Args:
+        df (dask.dataframe.DataFrame): Prepared retail data
+        names (list, optional): Subset of registered aggregations to compute. Defaults to all.
+        progress (bool): Show a Dask progress bar while computing
+
+    Returns:
+        dict: Aggregation name -> materialized pandas object or scalar
+    """
+    names = list(AGGREGATIONS) if names is None else list(names)
+    unknown = [name for name in names if name not in AGGREGATIONS]
+    if unknown:
+        raise KeyError(f"Unknown aggregations: {', '.join(unknown)}")
+
+    lazy_results = [AGGREGATIONS[name](df) for name in names]
+    if progress:
+        with ProgressBar():
+            results = dask.compute(*lazy_results)
+    else:
+        results = dask.compute(*lazy_results)
+    return dict(zip(names, results))
+
+
+# ----------------------
+# Totals
+# ----------------------
+@register_aggregation('total_sales')
+def total_sales(df):
+    return df['EXTENSION_AMOUNT'].sum()
+
+
+@register_aggregation('total_quantity')
+def total_quantity(df):
+    return df['QTY'].sum()
+
+
+@register_aggregation('total_transactions')
+def total_transactions(df):
+    return df['SLIP_NO'].nunique()
+
+
+@register_aggregation('total_items')
+def total_items(df):
+    return df['ITEM_ID'].nunique()
+
+
+@register_aggregation('return_lines')
+def return_lines(df):
+    return df['IS_RETURN'].sum()
+
+
+@register_aggregation('total_lines')
+def total_lines(df):
+    return df['IS_RETURN'].count()
+
+
+@register_aggregation('stores')
+def stores(df):
+    return df['SITE_NAME'].unique()
+
+
+@register_aggregation('commands')
+def commands(df):
+    return df['COMMAND_NAME'].unique()
+
+
+@register_aggregation('store_formats')
+def store_formats(df):
+    return df['STORE_FORMAT'].unique()
+
+
+# ----------------------
+# Temporal aggregates
+# ----------------------
+@register_aggregation('daily_sales')
+def daily_sales(df):
+    return df.groupby('SALE_DATE')['EXTENSION_AMOUNT'].sum()
+
+
+@register_aggregation('day_of_week_sales')
+def day_of_week_sales(df):
+    return df.groupby('DAY_OF_WEEK')['EXTENSION_AMOUNT'].sum()
+
+
+@register_aggregation('hourly_sales')
+def hourly_sales(df):
+    return df.groupby('HOUR')['EXTENSION_AMOUNT'].sum()
+
+
+# ----------------------
+# Product, price and store aggregates
+# ----------------------
+# Return rates are kept as RETURN_LINES / LINES rather than a mean so the
+# tables stay additive across partitions and runs.
+def product_sales(df):
+    """Lazy per-product totals; the rankings only compute it for candidate items"""
+    return df.groupby('ITEM_ID').agg(
+        EXTENSION_AMOUNT=('EXTENSION_AMOUNT', 'sum'),
+        QTY=('QTY', 'sum'),
+        RETURN_LINES=('IS_RETURN', 'sum'),
+        LINES=('IS_RETURN', 'count'),
+    )
+
+
+# Product rankings never group the whole catalog: each partition passes on
+# its heaviest items (see retail_topk.py) and verified_top_products() totals
+# only those candidates exactly
+PRODUCT_RANKINGS = {
+    'top_products_revenue': ('product_revenue_candidates', 'EXTENSION_AMOUNT'),
+    'top_products_quantity': ('product_quantity_candidates', 'QTY'),
+}
+
+# Product return rates are ranked among this many best sellers by revenue.
+# Their totals come out of the same verification pass as the rankings, so
+# return rates do not group the whole catalog either.
+BEST_SELLERS = 200
+
+
+@register_aggregation('product_revenue_candidates')
+def product_revenue_candidates(df):
+    return heavy_hitter_candidates(df, 'ITEM_ID', 'EXTENSION_AMOUNT')
+
+
+@register_aggregation('product_quantity_candidates')
+def product_quantity_candidates(df):
+    return heavy_hitter_candidates(df, 'ITEM_ID', 'QTY')
+
+
+def verified_top_products(df, results, k, best_sellers=BEST_SELLERS):
+    """Exact top-k products by revenue and quantity from the candidate summaries
+
+    Runs one verification pass that totals only the candidate items, so its
+    cost is bounded by the summaries (CAPACITY keys per partition) rather
+    than by the catalog. Should the candidates not guarantee a ranking, that
+    ranking falls back to totalling every product.
+
+    Args:
+        df (dask.dataframe.DataFrame): The data the candidates were computed from
+        results (dict): Computed aggregations including the PRODUCT_RANKINGS candidates
+        k (int): Products per ranking
+        best_sellers (int): Products by revenue to return as best_seller_totals
+
+    Returns:
+        tuple: (dict ranking name -> top-k DataFrame, plus best_seller_totals
+        with the totals and return counts of the best sellers; DataFrame of
+        verified candidate totals)
+    """
+    merged = {name: merge_candidates(results[summary]) for name, (summary, _) in PRODUCT_RANKINGS.items()}
+    item_ids = set()
+    for candidates, _ in merged.values():
+        item_ids.update(candidates)
+
+    lookup = load_item_lookup()
+    totals = product_sales(df[df['ITEM_ID'].isin(sorted(item_ids))]).compute().reset_index()
+    totals = with_item_descriptions(totals, lookup)
+    rankings = {name: verified_top_k(totals, weight, k, merged[name][1])
+                for name, (_, weight) in PRODUCT_RANKINGS.items()}
+    rankings['best_seller_totals'] = verified_top_k(totals, 'EXTENSION_AMOUNT', best_sellers,
+                                                    merged['top_products_revenue'][1])
+
+    unverified = [name for name, ranking in rankings.items() if ranking is None]
+    if unverified:
+        all_products = with_item_descriptions(product_sales(df).compute().reset_index(), lookup)
+        for name in unverified:
+            if name == 'best_seller_totals':
+                rankings[name] = all_products.nlargest(best_sellers, 'EXTENSION_AMOUNT')
+            else:
+                rankings[name] = all_products.nlargest(k, PRODUCT_RANKINGS[name][1])
+    return rankings, totals
+
+
+@register_aggregation('price_status_sales')
+def price_status_sales(df):
+    return df.groupby('PRICE_STATUS', observed=True).agg(
+        EXTENSION_AMOUNT=('EXTENSION_AMOUNT', 'sum'),
+        COUNT=('IS_RETURN', 'count'),
+    )
+
+
+@register_aggregation('store_format_sales')
+def store_format_sales(df):
+    return df.groupby('STORE_FORMAT', observed=True)['EXTENSION_AMOUNT'].sum()
+
+
+@register_aggregation('command_sales')
+def command_sales(df):
+    return df.groupby('COMMAND_NAME', observed=True)['EXTENSION_AMOUNT'].sum()
+
+
+@register_aggregation('store_sales')
+def store_sales(df):
+    return df.groupby(['SITE_ID', 'SITE_NAME'], observed=True).agg(
+        EXTENSION_AMOUNT=('EXTENSION_AMOUNT', 'sum'),
+        RETURN_LINES=('IS_RETURN', 'sum'),
+        LINES=('IS_RETURN', 'count'),
+    )
+
+
+# ----------------------
+# Transaction aggregates
+# ----------------------
+# One row per receipt (see retail_transactions.py). A receipt never spans two
+# sites or days, so SITE_ID and SALE_DATE are taken from any of its lines.
+# Dask pre-aggregates each partition before shuffling by SLIP_NO, so the
+# shuffle moves one partial row per receipt and partition rather than every
+# line, and happens once for all the measures. split_out=True lets Dask
+# spread the final combine over several output partitions (sized from the
+# input), so no single task reduces every receipt.
+@register_aggregation('transactions')
+def transactions(df):
+    return df.groupby('SLIP_NO', sort=False).agg(
+        SALE_DATE=('SALE_DATE', 'first'),
+        SITE_ID=('SITE_ID', 'first'),
+        HOUR=('HOUR', 'min'),
+        LINES=('IS_RETURN', 'count'),
+        QTY=('QTY', 'sum'),
+        EXTENSION_AMOUNT=('EXTENSION_AMOUNT', 'sum'),
+        RETURN_LINES=('IS_RETURN', 'sum'),
+        split_out=True,
+    )
+
+
+# ----------------------
+# OLAP cube
+# ----------------------
+# Finest grain the dashboard filters and charts need; every dashboard view is a
+# roll-up of this table (see retail_cube.py). SITE_NAME is functionally
+# dependent on SITE_ID so it does not add cells.
+CUBE_DIMENSIONS = ['SALE_DATE', 'HOUR', 'SITE_ID', 'SITE_NAME', 'COMMAND_NAME',
+                   'STORE_FORMAT', 'PRICE_STATUS', 'IS_RETURN']
+
+
+@register_aggregation('cube')
+def cube(df):
+    return df.groupby(CUBE_DIMENSIONS, dropna=False, observed=True).agg(
+        EXTENSION_AMOUNT=('EXTENSION_AMOUNT', 'sum'),
+        QTY=('QTY', 'sum'),
+        LINES=('IS_RETURN', 'count'),
+    )
+
+
+# ----------------------
+# Distinct-count sketches
+# ----------------------
+# HyperLogLog registers for SLIP_NO and ITEM_ID per day and site, in long form
+# (one row per non-empty register). Registers merge by taking the maximum, so
+# distinct counts for any selection of days and sites come from merging the
+# stored rows instead of rescanning data (see retail_sketches.py).
+SKETCH_DIMENSIONS = ['SALE_DATE', 'SITE_ID']
+SKETCH_COLUMNS = ['SLIP_NO', 'ITEM_ID']
+
+
+def _partition_sketches(part):
+    """Sketch registers of one partition, already reduced to one row per register"""
+    frames = []
+    for column in SKETCH_COLUMNS:
+        valid = part[column].notna()
+        registers, ranks = hyperloglog.register_ranks(
+            hyperloglog.hash_values(part.loc[valid, column].astype('int64')))
+        frame = part.loc[valid, SKETCH_DIMENSIONS].reset_index(drop=True)
+        frame['COLUMN'] = column
+        frame['REGISTER'] = registers
+        frame['RANK'] = ranks
+        frames.append(frame)
+    registers = pd.concat(frames, ignore_index=True)
+    return registers.groupby(SKETCH_DIMENSIONS + ['COLUMN', 'REGISTER'], dropna=False)['RANK'].max().reset_index()
+
+
+@register_aggregation('distinct_sketches')
+def distinct_sketches(df):
+    return df.map_partitions(_partition_sketches).groupby(
+        SKETCH_DIMENSIONS + ['COLUMN', 'REGISTER'], dropna=False)['RANK'].max()
@@ -0,0 +1,186 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from retail_cube import build_cube, load_cube
+
+anomalies_path = 'retail_analysis_results/store_anomalies.csv'
+
+# Trailing days each store's baseline is computed over (four of each weekday)
+WINDOW = 28
+# Fewest trailing days with sales before a day is scored
+MIN_PERIODS = 14
+# Absolute day-of-week-adjusted z-score from which a day is flagged
+THRESHOLD = 3.0
+
+
+def site_daily_matrix(cells):
+    """Net sales as a sites x days array
+
+    Days between a site's first and last day of sales without any sales are
+    0; days outside that span are NaN, so stores that opened late or
+    stopped reporting are not scored on days they did not trade.
+
+    Args:
+        cells (pd.DataFrame): Rows with SITE_ID, SITE_NAME, SALE_DATE and
+            EXTENSION_AMOUNT, e.g. cube cells from query_cube()
+
+    Returns:
+        tuple: (sites frame of SITE_ID/SITE_NAME, DatetimeIndex of every day, 2-D float array).
+        Without any sales the array is 0 x 0.
+    """
+    cells = cells.dropna(subset=['SITE_ID', 'SALE_DATE'])
+    if cells.empty:
+        sites = pd.DataFrame({'SITE_ID': pd.Series(dtype=cells['SITE_ID'].dtype),
+                              'SITE_NAME': pd.Series(dtype=object)})
+        return sites, pd.DatetimeIndex([], dtype='datetime64[ns]'), np.empty((0, 0))
+    site_codes, site_ids = pd.factorize(cells['SITE_ID'], sort=True)
+    first_day = cells['SALE_DATE'].min()
+    days = pd.date_range(first_day, cells['SALE_DATE'].max(), freq='D')
+    day_codes = (cells['SALE_DATE'] - first_day).dt.days.to_numpy()
+
+    shape = (len(site_ids), len(days))
+    cell_codes = site_codes * len(days) + day_codes
+    sales = np.bincount(cell_codes, weights=cells['EXTENSION_AMOUNT'].to_numpy(dtype='float64'),
+                        minlength=shape[0] * shape[1]).reshape(shape)
+    traded = (np.bincount(cell_codes, minlength=shape[0] * shape[1]) > 0).reshape(shape)
+    span = np.arange(len(days))
+    first = traded.argmax(axis=1)
+    last = len(days) - 1 - traded[:, ::-1].argmax(axis=1)
+    sales[(span < first[:, None]) | (span > last[:, None])] = np.nan
+
+    names = cells.drop_duplicates('SITE_ID').set_index('SITE_ID')['SITE_NAME']
+    sites = pd.DataFrame({'SITE_ID': site_ids, 'SITE_NAME': names.reindex(site_ids).astype(object).to_numpy()})
+    return sites, days, sales
+
+
+def _trailing_stats(values, window, min_periods):
+    """Mean and sample standard deviation of the previous window days, per row
+
+    The current day is excluded so an outlier does not inflate its own
+    baseline. NaNs are skipped; rows with fewer than min_periods values in
+    the window get NaN.
+    """
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    def trailing_sum(array):
+        cumulative = np.concatenate([np.zeros((array.shape[0], 1)), np.cumsum(array, axis=1)], axis=1)
+        end = np.arange(array.shape[1])
+        start = np.maximum(end - window, 0)
+        return cumulative[:, end] - cumulative[:, start]
+
+    count = trailing_sum(valid.astype('float64'))
+    total = trailing_sum(filled)
+    squares = trailing_sum(filled ** 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = (squares - total * mean) / (count - 1)
+    enough = count >= max(min_periods, 2)
+    mean = np.where(enough, mean, np.nan)
+    std = np.where(enough, np.sqrt(np.clip(variance, 0, None)), np.nan)
+    return mean, std
+
+
+def day_of_week_factors(sales, days):
+    """Each site's mean sales per weekday relative to its overall daily mean (sites x 7)"""
+    valid = ~np.isnan(sales)
+    weekdays = np.eye(7)[days.dayofweek]
+    totals = np.where(valid, sales, 0.0) @ weekdays
+    counts = valid.astype('float64') @ weekdays
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weekday_mean = totals / counts
+        overall_mean = totals.sum(axis=1) / counts.sum(axis=1)
+        return weekday_mean / overall_mean[:, None]
+
+
+def score_days(sales, days, window=WINDOW, min_periods=MIN_PERIODS):
+    """Day-of-week-adjusted z-scores of every site and day in one vectorized pass
+
+    Each day's sales are divided by the site's factor for that weekday, so a
+    quiet Sunday is compared with the store's usual Sundays rather than with
+    its weekdays. The adjusted series is scored against the mean and
+    standard deviation of its own trailing window.
+
+    Args:
+        sales (np.ndarray): Sites x days sales from site_daily_matrix()
+        days (pd.DatetimeIndex): The day of each column
+        window (int): Trailing days in the baseline
+        min_periods (int): Fewest trailing days with sales for a day to be scored
+
+    Returns:
+        tuple: (expected sales, z-scores), both sites x days arrays with NaN where unscored
+    """
+    factors = day_of_week_factors(sales, days)[:, days.dayofweek]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        adjusted = np.where(factors > 0, sales / factors, np.nan)
+    baseline, spread = _trailing_stats(adjusted, window, min_periods)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_scores = np.where(spread > 0, (adjusted - baseline) / spread, np.nan)
+    return baseline * factors, z_scores
+
+
+def detect_anomalies(cells, window=WINDOW, min_periods=MIN_PERIODS, threshold=THRESHOLD):
+    """Score every store's daily sales and flag the outlier days
+
+    Args:
+        cells (pd.DataFrame): Rows with SITE_ID, SITE_NAME, SALE_DATE and EXTENSION_AMOUNT
+        window (int): Trailing days in each store's baseline
+        min_periods (int): Fewest trailing days with sales for a day to be scored
+        threshold (float): Absolute z-score from which a day is flagged
+
+    Returns:
+        pd.DataFrame: One row per store and trading day with EXPECTED sales,
+        Z_SCORE and IS_ANOMALY
+    """
+    sites, days, sales = site_daily_matrix(cells)
+    expected, z_scores = score_days(sales, days, window, min_periods)
+    scores = pd.DataFrame({
+        'SITE_ID': np.repeat(sites['SITE_ID'].to_numpy(), len(days)),
+        'SITE_NAME': np.repeat(sites['SITE_NAME'].to_numpy(), len(days)),
+        'SALE_DATE': np.tile(days, len(sites)),
+        'EXTENSION_AMOUNT': sales.ravel(),
+        'EXPECTED': expected.ravel(),
+        'Z_SCORE': z_scores.ravel(),
+    })
+    scores = scores[scores['EXTENSION_AMOUNT'].notna()].reset_index(drop=True)
+    scores['IS_ANOMALY'] = scores['Z_SCORE'].abs() >= threshold
+    return scores
+
+
+def flagged_days(scores):
+    """The anomalous days of detect_anomalies(), most extreme first"""
+    flagged = scores[scores['IS_ANOMALY']].drop(columns='IS_ANOMALY')
+    return flagged.iloc[flagged['Z_SCORE'].abs().argsort()[::-1]].reset_index(drop=True)
+
+
+def save_anomalies(scores, file_path=anomalies_path):
+    """Write the flagged days as CSV"""
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    flagged = flagged_days(scores)
+    flagged.to_csv(file_path, index=False, date_format='%Y-%m-%d')
+    return flagged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Flag unusual daily sales for every store')
+    parser.add_argument('--output', type=str, default=anomalies_path, help='Output CSV path for the flagged days')
+    parser.add_argument('--window', type=int, default=WINDOW, help='Trailing days in each store baseline')
+    parser.add_argument('--min_periods', type=int, default=MIN_PERIODS,
+                        help='Fewest trailing days with sales before a day is scored')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='Absolute day-of-week-adjusted z-score from which a day is flagged')
+
+    args = parser.parse_args()
+
+    cube = load_cube()
+    if cube is None:
+        print("Building the retail cube from the full dataset...")
+        cube = build_cube()
+    scores = detect_anomalies(cube, args.window, args.min_periods, args.threshold)
+    flagged = save_anomalies(scores, args.output)
+    print(f"Scored {scores['SITE_ID'].nunique():,} stores over {scores['SALE_DATE'].nunique():,} days; "
+          f"{len(flagged):,} anomalous store-days saved to {args.output}")
+    print(flagged.head(20).to_string(index=False))
@@ -0,0 +1,153 @@
+import argparse
+import os
+
+import dask
+import numpy as np
+import pandas as pd
+from dask.diagnostics import ProgressBar
+from scipy import sparse
+
+from retail_data import load_item_lookup, read_retail_data, with_item_descriptions
+
+affinity_path = 'retail_analysis_results/product_affinity.csv'
+
+BASKET_COLUMNS = ['STORE_FORMAT', 'SLIP_NO', 'ITEM_ID']
+
+# Pairs seen in fewer baskets than this are dropped before ranking; lift on
+# a handful of baskets is mostly noise
+MIN_BASKETS = 10
+# Pairs reported per store format
+TOP_PAIRS = 50
+
+
+def _partition_cooccurrence(part):
+    """Upper triangle of the item-by-item co-occurrence matrix of one partition, per store format
+
+    Each store format's baskets become a sparse basket-by-item incidence
+    matrix B, and B.T @ B counts the baskets every pair of items shares.
+    Only non-zero cells are returned, as ITEM_A <= ITEM_B rows; the diagonal
+    (ITEM_A == ITEM_B) is the number of baskets containing the item.
+    """
+    part = part.drop_duplicates(['SLIP_NO', 'ITEM_ID'])
+    frames = []
+    for store_format, rows in part.groupby('STORE_FORMAT', observed=True):
+        basket_codes, baskets = pd.factorize(rows['SLIP_NO'])
+        item_codes, items = pd.factorize(rows['ITEM_ID'])
+        incidence = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (basket_codes, item_codes)),
+            shape=(len(baskets), len(items)),
+        )
+        counts = sparse.triu(incidence.T @ incidence).tocoo()
+        first, second = items[counts.row], items[counts.col]
+        frames.append(pd.DataFrame({
+            'STORE_FORMAT': pd.Categorical([store_format] * counts.nnz, dtype=part['STORE_FORMAT'].dtype),
+            'ITEM_A': np.minimum(first, second),
+            'ITEM_B': np.maximum(first, second),
+            'BASKETS': counts.data.astype('int64'),
+        }))
+    if not frames:
+        return _empty_pairs(part['STORE_FORMAT'].dtype)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _empty_pairs(store_format_dtype):
+    return pd.DataFrame({
+        'STORE_FORMAT': pd.Series(dtype=store_format_dtype),
+        'ITEM_A': pd.Series(dtype='int64'),
+        'ITEM_B': pd.Series(dtype='int64'),
+        'BASKETS': pd.Series(dtype='int64'),
+    })
+
+
+def _frequent_pairs(pairs, min_baskets):
+    """Item counts plus the pairs shared by at least min_baskets baskets"""
+    return pairs[(pairs['ITEM_A'] == pairs['ITEM_B']) | (pairs['BASKETS'] >= min_baskets)]
+
+
+def cooccurrence_counts(df, min_baskets=MIN_BASKETS):
+    """Lazy sparse co-occurrence counts of the items bought on the same receipt
+
+    Return lines are left out. Line items are shuffled by SLIP_NO so every
+    receipt is whole within one partition, each partition accumulates its
+    own sparse counts, and the counts are merged with a groupby sum. Pairs
+    below min_baskets are dropped before anything is collected; item
+    counts (the diagonal) are always kept.
+
+    Args:
+        df (dask.dataframe.DataFrame): Retail data with the BASKET_COLUMNS and RETURN_IND
+        min_baskets (int): Fewest shared baskets for a pair to be kept
+
+    Returns:
+        tuple: (lazy STORE_FORMAT/ITEM_A/ITEM_B/BASKETS frame, lazy baskets per STORE_FORMAT)
+    """
+    lines = df[df['RETURN_IND'] != 'Y'][BASKET_COLUMNS].dropna()
+    receipts = lines.shuffle('SLIP_NO')
+    pairs = receipts.map_partitions(_partition_cooccurrence, meta=_empty_pairs(df['STORE_FORMAT'].dtype))
+    pairs = pairs.groupby(['STORE_FORMAT', 'ITEM_A', 'ITEM_B'], observed=True)['BASKETS'].sum().reset_index()
+    pairs = pairs.map_partitions(_frequent_pairs, min_baskets)
+    baskets = lines.groupby('STORE_FORMAT', observed=True)['SLIP_NO'].nunique()
+    return pairs, baskets
+
+
+def affinity_rules(pairs, baskets, top_n=TOP_PAIRS, lookup=None):
+    """Support, confidence and lift of the strongest item pairs per store format
+
+    Args:
+        pairs (pd.DataFrame): Computed counts from cooccurrence_counts()
+        baskets (pd.Series): Computed baskets per STORE_FORMAT from cooccurrence_counts()
+        top_n (int): Pairs kept per store format, by lift
+        lookup (pd.Series, optional): ITEM_ID -> ITEM_DESC lookup table
+
+    Returns:
+        pd.DataFrame: One row per pair with SUPPORT (share of baskets with
+        both items), CONFIDENCE_A_B / CONFIDENCE_B_A (share of baskets with
+        one item that also hold the other) and LIFT (how much more often
+        the pair occurs than if the items were independent)
+    """
+    diagonal = pairs['ITEM_A'] == pairs['ITEM_B']
+    items = pairs[diagonal].set_index(['STORE_FORMAT', 'ITEM_A'])['BASKETS']
+    rules = pairs[~diagonal].reset_index(drop=True)
+
+    def item_baskets(column):
+        return items.reindex(pd.MultiIndex.from_frame(rules[['STORE_FORMAT', column]])).to_numpy()
+
+    total = rules['STORE_FORMAT'].map(baskets).astype('float64').to_numpy()
+    baskets_a, baskets_b = item_baskets('ITEM_A'), item_baskets('ITEM_B')
+    rules['SUPPORT'] = rules['BASKETS'] / total
+    rules['CONFIDENCE_A_B'] = rules['BASKETS'] / baskets_a
+    rules['CONFIDENCE_B_A'] = rules['BASKETS'] / baskets_b
+    rules['LIFT'] = rules['BASKETS'] * total / (baskets_a * baskets_b)
+
+    rules = rules.sort_values(['LIFT', 'BASKETS'], ascending=False)
+    rules = rules.groupby('STORE_FORMAT', observed=True).head(top_n).reset_index(drop=True)
+    lookup = lookup if lookup is not None else load_item_lookup()
+    rules = with_item_descriptions(rules, lookup, id_column='ITEM_A', desc_column='ITEM_A_DESC')
+    return with_item_descriptions(rules, lookup, id_column='ITEM_B', desc_column='ITEM_B_DESC')
+
+
+def build_affinity(file_path=affinity_path, min_baskets=MIN_BASKETS, top_n=TOP_PAIRS):
+    """Compute product affinity rules over the full retail dataset and write them as CSV"""
+    df = read_retail_data(columns=BASKET_COLUMNS + ['RETURN_IND'])
+    lazy_pairs, lazy_baskets = cooccurrence_counts(df, min_baskets)
+    with ProgressBar():
+        pairs, baskets = dask.compute(lazy_pairs, lazy_baskets)
+    rules = affinity_rules(pairs, baskets, top_n)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    rules.to_csv(file_path, index=False)
+    return rules
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Find products bought together, per store format')
+    parser.add_argument('--output', type=str, default=affinity_path, help='Output CSV path for the pair rules')
+    parser.add_argument('--min_baskets', type=int, default=MIN_BASKETS,
+                        help='Fewest shared baskets for a pair to be ranked')
+    parser.add_argument('--top', type=int, default=TOP_PAIRS, help='Pairs reported per store format')
+
+    args = parser.parse_args()
+
+    print("Counting item co-occurrence over all receipts...")
+    rules = build_affinity(args.output, args.min_baskets, args.top)
+    print(f"Product affinity rules saved to {args.output} ({len(rules):,} pairs)")
+    columns = ['STORE_FORMAT', 'ITEM_A_DESC', 'ITEM_B_DESC', 'BASKETS', 'SUPPORT', 'LIFT']
+    print(rules.groupby('STORE_FORMAT', observed=True).head(5)[columns].to_string(index=False))
@@ -0,0 +1,269 @@
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+
+# Set style for matplotlib
+plt.style.use('ggplot')
+sns.set(style="whitegrid")
+
+# Registry of the static charts. Each entry maps a PNG file name to the
+# tables it is drawn from and a function that draws it onto a new figure.
+# render_charts() only redraws a chart when those tables (or the function
+# itself) changed since the last run.
+CHARTS = {}
+
+MANIFEST_NAME = 'chart_manifest.json'
+
+
+def register_chart(file_name, *table_names, figsize=(15, 8)):
+    """Register a chart drawn from the named tables of build_tables()"""
+    def decorator(func):
+        CHARTS[file_name] = {'func': func, 'tables': table_names, 'figsize': figsize}
+        return func
+    return decorator
+
+
+def period_label(dates):
+    """Label for the months spanned by dates, e.g. 'Dec 2024 - Jan 2025'"""
+    dates = pd.to_datetime(pd.Series(dates)).dropna()
+    if dates.empty:
+        return 'no sales'
+    first, last = dates.min().strftime('%b %Y'), dates.max().strftime('%b %Y')
+    return first if first == last else f'{first} - {last}'
+
+
+# ----------------------
+# Temporal Trend Analysis
+# ----------------------
+@register_chart('daily_sales_trend.png', 'daily_sales', figsize=(15, 6))
+def daily_sales_trend(fig, tables):
+    daily_sales = tables['daily_sales']
+    plt.plot(daily_sales['SALE_DATE'], daily_sales['EXTENSION_AMOUNT'], marker='o', linestyle='-')
+    plt.title(f"Daily Sales Trend ({period_label(daily_sales['SALE_DATE'])})")
+    plt.xlabel('Date')
+    plt.ylabel('Sales Amount ($)')
+    plt.grid(True)
+
+
+@register_chart('weekly_sales_trend.png', 'weekly_sales', figsize=(12, 6))
+def weekly_sales_trend(fig, tables):
+    weekly_sales = tables['weekly_sales']
+    plt.bar(weekly_sales['WEEK'], weekly_sales['EXTENSION_AMOUNT'])
+    plt.title('Weekly Sales Trend')
+    plt.xlabel('Week Number')
+    plt.ylabel('Sales Amount ($)')
+    plt.grid(True, axis='y')
+
+
+@register_chart('sales_by_day_of_week.png', 'day_of_week_sales', figsize=(12, 6))
+def sales_by_day_of_week(fig, tables):
+    sns.barplot(x='DAY_OF_WEEK', y='EXTENSION_AMOUNT', data=tables['day_of_week_sales'])
+    plt.title('Sales by Day of Week')
+    plt.xlabel('Day of Week')
+    plt.ylabel('Sales Amount ($)')
+    plt.grid(True, axis='y')
+
+
+@register_chart('sales_by_hour.png', 'hourly_sales', figsize=(14, 6))
+def sales_by_hour(fig, tables):
+    sns.barplot(x='HOUR', y='EXTENSION_AMOUNT', data=tables['hourly_sales'])
+    plt.title('Sales by Hour of Day')
+    plt.xlabel('Hour of Day')
+    plt.ylabel('Sales Amount ($)')
+    plt.grid(True, axis='y')
+
+
+# ----------------------
+# Product Analysis
+# ----------------------
+@register_chart('top_products_revenue.png', 'top_products_revenue')
+def top_products_revenue(fig, tables):
+    sns.barplot(x='EXTENSION_AMOUNT', y='ITEM_DESC', data=tables['top_products_revenue'])
+    plt.title('Top 20 Products by Revenue')
+    plt.xlabel('Revenue ($)')
+    plt.ylabel('Product')
+    plt.grid(True, axis='x')
+
+
+@register_chart('top_products_quantity.png', 'top_products_quantity')
+def top_products_quantity(fig, tables):
+    sns.barplot(x='QTY', y='ITEM_DESC', data=tables['top_products_quantity'])
+    plt.title('Top 20 Products by Quantity Sold')
+    plt.xlabel('Quantity Sold')
+    plt.ylabel('Product')
+    plt.grid(True, axis='x')
+
+
+@register_chart('price_status_analysis.png', 'price_status_sales', 'price_status_count', figsize=(15, 6))
+def price_status_analysis(fig, tables):
+    ax1, ax2 = fig.subplots(1, 2)
+    sns.barplot(x='PRICE_STATUS', y='EXTENSION_AMOUNT', data=tables['price_status_sales'], ax=ax1)
+    ax1.set_title('Sales by Price Status')
+    ax1.set_xlabel('Price Status (R=Regular, P=Promotion, M=Markdown)')
+    ax1.set_ylabel('Sales Amount ($)')
+    ax1.grid(True, axis='y')
+
+    sns.barplot(x='PRICE_STATUS', y='COUNT', data=tables['price_status_count'], ax=ax2)
+    ax2.set_title('Transaction Count by Price Status')
+    ax2.set_xlabel('Price Status (R=Regular, P=Promotion, M=Markdown)')
+    ax2.set_ylabel('Number of Transactions')
+    ax2.grid(True, axis='y')
+
+
+# ----------------------
+# Store Analysis
+# ----------------------
+@register_chart('sales_by_store_format.png', 'store_format_sales', figsize=(10, 6))
+def sales_by_store_format(fig, tables):
+    sns.barplot(x='STORE_FORMAT', y='EXTENSION_AMOUNT', data=tables['store_format_sales'])
+    plt.title('Sales by Store Format')
+    plt.xlabel('Store Format')
+    plt.ylabel('Sales Amount ($)')
+    plt.grid(True, axis='y')
+
+
+@register_chart('sales_by_command.png', 'command_sales')
+def sales_by_command(fig, tables):
+    sns.barplot(x='EXTENSION_AMOUNT', y='COMMAND_NAME', data=tables['command_sales'])
+    plt.title('Sales by Command')
+    plt.xlabel('Sales Amount ($)')
+    plt.ylabel('Command Name')
+    plt.grid(True, axis='x')
+
+
+@register_chart('top_stores_revenue.png', 'store_sales')
+def top_stores_revenue(fig, tables):
+    sns.barplot(x='EXTENSION_AMOUNT', y='SITE_NAME', data=tables['store_sales'])
+    plt.title('Top 20 Stores by Revenue')
+    plt.xlabel('Revenue ($)')
+    plt.ylabel('Store Name')
+    plt.grid(True, axis='x')
+
+
+# ----------------------
+# Transaction Analysis
+# ----------------------
+@register_chart('transaction_size_distribution.png', 'transactions', figsize=(10, 6))
+def transaction_size_distribution(fig, tables):
+    sns.histplot(tables['transactions']['QTY'], bins=30, kde=True)
+    plt.title('Distribution of Transaction Size (Items per Transaction)')
+    plt.xlabel('Number of Items')
+    plt.ylabel('Frequency')
+    plt.grid(True)
+
+
+@register_chart('transaction_value_distribution.png', 'transactions', figsize=(10, 6))
+def transaction_value_distribution(fig, tables):
+    sns.histplot(tables['transactions']['EXTENSION_AMOUNT'], bins=30, kde=True)
+    plt.title('Distribution of Transaction Value')
+    plt.xlabel('Transaction Value ($)')
+    plt.ylabel('Frequency')
+    plt.grid(True)
+
+
+# ----------------------
+# Return Analysis
+# ----------------------
+@register_chart('top_products_return_rate.png', 'return_by_product')
+def top_products_return_rate(fig, tables):
+    sns.barplot(x='RETURN_RATE', y='ITEM_DESC', data=tables['return_by_product'])
+    plt.title('Top 20 Best Sellers by Return Rate')
+    plt.xlabel('Return Rate (%)')
+    plt.ylabel('Product')
+    plt.grid(True, axis='x')
+
+
+@register_chart('top_stores_return_rate.png', 'return_by_store')
+def top_stores_return_rate(fig, tables):
+    sns.barplot(x='RETURN_RATE', y='SITE_NAME', data=tables['return_by_store'])
+    plt.title('Top 20 Stores by Return Rate')
+    plt.xlabel('Return Rate (%)')
+    plt.ylabel('Store')
+    plt.grid(True, axis='x')
+
+
+# ----------------------
+# Rendering
+# ----------------------
+def chart_hash(file_name, tables):
+    """Fingerprint of a chart's input tables and drawing code"""
+    chart = CHARTS[file_name]
+    digest = hashlib.sha256(inspect.getsource(chart['func']).encode())
+    digest.update(repr(chart['figsize']).encode())
+    for name in chart['tables']:
+        table = tables[name]
+        digest.update(name.encode())
+        digest.update(repr(list(table.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def render_chart(file_name, tables, output_dir):
+    """Draw one registered chart, save it and close its figure"""
+    chart = CHARTS[file_name]
+    fig = plt.figure(figsize=chart['figsize'])
+    try:
+        chart['func'](fig, tables)
+        fig.tight_layout()
+        fig.savefig(os.path.join(output_dir, file_name))
+    finally:
+        plt.close(fig)
+    return file_name
+
+
+def _load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def render_charts(tables, output_dir, workers=None, force=False):
+    """Render every registered chart whose inputs changed since the last run
+
+    Charts are drawn in a process pool, each worker receiving only the tables
+    its charts read. The input hash of every saved chart is kept in a
+    manifest next to the PNGs; a chart whose hash matches and whose file
+    still exists is skipped.
+
+    Args:
+        tables (dict): Tables from build_tables()
+        output_dir (str): Directory for the PNGs and the manifest
+        workers (int, optional): Worker processes. Defaults to one per stale chart, up to the CPU count.
+        force (bool): Redraw every chart regardless of the manifest
+
+    Returns:
+        tuple: (list of rendered file names, list of skipped file names)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_manifest(output_dir)
+    hashes = {file_name: chart_hash(file_name, tables) for file_name in CHARTS}
+    stale = [file_name for file_name, digest in hashes.items()
+             if force or manifest.get(file_name) != digest
+             or not os.path.exists(os.path.join(output_dir, file_name))]
+    skipped = [file_name for file_name in CHARTS if file_name not in stale]
+
+    try:
+        if stale:
+            workers = workers or min(len(stale), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(render_chart, file_name,
+                                       {name: tables[name] for name in CHARTS[file_name]['tables']}, output_dir)
+                           for file_name in stale]
+                for future in futures:
+                    file_name = future.result()
+                    manifest[file_name] = hashes[file_name]
+    finally:
+        # Charts saved before a failure are not redrawn next time
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    return stale, skipped
@@ -0,0 +1,82 @@
+import contextlib
+import importlib.util
+import os
+
+import dask
+
+# Saved in the run's output directory unless --performance_report names another file
+performance_report_name = 'dask_performance_report.html'
+
+
+def add_cluster_arguments(parser):
+    """Add the options for running on a local distributed cluster to an argparse parser"""
+    group = parser.add_argument_group('Dask cluster')
+    group.add_argument('--cluster', action='store_true',
+                       help='Run on a local distributed cluster of worker processes instead of threads')
+    group.add_argument('--workers', type=int, default=None,
+                       help='Worker processes (default: chosen by Dask from the CPU count)')
+    group.add_argument('--threads-per-worker', type=int, default=None, help='Threads in each worker process')
+    group.add_argument('--memory-limit', type=str, default='auto',
+                       help="Memory per worker, e.g. '8GB'; workers spill to disk as they approach it")
+    group.add_argument('--spill-dir', type=str, default=None,
+                       help='Directory for spilled partitions and shuffle files (default: the system temp directory)')
+    group.add_argument('--blocksize', type=str, default='64MB', help='Target size of each Dask partition')
+    group.add_argument('--performance-report', type=str, default=None,
+                       help='HTML file for the task stream and performance report of a cluster run '
+                            f'(default: {performance_report_name} in the output directory)')
+    return parser
+
+
+@contextlib.contextmanager
+def dask_cluster(workers=None, threads_per_worker=None, memory_limit='auto', spill_dir=None,
+                 report_path=None):
+    """Run the enclosed Dask computations on a local distributed cluster
+
+    Worker processes sidestep the GIL on string-heavy pandas work, and each
+    worker spills partitions to spill_dir when it nears memory_limit instead
+    of exhausting RAM. The task stream, worker profiles and bandwidth of
+    everything computed inside the block are saved as an HTML performance
+    report (which needs bokeh installed).
+
+    Args:
+        workers (int, optional): Worker processes
+        threads_per_worker (int, optional): Threads in each worker
+        memory_limit (str or int): Memory per worker, e.g. '8GB', or 'auto'
+        spill_dir (str, optional): Directory for spilled data and shuffle files
+        report_path (str, optional): Where to save the performance report, None to skip it
+
+    Yields:
+        distributed.Client: Client connected to the cluster
+    """
+    from distributed import Client, LocalCluster, performance_report
+
+    config = {}
+    if spill_dir is not None:
+        os.makedirs(spill_dir, exist_ok=True)
+        config['temporary-directory'] = spill_dir
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(dask.config.set(config))
+        cluster = stack.enter_context(LocalCluster(
+            n_workers=workers,
+            threads_per_worker=threads_per_worker,
+            memory_limit=memory_limit,
+            local_directory=spill_dir,
+            processes=True,
+        ))
+        client = stack.enter_context(Client(cluster))
+        worker_info = client.scheduler_info()['workers'].values()
+        print(f"Dask cluster: {len(worker_info)} workers, "
+              f"{sum(info['nthreads'] for info in worker_info)} threads, dashboard at {client.dashboard_link}")
+
+        if report_path is not None:
+            if importlib.util.find_spec('bokeh') is None:
+                print("bokeh is not installed; running without a performance report")
+                report_path = None
+            else:
+                os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+                stack.enter_context(performance_report(filename=report_path))
+        yield client
+
+    if report_path is not None:
+        print(f"Saved Dask performance report to {report_path}")
@@ -0,0 +1,95 @@
+import argparse
+import os
+
+import pandas as pd
+
+from retail_aggregations import CUBE_DIMENSIONS, compute_aggregations
+from retail_data import ANALYSIS_COLUMNS, prepare_retail_data, read_retail_data
+
+cube_path = 'retail_analysis_results/retail_cube.parquet'
+
+CUBE_MEASURES = ['EXTENSION_AMOUNT', 'QTY', 'LINES']
+
+# String dimensions are stored as categoricals so filtering the cube compares
+# integer codes rather than strings
+CATEGORICAL_DIMENSIONS = ['SITE_NAME', 'COMMAND_NAME', 'STORE_FORMAT', 'PRICE_STATUS']
+
+
+def finalize_cube(cube):
+    """Flatten a computed cube and give its dimensions compact dtypes"""
+    cube = cube.reset_index()
+    for column in CATEGORICAL_DIMENSIONS:
+        cube[column] = cube[column].astype('category')
+    cube['SALE_DATE'] = pd.to_datetime(cube['SALE_DATE']).dt.normalize()
+    cube['IS_RETURN'] = cube['IS_RETURN'].astype(bool)
+    cube['LINES'] = cube['LINES'].astype('int64')
+    return cube
+
+
+def save_cube(cube, file_path=cube_path):
+    """Persist the cube as Parquet"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    cube.to_parquet(file_path, index=False)
+
+
+def load_cube(file_path=cube_path):
+    """Load a persisted cube, or None if it has not been built yet"""
+    if not os.path.exists(file_path):
+        return None
+    return pd.read_parquet(file_path)
+
+
+def build_cube(file_path=cube_path):
+    """Compute the cube from the full retail dataset and persist it"""
+    df = prepare_retail_data(read_retail_data(columns=ANALYSIS_COLUMNS))
+    cube = finalize_cube(compute_aggregations(df, ['cube'])['cube'])
+    save_cube(cube, file_path)
+    return cube
+
+
+def query_cube(cube, start_date=None, end_date=None, store_format=None, command=None,
+               price_status=None, include_returns=True):
+    """Return the cube cells matching the dashboard filters
+
+    Args:
+        cube (pd.DataFrame): Cube from load_cube() or build_cube()
+        start_date (date-like, optional): First SALE_DATE to include
+        end_date (date-like, optional): Last SALE_DATE to include
+        store_format (str, optional): STORE_FORMAT to keep, None for all
+        command (str, optional): COMMAND_NAME to keep, None for all
+        price_status (str, optional): PRICE_STATUS to keep, None for all
+        include_returns (bool): Keep return lines
+
+    Returns:
+        pd.DataFrame: Matching cube cells
+    """
+    mask = pd.Series(True, index=cube.index)
+    if start_date is not None:
+        mask &= cube['SALE_DATE'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= cube['SALE_DATE'] <= pd.Timestamp(end_date)
+    if store_format is not None:
+        mask &= cube['STORE_FORMAT'] == store_format
+    if command is not None:
+        mask &= cube['COMMAND_NAME'] == command
+    if price_status is not None:
+        mask &= cube['PRICE_STATUS'] == price_status
+    if not include_returns:
+        mask &= ~cube['IS_RETURN'].astype(bool)
+    return cube[mask]
+
+
+def rollup(cells, by):
+    """Sum the cube measures over the given dimension(s)"""
+    return cells.groupby(by, observed=True)[CUBE_MEASURES].sum().reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the pre-aggregated retail cube used by the dashboard')
+    parser.add_argument('--output', type=str, default=cube_path, help='Output file path for the cube')
+
+    args = parser.parse_args()
+
+    print("Building retail cube from the full dataset...")
+    cube = build_cube(args.output)
+    print(f"Cube saved to {args.output} ({len(cube):,} cells)")
@@ -0,0 +1,647 @@
+import argparse
+import calendar
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import dask
+import dask.dataframe as dd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
+csv_path = 'data/convertedcsv/MCCS_RetailData.csv'
+parquet_path = 'data/rawdata/MCCS_RetailData.parquet'
+sample_parquet_path = 'retail_data_sample.parquet'
+
+# Hive-partitioned Parquet dataset written by build_parquet_dataset():
+#   SALE_MONTH=2024-12/SALE_DAY=2024-12-05/COMMAND_NAME=YUMA/part-0.parquet
+# SALE_DAY holds the full ISO date so a date range maps directly onto a
+# range of partition directories.
+dataset_path = 'data/rawdata/MCCS_RetailData_dataset'
+
+PARTITION_COLUMNS = ['SALE_MONTH', 'SALE_DAY', 'COMMAND_NAME']
+
+# Low-cardinality string columns are loaded as categoricals whose categories
+# come from dictionaries persisted with the data, so every partition, run
+# and dashboard session shares the same codes and groupbys compare integers.
+# The dictionaries are saved with the source_fingerprint() of the data they
+# were collected from and rebuilt once the data changes under them.
+# ITEM_DESC is not loaded at all: products are grouped on ITEM_ID and their
+# descriptions looked up afterwards (see with_item_descriptions).
+CATEGORICAL_COLUMNS = ['SITE_NAME', 'COMMAND_NAME', 'STORE_FORMAT', 'PRICE_STATUS', 'RETURN_IND']
+# A partitioned dataset keeps its dictionaries and item lookup table next to
+# its root directory, named after it with these suffixes (outside it, so
+# Parquet readers never take them for data). Without a dataset (CSV or
+# monolithic Parquet fallback) they are kept at dictionary_path and
+# item_lookup_path.
+DICTIONARY_SUFFIX = '_dictionaries.json'
+ITEM_LOOKUP_SUFFIX = '_items.parquet'
+dictionary_path = 'data/rawdata/MCCS_RetailData_dictionaries.json'
+item_lookup_path = 'data/rawdata/MCCS_RetailData_items.parquet'
+
+DATE_COLUMNS = ['SALE_DATE', 'SALE_DATE_TIME']
+
+# Formats tried on a sample of each date column. The one that parses the
+# most sampled values is used for the whole column (stray unparseable values
+# become NaT); only if none fits does parsing fall back to pandas'
+# per-element inference.
+DATETIME_FORMATS = [
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+    '%m/%d/%Y', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y %I:%M:%S %p',
+]
+FORMAT_SAMPLE_SIZE = 1000
+
+# DAY_OF_WEEK is an integer code (Monday=0); DAY_NAMES[code] is its display name
+DAY_NAMES = list(calendar.day_name)
+
+# Explicit types for the columns we know about; anything else in the extract
+# keeps the type pyarrow infers for it
+COLUMN_TYPES = {
+    'SALE_DATE': pa.string(),
+    'SALE_DATE_TIME': pa.string(),
+    'STORE_FORMAT': pa.string(),
+    'COMMAND_NAME': pa.string(),
+    'SITE_ID': pa.int64(),
+    'SITE_NAME': pa.string(),
+    'SLIP_NO': pa.int64(),
+    'LINE': pa.int64(),
+    'ITEM_ID': pa.int64(),
+    'ITEM_DESC': pa.string(),
+    'EXTENSION_AMOUNT': pa.float64(),
+    'QTY': pa.float64(),
+    'RETURN_IND': pa.string(),
+    'PRICE_STATUS': pa.string(),
+}
+
+# Columns used by the analysis script and the dashboard
+ANALYSIS_COLUMNS = [
+    'SALE_DATE', 'SALE_DATE_TIME', 'STORE_FORMAT', 'COMMAND_NAME', 'SITE_ID', 'SITE_NAME',
+    'SLIP_NO', 'ITEM_ID', 'EXTENSION_AMOUNT', 'QTY', 'RETURN_IND', 'PRICE_STATUS',
+]
+
+
+def _source_batches(source_path, block_size):
+    """Stream record batches from the CSV extract or a monolithic Parquet file"""
+    if source_path.endswith('.parquet'):
+        yield from ds.dataset(source_path).to_batches()
+        return
+
+    reader = pacsv.open_csv(
+        source_path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(column_types=COLUMN_TYPES, strings_can_be_null=True),
+    )
+    for batch in reader:
+        yield batch
+
+
+def detect_datetime_format(values):
+    """The DATETIME_FORMATS entry that parses most of a sample of the values, or None"""
+    sample = pd.Series(values).dropna().astype(str).head(FORMAT_SAMPLE_SIZE)
+    best, best_count = None, 0
+    for fmt in DATETIME_FORMATS:
+        count = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if count > best_count:
+            best, best_count = fmt, count
+        if best_count == len(sample):
+            break
+    return best
+
+
+def parse_datetimes(values, fmt=None):
+    """Parse a pandas Series of date strings with a single explicit format
+
+    The format is detected from a sample when not given. Each distinct
+    string is parsed once and the result mapped back onto the rows, so a
+    column like SALE_DATE with a few dozen distinct days costs a hash pass
+    rather than millions of parses. Unparseable values become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    fmt = fmt or detect_datetime_format(values)
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Index(uniques, dtype=object), format=fmt, errors='coerce').as_unit('ns')
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name)
+
+
+def _parse_dates(df):
+    """Lazily parse the DATE_COLUMNS of a Dask frame that are still strings
+
+    The format of each column is detected once, from the first partition,
+    which is the only data read up front; every partition is then parsed
+    with that format. Should the first partition hold no dates (e.g. all its
+    rows were filtered out), each partition detects the format itself.
+    """
+    columns = [column for column in DATE_COLUMNS
+               if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column].dtype)]
+    if not columns:
+        return df
+    sample = df[columns].get_partition(0).compute()
+    for column in columns:
+        fmt = detect_datetime_format(sample[column])
+        df[column] = df[column].map_partitions(parse_datetimes, fmt, meta=(column, 'datetime64[ns]'))
+    return df
+
+
+def _with_partition_columns(batch, formats):
+    """Parse the date columns of a batch and add the SALE_MONTH/SALE_DAY partition keys
+
+    Args:
+        batch (pa.RecordBatch): Rows from the source
+        formats (dict): Date column -> detected format, shared by every batch
+            of a source. Columns not in it yet are detected from this batch.
+    """
+    table = pa.Table.from_batches([batch])
+    for column in DATE_COLUMNS:
+        if column not in table.column_names:
+            continue
+        values = table[column]
+        if not pa.types.is_timestamp(values.type):
+            values = values.to_pandas()
+            if formats.get(column) is None:
+                formats[column] = detect_datetime_format(values)
+            values = pa.Array.from_pandas(parse_datetimes(values, formats[column]))
+        values = values.cast(pa.timestamp('ns'))
+        table = table.set_column(table.schema.get_field_index(column), column, values)
+
+    sale_date = pd.Series(table['SALE_DATE'].to_pandas())
+    table = table.append_column('SALE_MONTH', pa.array(sale_date.dt.strftime('%Y-%m'), pa.string()))
+    table = table.append_column('SALE_DAY', pa.array(sale_date.dt.strftime('%Y-%m-%d'), pa.string()))
+    return table.to_batches()
+
+
+def _write_dataset(source_path, output_path, block_size, skip_days=frozenset(), basename_template=None):
+    """Stream the source into the partitioned dataset, collecting dictionaries on the way
+
+    Rows whose SALE_DAY is in skip_days are dropped before writing. The
+    format of each date column is detected once, from the first batch that
+    holds its values, and every batch is parsed with it.
+
+    Returns:
+        tuple: (number of files written, column -> set of categories, items frame)
+    """
+    dictionaries = {column: set() for column in CATEGORICAL_COLUMNS}
+    items = pd.DataFrame({'ITEM_ID': pd.Series(dtype='int64'), 'ITEM_DESC': pd.Series(dtype=object)})
+    formats = {}
+
+    def collect_dictionaries(batch):
+        nonlocal items
+        for column, values in dictionaries.items():
+            if column in batch.schema.names:
+                values.update(value for value in pc.unique(batch.column(column)).to_pylist() if value is not None)
+        if 'ITEM_ID' in batch.schema.names and 'ITEM_DESC' in batch.schema.names:
+            batch_items = pd.DataFrame({'ITEM_ID': batch.column('ITEM_ID').to_pandas(),
+                                        'ITEM_DESC': batch.column('ITEM_DESC').to_pandas()})
+            items = pd.concat([items, batch_items.dropna(subset=['ITEM_ID'])]).drop_duplicates('ITEM_ID')
+        return batch
+
+    def skip(batch):
+        if skip_days:
+            batch = batch.filter(pc.invert(pc.is_in(batch.column('SALE_DAY'), pa.array(sorted(skip_days)))))
+        return batch
+
+    batches = (collect_dictionaries(kept)
+               for batch in _source_batches(source_path, block_size)
+               for converted in _with_partition_columns(batch, formats)
+               for kept in [skip(converted)] if kept.num_rows)
+    first = next(batches, None)
+    if first is None:
+        return 0, dictionaries, items
+
+    def all_batches():
+        yield first
+        yield from batches
+
+    parquet_format = ds.ParquetFileFormat()
+    written = []
+    ds.write_dataset(
+        all_batches(),
+        output_path,
+        schema=first.schema,
+        format=parquet_format,
+        partitioning=ds.partitioning(
+            pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]),
+            flavor='hive',
+        ),
+        file_options=parquet_format.make_write_options(
+            compression='zstd',
+            use_dictionary=True,
+            write_statistics=True,
+        ),
+        basename_template=basename_template,
+        existing_data_behavior='overwrite_or_ignore',
+        min_rows_per_group=128 * 1024,
+        max_rows_per_group=1024 * 1024,
+        max_partitions=4096,
+        file_visitor=lambda written_file: written.append(written_file.path),
+    )
+    return len(written), dictionaries, items
+
+
+def build_parquet_dataset(source_path=csv_path, output_path=dataset_path, block_size=64 * 1024 * 1024,
+                          overwrite=False):
+    """Convert the retail extract into a Hive-partitioned Parquet dataset
+
+    Rows are streamed from the source in blocks, so the full extract is never
+    held in memory. Each SALE_DAY/COMMAND_NAME directory gets its own files
+    written with zstd compression, dictionary-encoded strings and row-group
+    statistics. The categorical dictionaries and the ITEM_ID lookup table
+    are collected on the way and saved next to output_path with
+    save_dictionaries().
+
+    Args:
+        source_path (str): Retail CSV extract or monolithic Parquet file
+        output_path (str): Root directory of the partitioned dataset
+        block_size (int): Bytes of CSV parsed per batch
+        overwrite (bool): Replace an existing dataset at output_path
+
+    Returns:
+        int: Number of Parquet files written
+    """
+    if os.path.exists(output_path):
+        if not overwrite:
+            raise FileExistsError(f"{output_path} already exists. Pass overwrite=True to rebuild it.")
+        shutil.rmtree(output_path)
+
+    file_count, dictionaries, items = _write_dataset(source_path, output_path, block_size)
+    save_dictionaries({column: sorted(values) for column, values in dictionaries.items()},
+                      items.set_index('ITEM_ID')['ITEM_DESC'], output_path)
+    return file_count
+
+
+def dataset_days(output_path=dataset_path):
+    """SALE_DAY values that already have partition directories in the dataset"""
+    days = set()
+    if not os.path.isdir(output_path):
+        return days
+    for month in os.listdir(output_path):
+        if month.startswith('SALE_MONTH='):
+            days.update(day.split('=', 1)[1] for day in os.listdir(os.path.join(output_path, month))
+                        if day.startswith('SALE_DAY='))
+    return days
+
+
+def append_to_dataset(source_path, output_path=dataset_path, block_size=64 * 1024 * 1024):
+    """Add a new retail extract (e.g. a daily file) to the partitioned dataset
+
+    Only days that are not in the dataset yet are written, so appending an
+    overlapping or repeated extract never duplicates rows. New categories
+    and items are merged into the persisted dictionaries.
+
+    Args:
+        source_path (str): Retail CSV extract or Parquet file with the new rows
+        output_path (str): Root directory of the partitioned dataset
+        block_size (int): Bytes of CSV parsed per batch
+
+    Returns:
+        list: The SALE_DAY values that were added, in order
+    """
+    existing = dataset_days(output_path)
+    # Checked before writing, since the new files change the fingerprint
+    current = _current_dictionaries(output_path)
+    run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    file_count, dictionaries, items = _write_dataset(source_path, output_path, block_size, skip_days=existing,
+                                                     basename_template=f'part-{run_id}-{{i}}.parquet')
+    if file_count == 0:
+        return []
+
+    if current is None:
+        # Missing or stale dictionaries cannot be extended; collect them from all the data
+        build_dictionaries(output_path)
+        return sorted(dataset_days(output_path) - existing)
+    for column, categories in current.items():
+        dictionaries.setdefault(column, set()).update(categories)
+    lookup = load_item_lookup(output_path)
+    items = items.set_index('ITEM_ID')['ITEM_DESC']
+    if lookup is not None:
+        items = pd.concat([lookup, items[~items.index.isin(lookup.index)]])
+    save_dictionaries({column: sorted(values) for column, values in dictionaries.items()}, items, output_path)
+    return sorted(dataset_days(output_path) - existing)
+
+
+def dictionary_files(dataset_dir=dataset_path):
+    """Paths of the dictionaries and item lookup table for the data read via dataset_dir
+
+    Returns:
+        tuple: (dictionary JSON path, item lookup Parquet path)
+    """
+    if os.path.isdir(dataset_dir):
+        root = os.path.normpath(dataset_dir)
+        return root + DICTIONARY_SUFFIX, root + ITEM_LOOKUP_SUFFIX
+    return dictionary_path, item_lookup_path
+
+
+def save_dictionaries(dictionaries, items, dataset_dir=dataset_path):
+    """Persist the categorical dictionaries and the ITEM_ID -> ITEM_DESC lookup table
+
+    The dictionaries are stored with the current source_fingerprint(), so
+    they must be saved after the data they describe has been written.
+
+    Args:
+        dictionaries (dict): Column -> sorted list of categories
+        items (pd.Series): ITEM_DESC indexed by ITEM_ID
+        dataset_dir (str): Partitioned dataset the data is read from (see dictionary_files())
+    """
+    dictionary_file, item_file = dictionary_files(dataset_dir)
+    os.makedirs(os.path.dirname(dictionary_file) or '.', exist_ok=True)
+    with open(dictionary_file, 'w') as f:
+        json.dump({'source_fingerprint': source_fingerprint(dataset_dir), 'dictionaries': dictionaries}, f, indent=2)
+    items.rename('ITEM_DESC').rename_axis('ITEM_ID').reset_index().to_parquet(item_file, index=False)
+
+
+def build_dictionaries(dataset_dir=dataset_path):
+    """Collect the dictionaries and item lookup table from the data in one pass, and persist them"""
+    print("Building categorical dictionaries and the item lookup table...")
+    df = read_retail_data(columns=CATEGORICAL_COLUMNS + ['ITEM_ID', 'ITEM_DESC'], categorize=False,
+                          dataset_dir=dataset_dir)
+    lazy_uniques = [df[column].dropna().unique() for column in CATEGORICAL_COLUMNS]
+    *uniques, items = dask.compute(*lazy_uniques, df.groupby('ITEM_ID')['ITEM_DESC'].first())
+    dictionaries = {column: sorted(str(value) for value in values)
+                    for column, values in zip(CATEGORICAL_COLUMNS, uniques)}
+    save_dictionaries(dictionaries, items, dataset_dir)
+    return dictionaries
+
+
+def _current_dictionaries(dataset_dir=dataset_path):
+    """The persisted dictionaries if they were built from the current source data, else None"""
+    dictionary_file, _ = dictionary_files(dataset_dir)
+    if not os.path.exists(dictionary_file):
+        return None
+    with open(dictionary_file) as f:
+        stored = json.load(f)
+    if stored.get('source_fingerprint') != source_fingerprint(dataset_dir):
+        return None
+    return stored['dictionaries']
+
+
+def load_dictionaries(dataset_dir=dataset_path):
+    """Load the persisted categorical dictionaries, (re)building them when missing or stale"""
+    dictionaries = _current_dictionaries(dataset_dir)
+    if dictionaries is None:
+        if os.path.exists(dictionary_files(dataset_dir)[0]):
+            print("The retail data changed since the dictionaries were built")
+        dictionaries = build_dictionaries(dataset_dir)
+    return dictionaries
+
+
+def _to_categorical(values, dtype):
+    """Convert a series to dtype, refusing values that are not among its categories"""
+    unknown = values.notna() & ~values.isin(dtype.categories)
+    if unknown.any():
+        raise ValueError(f"{values.name} has values missing from the categorical dictionaries "
+                         f"({sorted(values[unknown].astype(str).unique())[:5]}); rebuild them with build_dictionaries()")
+    return values.astype(dtype)
+
+
+def apply_dictionaries(df, dictionaries=None, dataset_dir=dataset_path):
+    """Convert the CATEGORICAL_COLUMNS present in df to categoricals with the shared categories
+
+    A value outside the categories raises ValueError (when the partition
+    holding it is computed) instead of silently becoming NaN. Without
+    explicit dictionaries, those of the data read via dataset_dir are used.
+    """
+    dictionaries = dictionaries if dictionaries is not None else load_dictionaries(dataset_dir)
+    for column, categories in dictionaries.items():
+        if column in df.columns:
+            dtype = pd.CategoricalDtype(categories)
+            if isinstance(df, dd.DataFrame):
+                df[column] = df[column].map_partitions(_to_categorical, dtype,
+                                                       meta=pd.Series(dtype=dtype, name=column))
+            else:
+                df[column] = _to_categorical(df[column], dtype)
+    return df
+
+
+def load_item_lookup(dataset_dir=dataset_path):
+    """ITEM_DESC indexed by ITEM_ID, or None if the lookup table has not been built yet"""
+    _, item_file = dictionary_files(dataset_dir)
+    if not os.path.exists(item_file):
+        return None
+    return pd.read_parquet(item_file).set_index('ITEM_ID')['ITEM_DESC']
+
+
+def with_item_descriptions(frame, lookup=None, id_column='ITEM_ID', desc_column='ITEM_DESC'):
+    """Add the description of the items in id_column to a pandas frame via the lookup table"""
+    lookup = lookup if lookup is not None else load_item_lookup()
+    frame = frame.copy()
+    if lookup is None:
+        descriptions = frame[id_column].astype(str)
+    else:
+        descriptions = frame[id_column].map(lookup).fillna(frame[id_column].astype(str))
+    frame.insert(frame.columns.get_loc(id_column) + 1, desc_column, descriptions)
+    return frame
+
+
+# Value filters that can be pushed into the Parquet read. COMMAND_NAME is a
+# partition key; the others are checked against row-group statistics and
+# then row by row.
+VALUE_FILTER_COLUMNS = {
+    'commands': 'COMMAND_NAME',
+    'store_formats': 'STORE_FORMAT',
+    'price_statuses': 'PRICE_STATUS',
+    'site_ids': 'SITE_ID',
+}
+
+
+def _dataset_filters(start_date=None, end_date=None, sale_days=None, **values):
+    """Translate the supported predicates into read_parquet filters"""
+    filters = []
+    if start_date is not None:
+        filters.append(('SALE_DAY', '>=', pd.Timestamp(start_date).strftime('%Y-%m-%d')))
+    if end_date is not None:
+        filters.append(('SALE_DAY', '<=', pd.Timestamp(end_date).strftime('%Y-%m-%d')))
+    if sale_days is not None:
+        filters.append(('SALE_DAY', 'in', list(sale_days)))
+    for name, column in VALUE_FILTER_COLUMNS.items():
+        if values.get(name):
+            filters.append((column, 'in', list(values[name])))
+    return filters or None
+
+
+def _apply_filters(df, start_date=None, end_date=None, sale_days=None, **values):
+    """Apply the supported predicates to a frame read without pushdown"""
+    if start_date is not None or end_date is not None or sale_days is not None:
+        df = _parse_dates(df)
+        if start_date is not None:
+            df = df[df['SALE_DATE'] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            df = df[df['SALE_DATE'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+        if sale_days is not None:
+            df = df[df['SALE_DATE'].dt.strftime('%Y-%m-%d').isin(list(sale_days))]
+    for name, column in VALUE_FILTER_COLUMNS.items():
+        if values.get(name):
+            df = df[df[column].isin(list(values[name]))]
+    return df
+
+
+def read_retail_data(columns=None, start_date=None, end_date=None, commands=None, store_formats=None,
+                     price_statuses=None, site_ids=None, sale_days=None, blocksize="64MB", categorize=True,
+                     dataset_dir=dataset_path):
+    """Lazily read the retail data, preferring the partitioned Parquet dataset
+
+    With the partitioned dataset, only the requested columns are read, the
+    date and command predicates prune partition directories before any data
+    is touched, and the remaining value filters are pushed into the Parquet
+    reader. The CSV and monolithic Parquet fallbacks apply the same
+    predicates after reading.
+
+    Args:
+        columns (list, optional): Columns to read. Defaults to all columns.
+        start_date (date-like, optional): First SALE_DATE to include
+        end_date (date-like, optional): Last SALE_DATE to include
+        commands (list, optional): COMMAND_NAME values to include
+        store_formats (list, optional): STORE_FORMAT values to include
+        price_statuses (list, optional): PRICE_STATUS values to include
+        site_ids (list, optional): SITE_ID values to include
+        sale_days (list, optional): SALE_DATE days to include, as 'YYYY-MM-DD' strings
+        blocksize (str): Target size of each Dask partition
+        categorize (bool): Load CATEGORICAL_COLUMNS as categoricals with the persisted dictionaries
+        dataset_dir (str): Partitioned dataset to read, when it exists
+
+    Returns:
+        dask.dataframe.DataFrame: The retail data
+    """
+    values = {'commands': commands, 'store_formats': store_formats, 'price_statuses': price_statuses,
+              'site_ids': site_ids}
+
+    if os.path.isdir(dataset_dir):
+        print(f"Reading from partitioned Parquet dataset: {dataset_dir}")
+        df = dd.read_parquet(
+            dataset_dir,
+            columns=columns,
+            filters=_dataset_filters(start_date, end_date, sale_days, **values),
+            dataset={'partitioning': 'hive'},
+            # Each partition directory holds a small file; combine them into
+            # blocksize-sized Dask partitions so groupbys don't shuffle
+            # thousands of tiny partitions
+            split_row_groups='adaptive',
+            aggregate_files=True,
+            blocksize=blocksize,
+        )
+        # Hive partition keys come back as categoricals; keep them plain strings
+        for column in PARTITION_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype(str)
+        return apply_dictionaries(df, dataset_dir=dataset_dir) if categorize else df
+
+    if os.path.exists(csv_path):
+        print(f"Reading from CSV file: {csv_path}")
+        df = dd.read_csv(csv_path, assume_missing=True, blocksize=blocksize, usecols=columns)
+    elif os.path.exists(parquet_path):
+        print(f"CSV file not found. Reading from Parquet file: {parquet_path}")
+        df = dd.read_parquet(parquet_path, columns=columns)
+    elif os.path.exists(sample_parquet_path):
+        print(f"Using sample Parquet file: {sample_parquet_path}")
+        df = dd.read_parquet(sample_parquet_path, columns=columns)
+    else:
+        raise FileNotFoundError("Could not find retail data in CSV or Parquet format. Please ensure either file exists.")
+    df = _apply_filters(df, start_date, end_date, sale_days, **values)
+    return apply_dictionaries(df, dataset_dir=dataset_dir) if categorize else df
+
+
+def source_files(dataset_dir=dataset_path):
+    """The files read_retail_data() reads from, in the same order of preference"""
+    if os.path.isdir(dataset_dir):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(dataset_dir)
+                      for name in names if name.endswith('.parquet'))
+    for path in (csv_path, parquet_path, sample_parquet_path):
+        if os.path.exists(path):
+            return [path]
+    return []
+
+
+def source_fingerprint(dataset_dir=dataset_path):
+    """Cheap fingerprint of the retail source data from file paths, sizes and modification times
+
+    Appending days to the dataset or replacing the extract changes it;
+    rereading unchanged files does not, and no data is opened to compute it.
+    """
+    digest = hashlib.sha256()
+    for path in source_files(dataset_dir):
+        stat = os.stat(path)
+        digest.update(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+def prepare_retail_data(df):
+    """Add the parsed dates and derived columns every aggregation relies on"""
+    # The partitioned dataset already stores timestamps; the CSV fallback is
+    # parsed here with one detected format per column
+    df = _parse_dates(df)
+
+    # Calendar fields as integer codes; DAY_NAMES turns DAY_OF_WEEK back into names for display
+    df['MONTH'] = df['SALE_DATE'].dt.month
+    df['DAY_OF_WEEK'] = df['SALE_DATE'].dt.dayofweek
+    df['HOUR'] = df['SALE_DATE_TIME'].dt.hour
+
+    # Create a flag for returns
+    df['IS_RETURN'] = df['RETURN_IND'] == 'Y'
+    return df
+
+
+def memory_report(partitions=1, dataset_dir=dataset_path):
+    """Bytes per column of the first partitions loaded as plain strings vs with the categorical schema
+
+    Args:
+        partitions (int): Number of Dask partitions to load for the comparison
+        dataset_dir (str): Partitioned dataset to read, when it exists
+
+    Returns:
+        pd.DataFrame: BEFORE_BYTES and AFTER_BYTES per column, with a TOTAL row.
+        ITEM_DESC is not loaded with the schema; its AFTER_BYTES is the share
+        of the ITEM_ID lookup table needed for the items in these rows.
+    """
+    plain = read_retail_data(columns=ANALYSIS_COLUMNS + ['ITEM_DESC'], categorize=False, dataset_dir=dataset_dir)
+    before = plain.partitions[:partitions].compute()
+    after = apply_dictionaries(before.drop(columns='ITEM_DESC'), dataset_dir=dataset_dir)
+
+    report = pd.DataFrame({
+        'BEFORE_BYTES': before.memory_usage(index=False, deep=True),
+        'AFTER_BYTES': after.memory_usage(index=False, deep=True),
+    }).reindex(before.columns)
+    lookup = load_item_lookup(dataset_dir)
+    if lookup is not None:
+        items = lookup[lookup.index.isin(before['ITEM_ID'].unique())]
+        report.loc['ITEM_DESC', 'AFTER_BYTES'] = items.memory_usage(deep=True)
+    report = report.fillna(0).astype('int64')
+    report.loc['TOTAL'] = report.sum()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert the MCCS retail extract into a partitioned Parquet dataset')
+    parser.add_argument('--source', type=str, default=csv_path,
+                        help='Retail CSV extract or monolithic Parquet file to convert')
+    parser.add_argument('--output', type=str, default=dataset_path,
+                        help='Root directory of the partitioned dataset')
+    parser.add_argument('--block-size-mb', type=int, default=64, help='Megabytes of CSV parsed per batch')
+    parser.add_argument('--overwrite', action='store_true', help='Replace an existing dataset')
+    parser.add_argument('--append', action='store_true',
+                        help='Add the days of --source that are not in the dataset yet (e.g. a new daily extract)')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='Print bytes per column with and without the categorical schema instead of converting')
+
+    args = parser.parse_args()
+
+    if args.memory_report:
+        report = memory_report(dataset_dir=args.output)
+        print(report.to_string())
+        print(f"Memory reduced by {1 - report.loc['TOTAL', 'AFTER_BYTES'] / report.loc['TOTAL', 'BEFORE_BYTES']:.0%}")
+        raise SystemExit
+
+    if args.append:
+        print(f"Appending new days from {args.source} to {args.output}...")
+        added = append_to_dataset(args.source, args.output, block_size=args.block_size_mb * 1024 * 1024)
+        print(f"Added {len(added)} new days" + (f": {added[0]} to {added[-1]}" if added else ""))
+        raise SystemExit
+
+    print(f"Converting {args.source} into {args.output}...")
+    file_count = build_parquet_dataset(args.source, args.output,
+                                       block_size=args.block_size_mb * 1024 * 1024,
+                                       overwrite=args.overwrite)
+    print(f"Wrote {file_count} Parquet files to {args.output}")
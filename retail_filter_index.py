@@ -0,0 +1,178 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from retail_data import ANALYSIS_COLUMNS, prepare_retail_data, read_retail_data
+
+# Dashboard filter name -> column indexed with one bitmap per value
+BITMAP_COLUMNS = {
+    'store_format': 'STORE_FORMAT',
+    'command': 'COMMAND_NAME',
+    'price_status': 'PRICE_STATUS',
+}
+
+# Rows with a missing SALE_DATE sort last and never fall in a date range
+_MISSING_DAY = np.iinfo(np.int64).max
+
+
+def build_filter_index(df):
+    """Sort rows by SALE_DATE and precompute the bitmaps behind select_rows()
+
+    Every value of the BITMAP_COLUMNS gets a packed bitmap (one bit per row)
+    and non-return rows get one more, so a filter combination is a bitwise
+    AND over a few bytes per 8 rows. Because rows are sorted by date, a date
+    range is a contiguous slice found by binary search.
+
+    Args:
+        df (pd.DataFrame): Prepared retail rows (e.g. the dashboard sample)
+
+    Returns:
+        dict: 'frame' (the rows sorted by SALE_DATE), 'days' (sorted day
+        numbers), 'bitmaps' (column -> value -> packed bitmap) and
+        'non_returns' (packed bitmap)
+    """
+    frame = df.sort_values('SALE_DATE', kind='stable', na_position='last').reset_index(drop=True)
+    days = frame['SALE_DATE'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+    days[frame['SALE_DATE'].isna().to_numpy()] = _MISSING_DAY
+
+    bitmaps = {}
+    for column in BITMAP_COLUMNS.values():
+        codes, values = pd.factorize(frame[column])
+        bitmaps[column] = {value: np.packbits(codes == code) for code, value in enumerate(values)}
+
+    return {
+        'frame': frame,
+        'days': days,
+        'bitmaps': bitmaps,
+        'non_returns': np.packbits(~frame['IS_RETURN'].to_numpy(dtype=bool)),
+    }
+
+
+def _day_number(date):
+    return pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype(np.int64)
+
+
+def select_rows(index, start_date=None, end_date=None, store_format=None, command=None,
+                price_status=None, include_returns=True):
+    """Rows of the indexed frame matching the dashboard filters
+
+    Args:
+        index (dict): Index from build_filter_index()
+        start_date (date-like, optional): First SALE_DATE to include
+        end_date (date-like, optional): Last SALE_DATE to include
+        store_format (str, optional): STORE_FORMAT to keep, None for all
+        command (str, optional): COMMAND_NAME to keep, None for all
+        price_status (str, optional): PRICE_STATUS to keep, None for all
+        include_returns (bool): Keep return lines
+
+    Returns:
+        pd.DataFrame: Matching rows, in date order
+    """
+    frame, days = index['frame'], index['days']
+    first = np.searchsorted(days, _day_number(start_date)) if start_date is not None else 0
+    last = (np.searchsorted(days, _day_number(end_date), side='right') if end_date is not None
+            else np.searchsorted(days, _MISSING_DAY))
+
+    selected = []
+    for name, value in (('store_format', store_format), ('command', command), ('price_status', price_status)):
+        if value is not None:
+            bitmap = index['bitmaps'][BITMAP_COLUMNS[name]].get(value)
+            if bitmap is None:
+                return frame.iloc[0:0]
+            selected.append(bitmap)
+    if not include_returns:
+        selected.append(index['non_returns'])
+
+    if not selected:
+        return frame.iloc[first:last]
+
+    # AND only the bytes covering the date slice, then trim to exact rows
+    first_byte, last_byte = first // 8, (last + 7) // 8
+    mask = selected[0][first_byte:last_byte]
+    for bitmap in selected[1:]:
+        mask = mask & bitmap[first_byte:last_byte]
+    offset = first - first_byte * 8
+    rows = np.flatnonzero(np.unpackbits(mask)[offset:offset + last - first]) + first
+    return frame.take(rows)
+
+
+def mask_rows(df, start_date=None, end_date=None, store_format=None, command=None,
+              price_status=None, include_returns=True):
+    """Reference implementation: the chained boolean masks select_rows() replaces"""
+    filtered_df = df[(df['SALE_DATE'].dt.date >= start_date) &
+                     (df['SALE_DATE'].dt.date <= end_date)]
+    if store_format is not None:
+        filtered_df = filtered_df[filtered_df['STORE_FORMAT'] == store_format]
+    if command is not None:
+        filtered_df = filtered_df[filtered_df['COMMAND_NAME'] == command]
+    if price_status is not None:
+        filtered_df = filtered_df[filtered_df['PRICE_STATUS'] == price_status]
+    if not include_returns:
+        filtered_df = filtered_df[~filtered_df['IS_RETURN']]
+    return filtered_df
+
+
+def _benchmark_filters(df):
+    """A spread of sidebar selections: everything, one week, and narrow combinations"""
+    first_date = df['SALE_DATE'].min().date()
+    last_date = df['SALE_DATE'].max().date()
+    week_end = min(first_date + pd.Timedelta(days=6), last_date)
+    store_format = df['STORE_FORMAT'].mode().iloc[0]
+    command = df['COMMAND_NAME'].mode().iloc[0]
+    return {
+        'all rows': dict(start_date=first_date, end_date=last_date),
+        'one week': dict(start_date=first_date, end_date=week_end),
+        'format + command': dict(start_date=first_date, end_date=last_date,
+                                 store_format=store_format, command=command),
+        'week + format + price + no returns': dict(start_date=first_date, end_date=week_end,
+                                                   store_format=store_format, price_status='R',
+                                                   include_returns=False),
+    }
+
+
+def benchmark(df, repeat=5):
+    """Time mask_rows() against select_rows() for typical sidebar selections
+
+    Returns:
+        pd.DataFrame: Best-of-repeat milliseconds per selection, with row counts
+    """
+    start = time.perf_counter()
+    index = build_filter_index(df)
+    build_seconds = time.perf_counter() - start
+    print(f"Built filter index over {len(df):,} rows in {build_seconds * 1000:.0f} ms")
+
+    def best_of(func, filters):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = func(filters)
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000, len(rows)
+
+    report = []
+    for label, filters in _benchmark_filters(df).items():
+        mask_ms, mask_count = best_of(lambda f: mask_rows(df, **f), filters)
+        index_ms, index_count = best_of(lambda f: select_rows(index, **f), filters)
+        if mask_count != index_count:
+            raise AssertionError(f"{label}: masks selected {mask_count:,} rows, index {index_count:,}")
+        report.append({'FILTERS': label, 'ROWS': index_count, 'MASK_MS': round(mask_ms, 1),
+                       'INDEX_MS': round(index_ms, 1), 'SPEEDUP': round(mask_ms / index_ms, 1)})
+    return pd.DataFrame(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard filter index against boolean masks')
+    parser.add_argument('--benchmark', action='store_true', help='Load the full dataset and time both filter paths')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per selection')
+
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        raise SystemExit
+
+    print("Loading the full dataset into memory...")
+    rows = prepare_retail_data(read_retail_data(columns=ANALYSIS_COLUMNS)).compute()
+    print(benchmark(rows, args.repeat).to_string(index=False))
@@ -0,0 +1,231 @@
+import json
+import os
+from datetime import datetime
+
+import dask
+import pandas as pd
+from dask.diagnostics import ProgressBar
+
+from retail_aggregations import AGGREGATIONS, BEST_SELLERS, product_sales
+from retail_cube import CATEGORICAL_DIMENSIONS, finalize_cube, load_cube, save_cube
+from retail_data import (ANALYSIS_COLUMNS, dataset_days, dataset_path, load_item_lookup, prepare_retail_data,
+                         read_retail_data, with_item_descriptions)
+from retail_sketches import finalize_sketches, load_sketches, save_sketches
+from retail_transactions import load_transactions, save_transactions
+
+state_dir = 'retail_analysis_results/incremental_state'
+watermark_path = os.path.join(state_dir, 'watermark.json')
+totals_path = os.path.join(state_dir, 'totals.json')
+transactions_state_path = os.path.join(state_dir, 'transactions')
+
+# Tables that add up across disjoint sets of days, with the columns they are
+# keyed on. Merging a new batch of days is a concat followed by a groupby sum.
+# Transactions are keyed by SLIP_NO, which never spans two days, so new
+# receipts are written to their own SALE_DAY partitions and the stored ones
+# are never rewritten (see retail_transactions.save_transactions).
+TABLE_KEYS = {
+    'daily_sales': ['SALE_DATE'],
+    'day_of_week_sales': ['DAY_OF_WEEK'],
+    'hourly_sales': ['HOUR'],
+    'price_status_sales': ['PRICE_STATUS'],
+    'store_format_sales': ['STORE_FORMAT'],
+    'command_sales': ['COMMAND_NAME'],
+    'store_sales': ['SITE_ID', 'SITE_NAME'],
+    'product_sales': ['ITEM_ID'],
+    'transactions': ['SLIP_NO'],
+}
+SCALARS = ['total_sales', 'total_quantity', 'return_lines', 'total_lines']
+UNIQUES = ['stores', 'commands', 'store_formats']
+
+
+def load_watermark():
+    """The ingestion watermark, or None before the first incremental run"""
+    if not os.path.exists(watermark_path):
+        return None
+    with open(watermark_path) as f:
+        return json.load(f)
+
+
+def _plain_frame(result):
+    """A computed table as a flat frame with plain (non-categorical) key columns"""
+    frame = result.to_frame() if isinstance(result, pd.Series) else result
+    frame = frame.reset_index()
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(object)
+    return frame
+
+
+def _aggregate(df):
+    """Compute the state tables, scalars, cube cells and sketches for df in one pass"""
+    lazy = {name: AGGREGATIONS[name](df) for name in
+            [name for name in TABLE_KEYS if name in AGGREGATIONS] + SCALARS + UNIQUES + ['cube', 'distinct_sketches']}
+    lazy['product_sales'] = product_sales(df)
+    with ProgressBar():
+        (results,) = dask.compute(lazy)
+    return results
+
+
+def _merge_tables(state, results):
+    """Add newly computed tables onto the stored ones; transactions are appended by _save_state()"""
+    merged = {}
+    for name, keys in TABLE_KEYS.items():
+        if name == 'transactions':
+            continue
+        new = _plain_frame(results[name])
+        if name in state:
+            new = pd.concat([state[name], new], ignore_index=True)
+            new = new.groupby(keys, dropna=False, as_index=False).sum()
+        merged[name] = new
+    return merged
+
+
+def _save_state(tables, transactions, totals, watermark, append):
+    """Write the merged tables, append the new days' transactions and move the watermark"""
+    os.makedirs(state_dir, exist_ok=True)
+    for name, table in tables.items():
+        table.to_parquet(os.path.join(state_dir, f'{name}.parquet'), index=False)
+    save_transactions(transactions, transactions_state_path, append=append)
+    with open(totals_path, 'w') as f:
+        json.dump(totals, f, indent=2)
+    # Written last: a run that fails before this point is simply redone
+    with open(watermark_path, 'w') as f:
+        json.dump(watermark, f, indent=2)
+
+
+def _outdated_state():
+    """Whether the stored tables were written with an older layout that cannot be extended"""
+    days = pd.read_parquet(os.path.join(state_dir, 'day_of_week_sales.parquet'))
+    return not pd.api.types.is_numeric_dtype(days['DAY_OF_WEEK']) or not os.path.isdir(transactions_state_path)
+
+
+def _load_tables(transactions=True):
+    tables = {name: pd.read_parquet(os.path.join(state_dir, f'{name}.parquet'))
+              for name in TABLE_KEYS if name != 'transactions'}
+    if transactions:
+        tables['transactions'] = load_transactions(transactions_state_path)
+    return tables
+
+
+def update_aggregates(full_rebuild=False, blocksize='64MB'):
+    """Bring the persisted aggregates up to date with the partitioned dataset
+
+    The watermark records every SALE_DAY aggregated so far. Only the
+    dataset's day partitions missing from it are read, including days
+    backfilled before the latest one. Their tables are added onto the stored
+    ones, their cube cells and sketches appended to the dashboard's files,
+    and their days added to the watermark. Without a watermark (or with
+    full_rebuild) every day is aggregated and the state written from scratch.
+
+    Args:
+        full_rebuild (bool): Ignore the watermark and recompute everything
+        blocksize (str): Target size of each Dask partition
+
+    Returns:
+        tuple: (state tables dict, totals dict, watermark dict). The watermark
+        is None when the dataset has no days yet.
+    """
+    watermark = None if full_rebuild else load_watermark()
+    if watermark is not None and (load_cube() is None or load_sketches() is None):
+        print("Cube or sketches missing; rebuilding the incremental state from scratch")
+        watermark = None
+    if watermark is not None and ('ingested_days' not in watermark or _outdated_state()):
+        print("Stored state predates the current table layout; rebuilding it from scratch")
+        watermark = None
+
+    ingested = set(watermark['ingested_days']) if watermark is not None else set()
+    sale_days = None
+    if watermark is None:
+        print("No watermark; aggregating the full dataset")
+    elif os.path.isdir(dataset_path):
+        sale_days = sorted(dataset_days() - ingested)
+        print(f"{len(ingested)} days aggregated so far; {len(sale_days)} new in the dataset")
+    else:
+        print(f"{len(ingested)} days aggregated so far; reading the extract for any others")
+
+    if sale_days == []:
+        print("No new days since the last run")
+        with open(totals_path) as f:
+            return _load_tables(), json.load(f), watermark
+
+    df = prepare_retail_data(read_retail_data(columns=ANALYSIS_COLUMNS, sale_days=sale_days, blocksize=blocksize))
+    if ingested and sale_days is None:
+        # Without the partitioned dataset the days cannot be listed up
+        # front, so the ones already aggregated are dropped after reading
+        df = df[~df['SALE_DATE'].dt.strftime('%Y-%m-%d').isin(sorted(ingested))]
+    results = _aggregate(df)
+
+    daily = results['daily_sales']
+    if watermark is not None and daily.empty:
+        print("No new days since the last run")
+        with open(totals_path) as f:
+            return _load_tables(), json.load(f), watermark
+
+    # The stored transactions are not needed to add new receipts
+    state = _load_tables(transactions=False) if watermark is not None else {}
+    tables = _merge_tables(state, results)
+    transactions = _plain_frame(results['transactions'])
+
+    previous = {}
+    if watermark is not None:
+        with open(totals_path) as f:
+            previous = json.load(f)
+    totals = {name: float(previous.get(name, 0)) + float(results[name]) for name in SCALARS}
+    for name in UNIQUES:
+        values = set(previous.get(name, [])) | {str(value) for value in results[name] if pd.notna(value)}
+        totals[name] = sorted(values)
+
+    cube = finalize_cube(results['cube'])
+    sketches = finalize_sketches(results['distinct_sketches'])
+    if watermark is not None:
+        # Drop cells a full run may already have written for the new days
+        new_dates = pd.to_datetime(daily.index).normalize()
+        previous_cube, previous_sketches = load_cube(), load_sketches()
+        cube = pd.concat([previous_cube[~previous_cube['SALE_DATE'].isin(new_dates)], cube], ignore_index=True)
+        sketches = pd.concat([previous_sketches[~previous_sketches['SALE_DATE'].isin(new_dates)], sketches],
+                             ignore_index=True)
+        for column in CATEGORICAL_DIMENSIONS:
+            cube[column] = cube[column].astype('category')
+        sketches['COLUMN'] = sketches['COLUMN'].astype('category')
+    save_cube(cube)
+    save_sketches(sketches)
+
+    new_days = pd.to_datetime(daily.index).dropna()
+    if watermark is None and not len(new_days):
+        # Nothing to place a watermark after: the (empty) tables are returned
+        # but no state is saved, so the next run starts from scratch again
+        print("The dataset has no days to aggregate yet")
+        tables['transactions'] = transactions
+        return tables, totals, None
+    ingested = sorted(ingested | set(new_days.strftime('%Y-%m-%d')))
+    watermark = {
+        'last_sale_date': ingested[-1],
+        'first_sale_date': ingested[0],
+        'days_added': int(len(new_days)),
+        'ingested_days': ingested,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    _save_state(tables, transactions, totals, watermark, append=bool(state))
+    tables['transactions'] = load_transactions(transactions_state_path)
+    return tables, totals, watermark
+
+
+def state_results(tables, totals, top_n):
+    """Shape the incremental state like the results of a full analysis pass
+
+    The returned dict has every key build_tables() and build_summary() read.
+    """
+    results = {name: table.set_index(TABLE_KEYS[name]) for name, table in tables.items()}
+    for name in ['daily_sales', 'day_of_week_sales', 'hourly_sales', 'store_format_sales', 'command_sales']:
+        results[name] = results[name]['EXTENSION_AMOUNT']
+    results['daily_sales'].index = pd.to_datetime(results['daily_sales'].index)
+
+    products = with_item_descriptions(tables['product_sales'], load_item_lookup())
+    results['best_seller_totals'] = products.nlargest(BEST_SELLERS, 'EXTENSION_AMOUNT')
+    results['top_products_revenue'] = products.nlargest(top_n, 'EXTENSION_AMOUNT')
+    results['top_products_quantity'] = products.nlargest(top_n, 'QTY')
+
+    results.update(totals)
+    results['total_transactions'] = len(tables['transactions'])
+    results['total_items'] = len(tables['product_sales'])
+    return results
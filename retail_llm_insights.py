@@ -8,6 +8,14 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import markdown
 import importlib.util
+import hashlib
+
+from retail_metrics import load_metrics, metrics_path
+
+# Responses keyed by the metrics fingerprint and the question asked. While the
+# analysis inputs are unchanged, asking the same question again is answered
+# from here without calling the model.
+insights_cache_path = 'retail_analysis_results/llm_insights_cache.json'
 
 def configure_openai_client(api_key=None):
     """Configure the OpenAI client with the provided API key"""
@@ -30,6 +38,89 @@ def read_summary_report(file_path='retail_analysis_results/summary_report.txt'):
         print(f"Error reading summary report: {str(e)}")
         return None
 
+def read_metrics(file_path=metrics_path):
+    """Read the structured metrics written by the analysis, or None if they are missing or outdated"""
+    try:
+        return load_metrics(file_path)
+    except Exception as e:
+        print(f"Error reading summary metrics: {str(e)}")
+        return None
+
+def _format_rows(rows, label, value, value_format='${:,.2f}'):
+    return '\n'.join(f"    - {row[label]}: {value_format.format(row[value])}" for row in rows)
+
+def format_metrics(metrics):
+    """Render the metrics artifact as the data section of the prompt"""
+    totals = metrics['totals']
+    returns = metrics['returns']
+    value_stats = metrics['transaction_stats']['EXTENSION_AMOUNT']
+    size_stats = metrics['transaction_stats']['QTY']
+    lines = [
+        f"Analysis Period: {metrics['period']} ({metrics['first_sale_date']} to {metrics['last_sale_date']})",
+    ]
+    if metrics.get('scope'):
+        lines.append(f"Scope: {metrics['scope']}")
+    lines += [
+        f"Total Sales: ${totals['sales']:,.2f}",
+        f"Total Transactions: {totals['transactions']:,}",
+        f"Total Unique Items: {totals['unique_items']:,}",
+        f"Total Quantity Sold: {totals['quantity']:,.0f}",
+        f"Return Rate: {returns['return_rate']:.2f}%",
+        f"Number of Stores: {totals['stores']}",
+        f"Number of Commands: {totals['commands']}",
+        f"Store Formats: {', '.join(totals['store_formats'])}",
+        f"Transaction Value: mean ${value_stats['mean']:,.2f}, median ${value_stats['50%']:,.2f}, "
+        f"90th percentile ${value_stats['90%']:,.2f}",
+        f"Items per Transaction: mean {size_stats['mean']:.2f}, median {size_stats['50%']:.0f}, "
+        f"90th percentile {size_stats['90%']:.0f}",
+        "Sales by Day of Week:", _format_rows(metrics['day_of_week_sales'], 'DAY_OF_WEEK', 'EXTENSION_AMOUNT'),
+        "Sales by Hour of Day:", _format_rows(metrics['hourly_sales'], 'HOUR', 'EXTENSION_AMOUNT'),
+        "Sales by Week Number:", _format_rows(metrics['weekly_sales'], 'WEEK', 'EXTENSION_AMOUNT'),
+        "Sales by Price Status (R=Regular, P=Promotion, M=Markdown):",
+        _format_rows(metrics['price_status'], 'PRICE_STATUS', 'EXTENSION_AMOUNT'),
+        "Sales by Store Format:", _format_rows(metrics['store_format_sales'], 'STORE_FORMAT', 'EXTENSION_AMOUNT'),
+        "Sales by Command:", _format_rows(metrics['command_sales'], 'COMMAND_NAME', 'EXTENSION_AMOUNT'),
+        "Top Products by Revenue:", _format_rows(metrics['top_products_revenue'], 'ITEM_DESC', 'EXTENSION_AMOUNT'),
+        "Top Products by Quantity:", _format_rows(metrics['top_products_quantity'], 'ITEM_DESC', 'QTY', '{:,.0f} units'),
+        "Top Stores by Revenue:", _format_rows(metrics['top_stores'], 'SITE_NAME', 'EXTENSION_AMOUNT'),
+        "Best Sellers with the Highest Return Rate:",
+        _format_rows(returns['top_products'], 'ITEM_DESC', 'RETURN_RATE', '{:.2f}%'),
+        "Stores with the Highest Return Rate:",
+        _format_rows(returns['top_stores'], 'SITE_NAME', 'RETURN_RATE', '{:.2f}%'),
+    ]
+    return '\n'.join(lines)
+
+def insights_cache_key(fingerprint, question=None):
+    """Cache key of a response to a question about the data with this fingerprint"""
+    return hashlib.sha256(f"{fingerprint}\0{question or ''}".encode()).hexdigest()
+
+def _load_insights_cache(file_path=insights_cache_path):
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable insights cache: {str(e)}")
+        return {}
+
+def cached_insights(fingerprint, question=None, file_path=insights_cache_path):
+    """The cached response to this question about this data, or None"""
+    entry = _load_insights_cache(file_path).get(insights_cache_key(fingerprint, question))
+    return entry['insights'] if entry else None
+
+def cache_insights(fingerprint, question, insights, file_path=insights_cache_path):
+    """Store a response in the insights cache"""
+    cache = _load_insights_cache(file_path)
+    cache[insights_cache_key(fingerprint, question)] = {
+        'fingerprint': fingerprint,
+        'question': question,
+        'insights': insights,
+    }
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    with open(file_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+
 def create_prompt_from_retail_data(summary_content, question=None):
     """Create a prompt based on the retail data and optional question"""
     if not summary_content:
@@ -74,17 +165,48 @@ def create_prompt_from_retail_data(summary_content, question=None):
     
     return prompt
 
-def generate_retail_insights(summary_content=None, question=None, openai_client=None):
-    """Generate insights from the retail data using LangChain"""
-    # Read summary report if not provided
+def generate_retail_insights(summary_content=None, question=None, openai_client=None, metrics=None,
+                             api_key=None, use_cache=True):
+    """Generate insights from the retail data using LangChain
+
+    Without summary_content the prompt is built from the metrics artifact
+    written by the analysis (falling back to the plain-text summary report
+    if there is none). Responses built from the metrics are cached by the
+    metrics fingerprint and question, and a cached response is returned
+    without creating a client or calling the model.
+
+    Args:
+        summary_content (str, optional): Report text to use instead of the metrics
+        question (str, optional): Specific question to answer
+        openai_client (optional): Chat model to use. Created from api_key on a cache miss if not given.
+        metrics (dict, optional): Metrics artifact. Read from the default path if not given.
+        api_key (str, optional): OpenAI API key for the client created on a cache miss
+        use_cache (bool): Reuse and store responses in the insights cache
+
+    Returns:
+        str: The insights, or an error message
+    """
+    fingerprint = None
     if not summary_content:
-        summary_content = read_summary_report()
-        if not summary_content:
-            return "Error: Could not read summary report."
+        metrics = metrics if metrics is not None else read_metrics()
+        if metrics:
+            summary_content = format_metrics(metrics)
+            fingerprint = metrics['fingerprint']
+        else:
+            # Read summary report if no metrics were written
+            summary_content = read_summary_report()
+            if not summary_content:
+                return "Error: Could not read summary report."
+
+    use_cache = use_cache and fingerprint is not None
+    if use_cache:
+        insights = cached_insights(fingerprint, question)
+        if insights is not None:
+            return insights
     
     # Use the provided client or create a new one
     if not openai_client:
-        openai_client = configure_openai_client()
+        openai_client = configure_openai_client(api_key)
     
     try:
         # Create prompt
@@ -100,11 +222,13 @@ def generate_retail_insights(summary_content=None, question=None, openai_client=
         chain = prompt | openai_client | StrOutputParser()
         insights = chain.invoke({})
         
-        return insights
-        
     except Exception as e:
         return f"Error generating insights: {str(e)}"
 
+    if use_cache:
+        cache_insights(fingerprint, question, insights)
+    return insights
+
 def save_insights_to_file(insights, file_path='retail_analysis_results/llm_insights.md'):
     """Save the generated insights to a file"""
     try:
@@ -223,6 +347,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate LLM insights from retail analysis data')
     parser.add_argument('--api_key', type=str, help='OpenAI API key')
     parser.add_argument('--question', type=str, help='Specific question to ask about the data')
+    parser.add_argument('--metrics', type=str, default=metrics_path,
+                        help='Summary metrics JSON written by the analysis')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Always call the model, even if this question was answered for the same data')
     parser.add_argument('--output', type=str, default='retail_analysis_results/llm_insights.md', 
                         help='Output file path for insights')
     parser.add_argument('--pdf', type=str, help='Output file path for PDF version of insights')
@@ -241,11 +369,9 @@ if __name__ == "__main__":
         else:
             print(f"Failed to generate PDF from {args.output}")
     else:
-        # Configure OpenAI client
-        client = configure_openai_client(args.api_key)
-        
-        # Generate insights
-        insights = generate_retail_insights(question=args.question, openai_client=client)
+        # Generate insights; the client is only created when there is no cached response
+        insights = generate_retail_insights(question=args.question, metrics=read_metrics(args.metrics),
+                                            api_key=args.api_key, use_cache=not args.no_cache)
         
         # Save insights to file
         save_insights_to_file(insights, args.output)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+metrics_path = 'retail_analysis_results/summary_metrics.json'
+
+# Bumped whenever keys are added, renamed or change meaning. Readers ignore
+# artifacts with another version rather than misreading them.
+METRICS_VERSION = 2
+
+# Rows kept from each ranking and return-rate table
+TOP_ROWS = 10
+
+
+def _records(frame, columns, top=None):
+    """Rows of a table as JSON-ready dicts"""
+    frame = frame[columns] if top is None else frame[columns].head(top)
+    return json.loads(frame.to_json(orient='records', date_format='iso'))
+
+
+def metrics_fingerprint(source_fingerprint, scope='', distinct_mode='exact', incremental=False):
+    """Fingerprint of the data a metrics artifact was computed from
+
+    Combines the source data fingerprint with the run's scope, how distinct
+    counts were taken, whether the run was incremental and the metrics
+    version, so a scoped run, estimated counts, a rerun on new data or a
+    layout change never matches an older artifact.
+    """
+    key = f'{METRICS_VERSION}\0{source_fingerprint}\0{scope}\0{distinct_mode}\0{int(incremental)}'
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def build_metrics(summary, tables, fingerprint):
+    """Collect the headline metrics and top-N tables of an analysis run into a JSON-ready dict
+
+    Args:
+        summary (dict): Headline metrics from build_summary()
+        tables (dict): Tables from build_tables()
+        fingerprint (str): Fingerprint of the input data from metrics_fingerprint()
+
+    Returns:
+        dict: Versioned metrics, read back by retail_llm_insights to build its prompt
+    """
+    stats = summary['transaction_stats']
+    daily_sales = tables['daily_sales']
+    return {
+        'schema_version': METRICS_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'fingerprint': fingerprint,
+        'period': summary['period'],
+        'first_sale_date': daily_sales['SALE_DATE'].min().strftime('%Y-%m-%d') if len(daily_sales) else None,
+        'last_sale_date': daily_sales['SALE_DATE'].max().strftime('%Y-%m-%d') if len(daily_sales) else None,
+        'scope': summary.get('scope') or None,
+        'totals': {
+            'sales': float(summary['total_sales']),
+            'transactions': int(summary['total_transactions']),
+            'unique_items': int(summary['total_items']),
+            'quantity': float(summary['total_quantity']),
+            'stores': len(summary['stores']),
+            'commands': len(summary['commands']),
+            'store_formats': [str(value) for value in summary['store_formats']],
+            'distinct_counts_approximate': bool(summary.get('distinct_approximate')),
+        },
+        'weekly_sales': _records(tables['weekly_sales'], ['WEEK', 'EXTENSION_AMOUNT']),
+        'day_of_week_sales': _records(tables['day_of_week_sales'], ['DAY_OF_WEEK', 'EXTENSION_AMOUNT']),
+        'hourly_sales': _records(tables['hourly_sales'], ['HOUR', 'EXTENSION_AMOUNT']),
+        'price_status': _records(tables['price_status_sales'].merge(tables['price_status_count'], on='PRICE_STATUS'),
+                                 ['PRICE_STATUS', 'EXTENSION_AMOUNT', 'COUNT']),
+        'store_format_sales': _records(tables['store_format_sales'], ['STORE_FORMAT', 'EXTENSION_AMOUNT']),
+        'command_sales': _records(tables['command_sales'], ['COMMAND_NAME', 'EXTENSION_AMOUNT']),
+        'top_products_revenue': _records(tables['top_products_revenue'],
+                                         ['ITEM_ID', 'ITEM_DESC', 'EXTENSION_AMOUNT', 'QTY'], TOP_ROWS),
+        'top_products_quantity': _records(tables['top_products_quantity'],
+                                          ['ITEM_ID', 'ITEM_DESC', 'QTY', 'EXTENSION_AMOUNT'], TOP_ROWS),
+        'top_stores': _records(tables['store_sales'], ['SITE_ID', 'SITE_NAME', 'EXTENSION_AMOUNT'], TOP_ROWS),
+        'returns': {
+            'return_rate': float(summary['return_rate']),
+            'top_products': _records(tables['return_by_product'],
+                                     ['ITEM_ID', 'ITEM_DESC', 'RETURN_RATE', 'RETURN_LINES', 'LINES'], TOP_ROWS),
+            'top_stores': _records(tables['return_by_store'],
+                                   ['SITE_ID', 'SITE_NAME', 'RETURN_RATE', 'RETURN_LINES', 'LINES'], TOP_ROWS),
+        },
+        'transaction_stats': json.loads(stats.to_json(orient='index')),
+    }
+
+
+def save_metrics(metrics, file_path=metrics_path):
+    """Write the metrics artifact as JSON"""
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    with open(file_path, 'w') as f:
+        json.dump(metrics, f, indent=2)
+
+
+def load_metrics(file_path=metrics_path):
+    """Load the metrics artifact, or None if it is missing or has another schema version"""
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path) as f:
+        metrics = json.load(f)
+    if metrics.get('schema_version') != METRICS_VERSION:
+        return None
+    return metrics
@@ -0,0 +1,79 @@
+from retail_aggregations import PRODUCT_RANKINGS, compute_aggregations, verified_top_products
+from retail_data import ANALYSIS_COLUMNS, prepare_retail_data, read_retail_data, with_item_descriptions
+
+
+def filtered_retail_data(start_date=None, end_date=None, store_format=None, command=None,
+                         price_status=None, include_returns=True):
+    """Lazily read the full retail dataset restricted to the dashboard filters
+
+    Date, command, store format and price status predicates are pushed into
+    the read (see retail_data.read_retail_data), so with the partitioned
+    Parquet dataset only the matching files and row groups are scanned.
+
+    Args:
+        start_date (date-like, optional): First SALE_DATE to include
+        end_date (date-like, optional): Last SALE_DATE to include
+        store_format (str, optional): STORE_FORMAT to keep, None for all
+        command (str, optional): COMMAND_NAME to keep, None for all
+        price_status (str, optional): PRICE_STATUS to keep, None for all
+        include_returns (bool): Keep return lines
+
+    Returns:
+        dask.dataframe.DataFrame: Prepared, filtered retail data
+    """
+    df = read_retail_data(
+        columns=ANALYSIS_COLUMNS,
+        start_date=start_date,
+        end_date=end_date,
+        commands=[command] if command is not None else None,
+        store_formats=[store_format] if store_format is not None else None,
+        price_statuses=[price_status] if price_status is not None else None,
+    )
+    df = prepare_retail_data(df)
+    if not include_returns:
+        df = df[~df['IS_RETURN']]
+    return df
+
+
+def query_aggregates(names, **filters):
+    """Compute registered aggregations over the filtered full dataset in one pass
+
+    Only the aggregated results are materialized, so the caller never holds
+    row-level data in memory.
+
+    Args:
+        names (list): Names of aggregations registered in retail_aggregations
+        **filters: Keyword filters accepted by filtered_retail_data()
+
+    Returns:
+        dict: Aggregation name -> pandas object or scalar
+    """
+    return compute_aggregations(filtered_retail_data(**filters), names, progress=False)
+
+
+def query_top_products(k, names=(), **filters):
+    """Exact top-k products by revenue and quantity over the filtered full dataset
+
+    Heavy-hitter candidates are computed in the same pass as any other
+    requested aggregations; a second pass totals only the candidate items.
+
+    Args:
+        k (int): Products per ranking
+        names (iterable): Other registered aggregations to compute in the first pass
+        **filters: Keyword filters accepted by filtered_retail_data()
+
+    Returns:
+        dict: The requested aggregations plus the top_products_revenue and
+        top_products_quantity tables
+    """
+    df = filtered_retail_data(**filters)
+    candidates = [summary for summary, _ in PRODUCT_RANKINGS.values()]
+    results = compute_aggregations(df, list(names) + candidates, progress=False)
+    rankings, _ = verified_top_products(df, results, k)
+    results.update(rankings)
+    return results
+
+
+def query_rows(limit=100, **filters):
+    """Return the first rows of the filtered full dataset, with item descriptions"""
+    return with_item_descriptions(filtered_retail_data(**filters).head(limit))
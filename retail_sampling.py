@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+# Transactions are sampled within strata of store and sale date, so every
+# store-day is represented, including small Marine Marts that a uniform
+# sample can miss entirely.
+STRATA = ['SITE_ID', 'SALE_DATE']
+
+# Normal quantile for 95% confidence intervals
+Z_95 = 1.96
+
+
+def _inclusion_probabilities(population, frac, min_transactions):
+    """Per-stratum sampling rate: frac, raised so small strata keep min_transactions"""
+    return np.minimum(1.0, np.maximum(frac, min_transactions / population))
+
+
+def _uniform_from_slip(slip_no, seed):
+    """Deterministic pseudo-random number in [0, 1) for each SLIP_NO"""
+    hashed = pd.util.hash_pandas_object(slip_no, index=False, hash_key=f"{seed:016d}"[-16:])
+    return hashed.to_numpy() / np.float64(2 ** 64)
+
+
+def stratified_sample(ddf, frac=0.1, seed=42, min_transactions=20):
+    """Draw a reproducible stratified sample of whole transactions
+
+    Transactions (SLIP_NO) are the sampling unit, so every sampled receipt
+    keeps all of its lines. Each store/day stratum is sampled at rate frac,
+    or higher for strata with fewer than min_transactions / frac receipts.
+    Selection is a hash of SLIP_NO and the seed, so the same seed always
+    returns the same sample.
+
+    Args:
+        ddf (dask.dataframe.DataFrame): Prepared retail data (see retail_data.prepare_retail_data)
+        frac (float): Base sampling rate per stratum
+        seed (int): Seed for the transaction hash
+        min_transactions (int): Target minimum number of sampled transactions per stratum
+
+    Returns:
+        pd.DataFrame: Sampled lines with STRATUM_POPULATION (transactions in the
+        stratum), STRATUM_SAMPLED (transactions sampled) and SAMPLE_WEIGHT columns
+    """
+    population = ddf.groupby(STRATA, dropna=False)['SLIP_NO'].nunique().compute()
+    rates = pd.DataFrame({
+        'STRATUM_POPULATION': population,
+        'INCLUSION_PROBABILITY': _inclusion_probabilities(population, frac, min_transactions),
+    }).reset_index()
+
+    def sample_partition(part):
+        part = part.merge(rates, on=STRATA, how='left')
+        return part[_uniform_from_slip(part['SLIP_NO'], seed) < part['INCLUSION_PROBABILITY']]
+
+    sample = ddf.map_partitions(sample_partition).compute().reset_index(drop=True)
+
+    sampled = sample.groupby(STRATA, dropna=False)['SLIP_NO'].transform('nunique')
+    sample['STRATUM_SAMPLED'] = sampled
+    sample['SAMPLE_WEIGHT'] = sample['STRATUM_POPULATION'] / sampled
+    return sample.drop(columns='INCLUSION_PROBABILITY')
+
+
+def _unique(columns):
+    """Drop repeated column names, e.g. when grouping by a stratum column"""
+    return list(dict.fromkeys(columns))
+
+
+def _transaction_values(sample, columns, by=()):
+    """Sum the given columns per transaction (and group), keeping stratum sizes
+
+    'LINES' counts lines and 'TRANSACTIONS' is 1 for every transaction.
+    """
+    keys = _unique(list(by) + STRATA + ['SLIP_NO'])
+    summed = [column for column in columns if column not in ('LINES', 'TRANSACTIONS')]
+    frame = sample[keys + summed + ['STRATUM_POPULATION', 'STRATUM_SAMPLED']].assign(LINES=1)
+    aggregations = {column: (column, 'sum') for column in summed + ['LINES']}
+    aggregations['STRATUM_POPULATION'] = ('STRATUM_POPULATION', 'first')
+    aggregations['STRATUM_SAMPLED'] = ('STRATUM_SAMPLED', 'first')
+    transactions = frame.groupby(keys, dropna=False, observed=True).agg(**aggregations).reset_index()
+    transactions['TRANSACTIONS'] = 1
+    return transactions
+
+
+def _stratified_total(transactions, column, by=()):
+    """Expanded total and its variance for a per-transaction value, per group
+
+    Uses the stratified simple random sampling estimator with finite
+    population correction. Sampled transactions outside a group count as
+    zeros, which is what the per-stratum sums over the group give us.
+    """
+    keys = _unique(list(by) + STRATA)
+    strata = transactions.assign(SQUARED=transactions[column].astype(float) ** 2).groupby(
+        keys, dropna=False, observed=True).agg(
+        Y=(column, 'sum'),
+        Y2=('SQUARED', 'sum'),
+        N=('STRATUM_POPULATION', 'first'),
+        n=('STRATUM_SAMPLED', 'first'),
+    )
+    n = strata['n'].astype(float)
+    N = strata['N'].astype(float)
+    s2 = ((strata['Y2'] - strata['Y'] ** 2 / n) / (n - 1)).where(n > 1, 0.0).clip(lower=0)
+    strata['ESTIMATE'] = N / n * strata['Y']
+    strata['VARIANCE'] = N ** 2 * (1 - n / N) * s2 / n
+
+    if by:
+        return strata.groupby(list(by), dropna=False, observed=True)[['ESTIMATE', 'VARIANCE']].sum()
+    return strata[['ESTIMATE', 'VARIANCE']].sum()
+
+
+def _with_interval(estimates):
+    """Add STD_ERROR, MARGIN and 95% CI bounds to estimates with a VARIANCE"""
+    estimates = estimates.copy()
+    estimates['STD_ERROR'] = np.sqrt(estimates['VARIANCE'])
+    estimates['MARGIN'] = Z_95 * estimates['STD_ERROR']
+    estimates['CI_LOW'] = estimates['ESTIMATE'] - estimates['MARGIN']
+    estimates['CI_HIGH'] = estimates['ESTIMATE'] + estimates['MARGIN']
+    return estimates.drop(labels='VARIANCE', axis=estimates.ndim - 1)
+
+
+def estimate_total(sample, column, by=None):
+    """Estimate a population total from a stratified sample
+
+    Args:
+        sample (pd.DataFrame): Output of stratified_sample(), optionally filtered
+        column (str): Column to total, 'LINES' for line counts or
+            'TRANSACTIONS' for the number of transactions
+        by (str or list, optional): Group the estimate by these columns
+
+    Returns:
+        pd.Series (no grouping) or pd.DataFrame (one row per group) with
+        ESTIMATE, STD_ERROR, MARGIN, CI_LOW and CI_HIGH
+    """
+    by = [by] if isinstance(by, str) else list(by or [])
+    transactions = _transaction_values(sample, [column], by)
+    estimates = _stratified_total(transactions, column, by)
+    estimates = _with_interval(estimates)
+    return estimates.reset_index() if by else estimates
+
+
+def estimate_ratio(sample, numerator, denominator):
+    """Estimate a ratio of two population totals with a linearized 95% CI
+
+    Args:
+        sample (pd.DataFrame): Output of stratified_sample(), optionally filtered
+        numerator (str): Column for the numerator total ('LINES'/'TRANSACTIONS' allowed)
+        denominator (str): Column for the denominator total ('LINES'/'TRANSACTIONS' allowed)
+
+    Returns:
+        pd.Series: ESTIMATE, STD_ERROR, MARGIN, CI_LOW and CI_HIGH
+    """
+    transactions = _transaction_values(sample, [numerator, denominator])
+    numerator_total = _stratified_total(transactions, numerator)['ESTIMATE']
+    denominator_total = _stratified_total(transactions, denominator)['ESTIMATE']
+    if not denominator_total:
+        return _with_interval(pd.Series({'ESTIMATE': 0.0, 'VARIANCE': 0.0}))
+
+    ratio = numerator_total / denominator_total
+    transactions['LINEARIZED'] = transactions[numerator] - ratio * transactions[denominator]
+    variance = _stratified_total(transactions, 'LINEARIZED')['VARIANCE'] / denominator_total ** 2
+    return _with_interval(pd.Series({'ESTIMATE': ratio, 'VARIANCE': variance}))
@@ -0,0 +1,83 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import hyperloglog
+from retail_aggregations import SKETCH_COLUMNS, SKETCH_DIMENSIONS, compute_aggregations
+from retail_data import ANALYSIS_COLUMNS, prepare_retail_data, read_retail_data
+
+sketch_path = 'retail_analysis_results/retail_sketches.parquet'
+
+
+def finalize_sketches(sketches):
+    """Flatten computed sketch registers and give them compact dtypes"""
+    sketches = sketches.reset_index()
+    sketches['SALE_DATE'] = pd.to_datetime(sketches['SALE_DATE']).dt.normalize()
+    sketches['COLUMN'] = sketches['COLUMN'].astype('category')
+    sketches['REGISTER'] = sketches['REGISTER'].astype('int16')
+    sketches['RANK'] = sketches['RANK'].astype('int8')
+    return sketches
+
+
+def save_sketches(sketches, file_path=sketch_path):
+    """Persist the sketches as Parquet"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    sketches.to_parquet(file_path, index=False)
+
+
+def load_sketches(file_path=sketch_path):
+    """Load persisted sketches, or None if they have not been built yet"""
+    if not os.path.exists(file_path):
+        return None
+    return pd.read_parquet(file_path)
+
+
+def build_sketches(file_path=sketch_path):
+    """Compute the per day/site sketches from the full retail dataset and persist them"""
+    df = prepare_retail_data(read_retail_data(columns=ANALYSIS_COLUMNS))
+    sketches = finalize_sketches(compute_aggregations(df, ['distinct_sketches'])['distinct_sketches'])
+    save_sketches(sketches, file_path)
+    return sketches
+
+
+def count_distinct(sketches, column, start_date=None, end_date=None, site_ids=None):
+    """Estimate distinct values of a column for any day/site selection
+
+    The stored registers of every matching day and site are merged, so no
+    rows are rescanned.
+
+    Args:
+        sketches (pd.DataFrame): Sketches from load_sketches() or build_sketches()
+        column (str): 'SLIP_NO' or 'ITEM_ID'
+        start_date (date-like, optional): First SALE_DATE to include
+        end_date (date-like, optional): Last SALE_DATE to include
+        site_ids (list, optional): SITE_IDs to include, None for all
+
+    Returns:
+        int: Estimated number of distinct values
+    """
+    mask = sketches['COLUMN'] == column
+    if start_date is not None:
+        mask &= sketches['SALE_DATE'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= sketches['SALE_DATE'] <= pd.Timestamp(end_date)
+    if site_ids is not None:
+        mask &= sketches['SITE_ID'].isin(list(site_ids))
+
+    matching = sketches[mask]
+    registers = np.zeros(1 << hyperloglog.PRECISION, dtype=np.int8)
+    np.maximum.at(registers, matching['REGISTER'].to_numpy(), matching['RANK'].to_numpy())
+    return int(round(hyperloglog.estimate(registers)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the per day/site distinct-count sketches used by the dashboard')
+    parser.add_argument('--output', type=str, default=sketch_path, help='Output file path for the sketches')
+
+    args = parser.parse_args()
+
+    print("Building distinct-count sketches from the full dataset...")
+    sketches = build_sketches(args.output)
+    print(f"Sketches saved to {args.output} ({len(sketches):,} registers)")
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Keys each partition passes on as heavy-hitter candidates. The merged state
+# is at most npartitions * CAPACITY keys however large the catalog is.
+CAPACITY = 1000
+
+
+def _partition_summary(part, key, weight, capacity):
+    """Heaviest keys of one partition, plus the largest weight of any key left out
+
+    Weights are clipped at zero (returns carry negative amounts), so the
+    bound holds for the gross weight of every dropped key, and therefore
+    for its net weight too.
+    """
+    sums = part[weight].clip(lower=0).groupby(part[key]).sum().sort_values(ascending=False)
+    top = sums.iloc[:capacity]
+    bound = np.zeros(len(top))
+    if len(sums) > capacity:
+        bound[0] = sums.iloc[capacity]
+    return pd.DataFrame({'KEY': top.index.to_numpy(), 'WEIGHT': top.to_numpy(), 'BOUND': bound})
+
+
+def heavy_hitter_candidates(df, key, weight, capacity=CAPACITY):
+    """Lazy per-partition heavy-hitter summaries of key by weight
+
+    Each partition keeps only its capacity heaviest keys and records the
+    weight of the heaviest key it dropped in BOUND. Any key missing from
+    every summary can have a total weight of at most the sum of the bounds.
+
+    Args:
+        df (dask.dataframe.DataFrame): Retail data
+        key (str): Column to rank, e.g. ITEM_ID
+        weight (str): Column to total, e.g. EXTENSION_AMOUNT
+        capacity (int): Keys kept per partition
+
+    Returns:
+        dask.dataframe.DataFrame: KEY, WEIGHT and BOUND rows from every partition
+    """
+    meta = pd.DataFrame({
+        'KEY': pd.Series(dtype=df[key].dtype),
+        'WEIGHT': pd.Series(dtype='float64'),
+        'BOUND': pd.Series(dtype='float64'),
+    })
+    return df.map_partitions(_partition_summary, key, weight, capacity, meta=meta)
+
+
+def merge_candidates(summaries):
+    """Merge computed partition summaries
+
+    Returns:
+        tuple: (array of candidate keys, upper bound on the weight of any other key)
+    """
+    return summaries['KEY'].unique(), summaries['BOUND'].sum()
+
+
+def verified_top_k(totals, weight, k, bound):
+    """Top k rows of the exact candidate totals, if the candidates guarantee them
+
+    Args:
+        totals (pd.DataFrame): Exact totals computed for the candidate keys only
+        weight (str): Column to rank by
+        k (int): Number of rows to return
+        bound (float): Upper bound from merge_candidates()
+
+    Returns:
+        pd.DataFrame or None: The exact top k, or None when a key outside the
+        candidates could still outrank the k-th candidate
+    """
+    top = totals.nlargest(k, weight)
+    if bound > 0 and (len(top) < k or top[weight].iloc[-1] < bound):
+        return None
+    return top
@@ -0,0 +1,111 @@
+import argparse
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from retail_aggregations import compute_aggregations
+from retail_data import ANALYSIS_COLUMNS, prepare_retail_data, read_retail_data
+
+# Hive-partitioned by SALE_DAY (SALE_DAY=2024-12-05/part-0.parquet). A
+# receipt never spans two days, so every partition is complete on its own
+# and new days are added without rewriting the stored ones.
+transactions_path = 'retail_analysis_results/retail_transactions'
+
+# Per-receipt measures whose distributions are reported: lines and units in
+# the basket, and its net value
+DISTRIBUTION_COLUMNS = ['LINES', 'QTY', 'EXTENSION_AMOUNT']
+PERCENTILES = [0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+
+
+def finalize_transactions(transactions):
+    """Flatten a computed transaction table and give it compact dtypes"""
+    transactions = transactions.reset_index()
+    transactions['SALE_DATE'] = pd.to_datetime(transactions['SALE_DATE']).dt.normalize()
+    transactions['LINES'] = transactions['LINES'].astype('int32')
+    transactions['RETURN_LINES'] = transactions['RETURN_LINES'].astype('int32')
+    return transactions
+
+
+def transaction_days(dir_path=transactions_path):
+    """SALE_DAY values that have a partition in the persisted transaction table"""
+    if not os.path.isdir(dir_path):
+        return set()
+    return {name.split('=', 1)[1] for name in os.listdir(dir_path) if name.startswith('SALE_DAY=')}
+
+
+def save_transactions(transactions, dir_path=transactions_path, append=False):
+    """Persist the transaction table as Parquet, one directory per SALE_DAY
+
+    Args:
+        transactions (pd.DataFrame): Flat table with a SALE_DATE column
+        dir_path (str): Root directory of the table
+        append (bool): Only (re)write the days present in transactions and
+            keep every other stored day; otherwise replace the whole table
+    """
+    if not append and os.path.exists(dir_path):
+        shutil.rmtree(dir_path)
+    os.makedirs(dir_path, exist_ok=True)
+    if transactions.empty:
+        return
+    days = pd.to_datetime(transactions['SALE_DATE']).dt.strftime('%Y-%m-%d')
+    table = pa.Table.from_pandas(transactions.assign(SALE_DAY=days), preserve_index=False)
+    ds.write_dataset(
+        table,
+        dir_path,
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema([('SALE_DAY', pa.string())]), flavor='hive'),
+        existing_data_behavior='delete_matching',
+        max_partitions=max(days.nunique(), 1),
+    )
+
+
+def load_transactions(dir_path=transactions_path, columns=None):
+    """Load the persisted transaction table, or None if it has not been built yet"""
+    if not transaction_days(dir_path):
+        return None
+    transactions = pd.read_parquet(dir_path, columns=columns)
+    return transactions.drop(columns='SALE_DAY', errors='ignore')
+
+
+def build_transactions(file_path=transactions_path):
+    """Compute the transaction table from the full retail dataset and persist it"""
+    df = prepare_retail_data(read_retail_data(columns=ANALYSIS_COLUMNS))
+    transactions = finalize_transactions(compute_aggregations(df, ['transactions'])['transactions'])
+    save_transactions(transactions, file_path)
+    return transactions
+
+
+def transaction_distribution(transactions, columns=DISTRIBUTION_COLUMNS, by=None, percentiles=PERCENTILES):
+    """Count, mean, spread and percentiles of per-transaction measures
+
+    Args:
+        transactions (pd.DataFrame): Table from load_transactions() or build_transactions()
+        columns (list): Measures to describe
+        by (str or list, optional): Columns to describe each group of separately, e.g. 'SITE_ID'
+        percentiles (list): Percentiles to include, as fractions
+
+    Returns:
+        pd.DataFrame: One row per measure (per group with by), one column per statistic
+    """
+    if by is None:
+        return transactions[list(columns)].describe(percentiles=percentiles).T
+    return transactions.groupby(by)[list(columns)].describe(percentiles=percentiles).stack(level=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the per-transaction table and report basket distributions')
+    parser.add_argument('--output', type=str, default=transactions_path, help='Output directory for the table')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute the table even if it already exists')
+    parser.add_argument('--by', type=str, default=None, help='Report distributions per value of this column, e.g. SITE_ID')
+
+    args = parser.parse_args()
+
+    transactions = None if args.rebuild else load_transactions(args.output)
+    if transactions is None:
+        print("Building the transaction table from the full dataset...")
+        transactions = build_transactions(args.output)
+        print(f"Transaction table saved to {args.output} ({len(transactions):,} transactions)")
+    print(transaction_distribution(transactions, by=args.by).to_string())
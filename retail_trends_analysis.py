@@ -1,361 +1,367 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import os
 import dask.dataframe as dd
-from dask.diagnostics import ProgressBar
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import argparse
+import contextlib
 import warnings
 
+from retail_aggregations import AGGREGATIONS, compute_aggregations, verified_top_products
+from retail_anomalies import anomalies_path, detect_anomalies, save_anomalies
+from retail_charts import period_label, render_charts
+from retail_cluster import add_cluster_arguments, dask_cluster, performance_report_name
+from retail_cube import cube_path, finalize_cube, load_cube, save_cube
+from retail_data import ANALYSIS_COLUMNS, DAY_NAMES, prepare_retail_data, read_retail_data, source_fingerprint
+from retail_incremental import state_results, update_aggregates
+from retail_metrics import build_metrics, metrics_fingerprint, metrics_path, save_metrics
+from retail_sketches import count_distinct, finalize_sketches, load_sketches, save_sketches, sketch_path
+from retail_transactions import (finalize_transactions, save_transactions, transaction_days, transaction_distribution,
+                                 transactions_path)
+
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
-# Set style for matplotlib
-plt.style.use('ggplot')
-sns.set(style="whitegrid")
+OUTPUT_DIR = 'retail_analysis_results'
 
-# Create output directory for visualizations
-os.makedirs('retail_analysis_results', exist_ok=True)
+# Rows in each top-N ranking
+TOP_N = 20
 
-print("Starting Retail Sales Data Analysis...")
-print("Loading data (this may take a few minutes due to the large file size)...")
+# Aggregations replaced by merged HyperLogLog sketches in approximate mode
+DISTINCT_AGGREGATIONS = {'total_transactions': 'SLIP_NO', 'total_items': 'ITEM_ID'}
 
-# Load the data using Dask for better memory management with large files
-# Try to read from CSV first, if not available, use the Parquet file
-import os
 
-csv_path = 'data/convertedcsv/MCCS_RetailData.csv'
-parquet_path = 'data/rawdata/MCCS_RetailData.parquet'
-sample_parquet_path = 'retail_data_sample.parquet'
-
-if os.path.exists(csv_path):
-    print(f"Reading from CSV file: {csv_path}")
-    df = dd.read_csv(csv_path, 
-                    assume_missing=True,
-                    blocksize="64MB")  # Adjust blocksize as needed
-elif os.path.exists(parquet_path):
-    print(f"CSV file not found. Reading from Parquet file: {parquet_path}")
-    df = dd.read_parquet(parquet_path)
-elif os.path.exists(sample_parquet_path):
-    print(f"Using sample Parquet file: {sample_parquet_path}")
-    df = dd.read_parquet(sample_parquet_path)
-else:
-    raise FileNotFoundError("Could not find retail data in CSV or Parquet format. Please ensure either file exists.")
-
-# Convert date columns to datetime - using flexible format detection
-df['SALE_DATE'] = dd.to_datetime(df['SALE_DATE'], errors='coerce')
-df['SALE_DATE_TIME'] = dd.to_datetime(df['SALE_DATE_TIME'], errors='coerce')
-
-# Create a month column for monthly analysis
-df['MONTH'] = df['SALE_DATE'].dt.month
-df['MONTH_NAME'] = df['SALE_DATE'].dt.month_name()
-df['DAY_OF_WEEK'] = df['SALE_DATE'].dt.day_name()
-df['HOUR'] = df['SALE_DATE_TIME'].dt.hour
-
-# Create a flag for returns
-df['IS_RETURN'] = df['RETURN_IND'] == 'Y'
-
-# Compute basic statistics
-with ProgressBar():
-    print("Computing basic statistics...")
-    # Convert to pandas for easier analysis after aggregation
-    total_sales = df['EXTENSION_AMOUNT'].sum().compute()
-    total_transactions = df['SLIP_NO'].nunique().compute()
-    total_items = df['ITEM_ID'].nunique().compute()
-    total_quantity = df['QTY'].sum().compute()
-    return_rate = df['IS_RETURN'].mean().compute() * 100
-    
-    # Get unique stores and commands
-    stores = df['SITE_NAME'].unique().compute()
-    commands = df['COMMAND_NAME'].unique().compute()
-    store_formats = df['STORE_FORMAT'].unique().compute()
-
-print(f"\nAnalysis Period: Dec 2024 - Jan 2025")
-print(f"Total Sales: ${total_sales:,.2f}")
-print(f"Total Transactions: {total_transactions:,}")
-print(f"Total Unique Items: {total_items:,}")
-print(f"Total Quantity Sold: {total_quantity:,}")
-print(f"Return Rate: {return_rate:.2f}%")
-print(f"Number of Stores: {len(stores)}")
-print(f"Number of Commands: {len(commands)}")
-print(f"Store Formats: {', '.join(store_formats)}")
+def build_tables(results):
+    """Turn the raw aggregation results into the tables used for charts and the report"""
+    tables = {}
 
-# ----------------------
-# Temporal Trend Analysis
-# ----------------------
-print("\nAnalyzing temporal trends...")
-
-# Daily sales trend
-daily_sales = df.groupby('SALE_DATE')['EXTENSION_AMOUNT'].sum().compute().reset_index()
-daily_sales = daily_sales.sort_values('SALE_DATE')
-
-# Plot daily sales trend
-plt.figure(figsize=(15, 6))
-plt.plot(daily_sales['SALE_DATE'], daily_sales['EXTENSION_AMOUNT'], marker='o', linestyle='-')
-plt.title('Daily Sales Trend (Dec 2024 - Jan 2025)')
-plt.xlabel('Date')
-plt.ylabel('Sales Amount ($)')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('retail_analysis_results/daily_sales_trend.png')
-
-# Weekly sales trend
-daily_sales['WEEK'] = daily_sales['SALE_DATE'].dt.isocalendar().week
-weekly_sales = daily_sales.groupby('WEEK')['EXTENSION_AMOUNT'].sum().reset_index()
-
-plt.figure(figsize=(12, 6))
-plt.bar(weekly_sales['WEEK'], weekly_sales['EXTENSION_AMOUNT'])
-plt.title('Weekly Sales Trend')
-plt.xlabel('Week Number')
-plt.ylabel('Sales Amount ($)')
-plt.grid(True, axis='y')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/weekly_sales_trend.png')
-
-# Day of week analysis
-day_of_week_sales = df.groupby('DAY_OF_WEEK')['EXTENSION_AMOUNT'].sum().compute().reset_index()
-# Reorder days
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-day_of_week_sales['DAY_OF_WEEK'] = pd.Categorical(day_of_week_sales['DAY_OF_WEEK'], categories=day_order, ordered=True)
-day_of_week_sales = day_of_week_sales.sort_values('DAY_OF_WEEK')
-
-plt.figure(figsize=(12, 6))
-sns.barplot(x='DAY_OF_WEEK', y='EXTENSION_AMOUNT', data=day_of_week_sales)
-plt.title('Sales by Day of Week')
-plt.xlabel('Day of Week')
-plt.ylabel('Sales Amount ($)')
-plt.grid(True, axis='y')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/sales_by_day_of_week.png')
-
-# Hour of day analysis
-hourly_sales = df.groupby('HOUR')['EXTENSION_AMOUNT'].sum().compute().reset_index()
-
-plt.figure(figsize=(14, 6))
-sns.barplot(x='HOUR', y='EXTENSION_AMOUNT', data=hourly_sales)
-plt.title('Sales by Hour of Day')
-plt.xlabel('Hour of Day')
-plt.ylabel('Sales Amount ($)')
-plt.grid(True, axis='y')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/sales_by_hour.png')
+    daily_sales = results['daily_sales'].reset_index().sort_values('SALE_DATE')
+    tables['daily_sales'] = daily_sales
 
-# ----------------------
-# Product Analysis
-# ----------------------
-print("\nAnalyzing product trends...")
-
-# Top selling products by revenue
-top_products_revenue = df.groupby(['ITEM_ID', 'ITEM_DESC'])['EXTENSION_AMOUNT'].sum().compute().reset_index()
-top_products_revenue = top_products_revenue.sort_values('EXTENSION_AMOUNT', ascending=False).head(20)
-
-plt.figure(figsize=(15, 8))
-sns.barplot(x='EXTENSION_AMOUNT', y='ITEM_DESC', data=top_products_revenue)
-plt.title('Top 20 Products by Revenue')
-plt.xlabel('Revenue ($)')
-plt.ylabel('Product')
-plt.grid(True, axis='x')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/top_products_revenue.png')
-
-# Top selling products by quantity
-top_products_quantity = df.groupby(['ITEM_ID', 'ITEM_DESC'])['QTY'].sum().compute().reset_index()
-top_products_quantity = top_products_quantity.sort_values('QTY', ascending=False).head(20)
-
-plt.figure(figsize=(15, 8))
-sns.barplot(x='QTY', y='ITEM_DESC', data=top_products_quantity)
-plt.title('Top 20 Products by Quantity Sold')
-plt.xlabel('Quantity Sold')
-plt.ylabel('Product')
-plt.grid(True, axis='x')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/top_products_quantity.png')
-
-# Price status analysis
-price_status_sales = df.groupby('PRICE_STATUS')['EXTENSION_AMOUNT'].sum().compute().reset_index()
-price_status_count = df.groupby('PRICE_STATUS').size().compute().reset_index(name='COUNT')
-
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-sns.barplot(x='PRICE_STATUS', y='EXTENSION_AMOUNT', data=price_status_sales, ax=ax1)
-ax1.set_title('Sales by Price Status')
-ax1.set_xlabel('Price Status (R=Regular, P=Promotion, M=Markdown)')
-ax1.set_ylabel('Sales Amount ($)')
-ax1.grid(True, axis='y')
-
-sns.barplot(x='PRICE_STATUS', y='COUNT', data=price_status_count, ax=ax2)
-ax2.set_title('Transaction Count by Price Status')
-ax2.set_xlabel('Price Status (R=Regular, P=Promotion, M=Markdown)')
-ax2.set_ylabel('Number of Transactions')
-ax2.grid(True, axis='y')
-
-plt.tight_layout()
-plt.savefig('retail_analysis_results/price_status_analysis.png')
+    # Weekly sales trend
+    weekly = daily_sales.assign(WEEK=daily_sales['SALE_DATE'].dt.isocalendar().week)
+    tables['weekly_sales'] = weekly.groupby('WEEK')['EXTENSION_AMOUNT'].sum().reset_index()
 
-# ----------------------
-# Store Analysis
-# ----------------------
-print("\nAnalyzing store performance...")
-
-# Sales by store format
-store_format_sales = df.groupby('STORE_FORMAT')['EXTENSION_AMOUNT'].sum().compute().reset_index()
-
-plt.figure(figsize=(10, 6))
-sns.barplot(x='STORE_FORMAT', y='EXTENSION_AMOUNT', data=store_format_sales)
-plt.title('Sales by Store Format')
-plt.xlabel('Store Format')
-plt.ylabel('Sales Amount ($)')
-plt.grid(True, axis='y')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/sales_by_store_format.png')
-
-# Sales by command
-command_sales = df.groupby('COMMAND_NAME')['EXTENSION_AMOUNT'].sum().compute().reset_index()
-command_sales = command_sales.sort_values('EXTENSION_AMOUNT', ascending=False)
-
-plt.figure(figsize=(15, 8))
-sns.barplot(x='EXTENSION_AMOUNT', y='COMMAND_NAME', data=command_sales)
-plt.title('Sales by Command')
-plt.xlabel('Sales Amount ($)')
-plt.ylabel('Command Name')
-plt.grid(True, axis='x')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/sales_by_command.png')
-
-# Top performing stores
-store_sales = df.groupby(['SITE_ID', 'SITE_NAME'])['EXTENSION_AMOUNT'].sum().compute().reset_index()
-store_sales = store_sales.sort_values('EXTENSION_AMOUNT', ascending=False).head(20)
-
-plt.figure(figsize=(15, 8))
-sns.barplot(x='EXTENSION_AMOUNT', y='SITE_NAME', data=store_sales)
-plt.title('Top 20 Stores by Revenue')
-plt.xlabel('Revenue ($)')
-plt.ylabel('Store Name')
-plt.grid(True, axis='x')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/top_stores_revenue.png')
+    # Day codes (Monday=0) become ordered day names
+    day_of_week_sales = results['day_of_week_sales'].reset_index()
+    day_names = day_of_week_sales['DAY_OF_WEEK'].map(dict(enumerate(DAY_NAMES)))
+    day_of_week_sales['DAY_OF_WEEK'] = pd.Categorical(day_names, categories=DAY_NAMES, ordered=True)
+    tables['day_of_week_sales'] = day_of_week_sales.sort_values('DAY_OF_WEEK')
 
-# ----------------------
-# Transaction Analysis
-# ----------------------
-print("\nAnalyzing transaction patterns...")
-
-# Calculate transaction size (items per transaction)
-transaction_size = df.groupby('SLIP_NO')['QTY'].sum().compute().reset_index()
-transaction_size_stats = transaction_size['QTY'].describe()
-
-plt.figure(figsize=(10, 6))
-sns.histplot(transaction_size['QTY'], bins=30, kde=True)
-plt.title('Distribution of Transaction Size (Items per Transaction)')
-plt.xlabel('Number of Items')
-plt.ylabel('Frequency')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('retail_analysis_results/transaction_size_distribution.png')
-
-# Calculate transaction value
-transaction_value = df.groupby('SLIP_NO')['EXTENSION_AMOUNT'].sum().compute().reset_index()
-transaction_value_stats = transaction_value['EXTENSION_AMOUNT'].describe()
-
-plt.figure(figsize=(10, 6))
-sns.histplot(transaction_value['EXTENSION_AMOUNT'], bins=30, kde=True)
-plt.title('Distribution of Transaction Value')
-plt.xlabel('Transaction Value ($)')
-plt.ylabel('Frequency')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('retail_analysis_results/transaction_value_distribution.png')
+    tables['hourly_sales'] = results['hourly_sales'].reset_index().sort_values('HOUR')
+
+    tables['top_products_revenue'] = results['top_products_revenue']
+    tables['top_products_quantity'] = results['top_products_quantity']
+
+    # Return rates of the best sellers (see retail_aggregations.BEST_SELLERS)
+    products = results['best_seller_totals']
+    products = products[products['RETURN_LINES'] > 0]
+    return_by_product = products.assign(RETURN_RATE=products['RETURN_LINES'] / products['LINES'] * 100)
+    tables['return_by_product'] = return_by_product.sort_values('RETURN_RATE', ascending=False).head(20)
+
+    price_status = results['price_status_sales'].reset_index()
+    tables['price_status_sales'] = price_status[['PRICE_STATUS', 'EXTENSION_AMOUNT']]
+    tables['price_status_count'] = price_status[['PRICE_STATUS', 'COUNT']]
+
+    tables['store_format_sales'] = results['store_format_sales'].reset_index()
+    tables['command_sales'] = results['command_sales'].reset_index().sort_values('EXTENSION_AMOUNT', ascending=False)
+
+    stores = results['store_sales'].reset_index()
+    tables['store_sales'] = stores.sort_values('EXTENSION_AMOUNT', ascending=False).head(20)
+
+    return_by_store = stores.assign(RETURN_RATE=stores['RETURN_LINES'] / stores['LINES'] * 100)
+    tables['return_by_store'] = return_by_store.sort_values('RETURN_RATE', ascending=False).head(20)
+
+    tables['transactions'] = results['transactions']
+
+    return tables
+
+
+def build_summary(results, tables):
+    """Collect the headline metrics shown on screen and in the summary report"""
+    return {
+        'total_sales': results['total_sales'],
+        'total_transactions': results['total_transactions'],
+        'total_items': results['total_items'],
+        'total_quantity': results['total_quantity'],
+        'return_rate': results['return_lines'] / results['total_lines'] * 100 if results['total_lines'] else 0,
+        'stores': results['stores'],
+        'commands': results['commands'],
+        'store_formats': results['store_formats'],
+        'transaction_stats': transaction_distribution(tables['transactions']),
+        'period': period_label(tables['daily_sales']['SALE_DATE']),
+    }
 
-# ----------------------
-# Return Analysis
-# ----------------------
-print("\nAnalyzing return patterns...")
-
-# Return rate by product
-return_by_product = df.groupby(['ITEM_ID', 'ITEM_DESC']).agg({'IS_RETURN': 'mean'}).compute().reset_index()
-return_by_product = return_by_product.sort_values('IS_RETURN', ascending=False).head(20)
-return_by_product['RETURN_RATE'] = return_by_product['IS_RETURN'] * 100
-
-plt.figure(figsize=(15, 8))
-sns.barplot(x='RETURN_RATE', y='ITEM_DESC', data=return_by_product)
-plt.title('Top 20 Products by Return Rate')
-plt.xlabel('Return Rate (%)')
-plt.ylabel('Product')
-plt.grid(True, axis='x')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/top_products_return_rate.png')
-
-# Return rate by store
-return_by_store = df.groupby(['SITE_ID', 'SITE_NAME']).agg({'IS_RETURN': 'mean'}).compute().reset_index()
-return_by_store = return_by_store.sort_values('IS_RETURN', ascending=False).head(20)
-return_by_store['RETURN_RATE'] = return_by_store['IS_RETURN'] * 100
-
-plt.figure(figsize=(15, 8))
-sns.barplot(x='RETURN_RATE', y='SITE_NAME', data=return_by_store)
-plt.title('Top 20 Stores by Return Rate')
-plt.xlabel('Return Rate (%)')
-plt.ylabel('Store')
-plt.grid(True, axis='x')
-plt.tight_layout()
-plt.savefig('retail_analysis_results/top_stores_return_rate.png')
 
 # ----------------------
 # Generate Summary Report
 # ----------------------
-print("\nGenerating summary report...")
-
-with open('retail_analysis_results/summary_report.txt', 'w') as f:
-    f.write("MCCS Retail Sales Data Analysis Summary\n")
-    f.write("======================================\n\n")
-    f.write(f"Analysis Period: Dec 2024 - Jan 2025\n")
-    f.write(f"Total Sales: ${total_sales:,.2f}\n")
-    f.write(f"Total Transactions: {total_transactions:,}\n")
-    f.write(f"Total Unique Items: {total_items:,}\n")
-    f.write(f"Total Quantity Sold: {total_quantity:,}\n")
-    f.write(f"Return Rate: {return_rate:.2f}%\n")
-    f.write(f"Number of Stores: {len(stores)}\n")
-    f.write(f"Number of Commands: {len(commands)}\n")
-    f.write(f"Store Formats: {', '.join(store_formats)}\n\n")
-    
-    f.write("Key Insights:\n")
-    f.write("-------------\n")
-    
-    # Top selling day of week
-    top_day = day_of_week_sales.loc[day_of_week_sales['EXTENSION_AMOUNT'].idxmax()]
-    f.write(f"1. Highest sales occur on {top_day['DAY_OF_WEEK']}s\n")
-    
-    # Top selling hour
-    top_hour = hourly_sales.loc[hourly_sales['EXTENSION_AMOUNT'].idxmax()]
-    f.write(f"2. Peak sales hour is {int(top_hour['HOUR'])}:00h (24-hour format)\n")
-    
-    # Top product
-    top_product = top_products_revenue.iloc[0]
-    f.write(f"3. Best-selling product by revenue: {top_product['ITEM_DESC']} (${top_product['EXTENSION_AMOUNT']:,.2f})\n")
-    
-    # Top store
-    top_store = store_sales.iloc[0]
-    f.write(f"4. Top performing store: {top_store['SITE_NAME']} (${top_store['EXTENSION_AMOUNT']:,.2f})\n")
-    
-    # Price status insight
-    regular_sales = price_status_sales[price_status_sales['PRICE_STATUS'] == 'R']['EXTENSION_AMOUNT'].iloc[0]
-    promo_sales = price_status_sales[price_status_sales['PRICE_STATUS'] == 'P']['EXTENSION_AMOUNT'].iloc[0] if 'P' in price_status_sales['PRICE_STATUS'].values else 0
-    markdown_sales = price_status_sales[price_status_sales['PRICE_STATUS'] == 'M']['EXTENSION_AMOUNT'].iloc[0] if 'M' in price_status_sales['PRICE_STATUS'].values else 0
-    
-    f.write(f"5. Regular-priced items account for ${regular_sales:,.2f} in sales ({regular_sales/total_sales*100:.1f}% of total)\n")
-    if promo_sales > 0:
-        f.write(f"6. Promotional items account for ${promo_sales:,.2f} in sales ({promo_sales/total_sales*100:.1f}% of total)\n")
-    if markdown_sales > 0:
-        f.write(f"7. Markdown items account for ${markdown_sales:,.2f} in sales ({markdown_sales/total_sales*100:.1f}% of total)\n")
-    
-    # Transaction insights
-    f.write(f"8. Average transaction value: ${transaction_value_stats['mean']:,.2f}\n")
-    f.write(f"9. Average items per transaction: {transaction_size_stats['mean']:.2f}\n")
-    
-    # Return insights
-    f.write(f"10. Product with highest return rate: {return_by_product.iloc[0]['ITEM_DESC']} ({return_by_product.iloc[0]['RETURN_RATE']:.2f}%)\n")
-
-print("\nAnalysis complete! Results saved to 'retail_analysis_results' directory.")
-print("Run the script with 'python retail_trends_analysis.py' to execute the analysis.")
+def _estimate_note(summary):
+    """Suffix marking distinct counts that are HyperLogLog estimates"""
+    return ' (HyperLogLog estimate)' if summary.get('distinct_approximate') else ''
+
+
+def write_summary_report(summary, tables, file_path=f'{OUTPUT_DIR}/summary_report.txt'):
+    """Write the plain-text summary report read by retail_llm_insights"""
+    total_sales = summary['total_sales']
+    day_of_week_sales = tables['day_of_week_sales']
+    hourly_sales = tables['hourly_sales']
+    price_status_sales = tables['price_status_sales']
+    return_by_product = tables['return_by_product']
+
+    with open(file_path, 'w') as f:
+        f.write("MCCS Retail Sales Data Analysis Summary\n")
+        f.write("======================================\n\n")
+        f.write(f"Analysis Period: {summary['period']}\n")
+        if summary.get('scope'):
+            f.write(f"Scope: {summary['scope']}\n")
+        f.write(f"Total Sales: ${total_sales:,.2f}\n")
+        f.write(f"Total Transactions: {summary['total_transactions']:,}{_estimate_note(summary)}\n")
+        f.write(f"Total Unique Items: {summary['total_items']:,}{_estimate_note(summary)}\n")
+        f.write(f"Total Quantity Sold: {summary['total_quantity']:,}\n")
+        f.write(f"Return Rate: {summary['return_rate']:.2f}%\n")
+        f.write(f"Number of Stores: {len(summary['stores'])}\n")
+        f.write(f"Number of Commands: {len(summary['commands'])}\n")
+        f.write(f"Store Formats: {', '.join(summary['store_formats'])}\n\n")
+
+        f.write("Key Insights:\n")
+        f.write("-------------\n")
+
+        # Top selling day of week
+        top_day = day_of_week_sales.loc[day_of_week_sales['EXTENSION_AMOUNT'].idxmax()]
+        f.write(f"1. Highest sales occur on {top_day['DAY_OF_WEEK']}s\n")
+
+        # Top selling hour
+        top_hour = hourly_sales.loc[hourly_sales['EXTENSION_AMOUNT'].idxmax()]
+        f.write(f"2. Peak sales hour is {int(top_hour['HOUR'])}:00h (24-hour format)\n")
+
+        # Top product
+        top_product = tables['top_products_revenue'].iloc[0]
+        f.write(f"3. Best-selling product by revenue: {top_product['ITEM_DESC']} (${top_product['EXTENSION_AMOUNT']:,.2f})\n")
+
+        # Top store
+        top_store = tables['store_sales'].iloc[0]
+        f.write(f"4. Top performing store: {top_store['SITE_NAME']} (${top_store['EXTENSION_AMOUNT']:,.2f})\n")
+
+        # Price status insight
+        regular_sales = price_status_sales[price_status_sales['PRICE_STATUS'] == 'R']['EXTENSION_AMOUNT'].iloc[0] if 'R' in price_status_sales['PRICE_STATUS'].values else 0
+        promo_sales = price_status_sales[price_status_sales['PRICE_STATUS'] == 'P']['EXTENSION_AMOUNT'].iloc[0] if 'P' in price_status_sales['PRICE_STATUS'].values else 0
+        markdown_sales = price_status_sales[price_status_sales['PRICE_STATUS'] == 'M']['EXTENSION_AMOUNT'].iloc[0] if 'M' in price_status_sales['PRICE_STATUS'].values else 0
+
+        f.write(f"5. Regular-priced items account for ${regular_sales:,.2f} in sales ({regular_sales/total_sales*100:.1f}% of total)\n")
+        if promo_sales > 0:
+            f.write(f"6. Promotional items account for ${promo_sales:,.2f} in sales ({promo_sales/total_sales*100:.1f}% of total)\n")
+        if markdown_sales > 0:
+            f.write(f"7. Markdown items account for ${markdown_sales:,.2f} in sales ({markdown_sales/total_sales*100:.1f}% of total)\n")
+
+        # Transaction insights
+        value_stats = summary['transaction_stats'].loc['EXTENSION_AMOUNT']
+        size_stats = summary['transaction_stats'].loc['QTY']
+        f.write(f"8. Average transaction value: ${value_stats['mean']:,.2f} "
+                f"(median ${value_stats['50%']:,.2f}, 90th percentile ${value_stats['90%']:,.2f})\n")
+        f.write(f"9. Average items per transaction: {size_stats['mean']:.2f} "
+                f"(median {size_stats['50%']:.0f}, 90th percentile {size_stats['90%']:.0f})\n")
+
+        # Return insights
+        if not return_by_product.empty:
+            f.write(f"10. Best seller with highest return rate: {return_by_product.iloc[0]['ITEM_DESC']} ({return_by_product.iloc[0]['RETURN_RATE']:.2f}%)\n")
+
+
+def print_summary(summary):
+    """Print the headline metrics to the console"""
+    print(f"\nAnalysis Period: {summary['period']}")
+    if summary.get('scope'):
+        print(f"Scope: {summary['scope']}")
+    print(f"Total Sales: ${summary['total_sales']:,.2f}")
+    print(f"Total Transactions: {summary['total_transactions']:,}{_estimate_note(summary)}")
+    print(f"Total Unique Items: {summary['total_items']:,}{_estimate_note(summary)}")
+    print(f"Total Quantity Sold: {summary['total_quantity']:,}")
+    print(f"Return Rate: {summary['return_rate']:.2f}%")
+    print(f"Number of Stores: {len(summary['stores'])}")
+    print(f"Number of Commands: {len(summary['commands'])}")
+    print(f"Store Formats: {', '.join(summary['store_formats'])}")
+
+
+def _scope_label(start_date=None, end_date=None, commands=None, site_ids=None, store_formats=None):
+    """Human-readable description of the predicates a run is limited to"""
+    parts = []
+    if start_date is not None or end_date is not None:
+        parts.append(f"SALE_DATE {start_date or '...'} to {end_date or '...'}")
+    for label, values in (('Commands', commands), ('Sites', site_ids), ('Store formats', store_formats)):
+        if values:
+            parts.append(f"{label}: {', '.join(str(value) for value in values)}")
+    return '; '.join(parts)
+
+
+def run_analysis(start_date=None, end_date=None, commands=None, site_ids=None, store_formats=None,
+                 output_dir=OUTPUT_DIR, distinct_mode='exact', incremental=False, chart_workers=None,
+                 redraw_charts=False, blocksize='64MB'):
+    """Run the analysis, optionally limited to a date range, commands, sites or store formats
+
+    The predicates are pushed into the read, so with the partitioned dataset
+    a single-installation or single-month report only scans its own
+    partitions and row groups. Scoped runs write their charts, report and
+    transaction table to output_dir but leave the dashboard cube and
+    sketches untouched, since those must cover all the data.
+
+    Args:
+        start_date (date-like, optional): First SALE_DATE to include
+        end_date (date-like, optional): Last SALE_DATE to include
+        commands (list, optional): COMMAND_NAME values to include
+        site_ids (list, optional): SITE_ID values to include
+        store_formats (list, optional): STORE_FORMAT values to include
+        output_dir (str): Directory for the charts, summary report, metrics, store anomalies
+            and transaction table
+        distinct_mode (str): 'exact' counts distinct transactions and items
+            with hash sets; 'approximate' estimates them from the HyperLogLog
+            sketches computed in the same pass
+        incremental (bool): Aggregate only the days the previous incremental
+            runs have not aggregated and merge them into the persisted
+            aggregates (see retail_incremental.py). Cannot be scoped.
+        chart_workers (int, optional): Processes rendering the charts
+        redraw_charts (bool): Redraw every chart, even if its tables are unchanged
+        blocksize (str): Target size of each Dask partition
+
+    Returns:
+        dict: 'results' (raw aggregation results), 'tables' (the tables
+        behind the charts) and 'summary' (the headline metrics)
+    """
+    if distinct_mode not in ('exact', 'approximate'):
+        raise ValueError(f"distinct_mode must be 'exact' or 'approximate', not {distinct_mode!r}")
+    scope = _scope_label(start_date, end_date, commands, site_ids, store_formats)
+    if incremental and scope:
+        raise ValueError("Incremental runs always cover the full dataset and cannot be scoped")
+
+    # Create output directory for visualizations
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("Starting Retail Sales Data Analysis...")
+    if scope:
+        print(f"Limited to {scope}")
+
+    if incremental:
+        # Only SALE_DATE partitions not aggregated yet are read; the cube and
+        # sketches are appended to in place
+        print("Updating the persisted aggregates with days not aggregated yet...")
+        state_tables, totals, watermark = update_aggregates(blocksize=blocksize)
+        if watermark is None:
+            print("No sales to aggregate yet")
+        else:
+            print(f"Aggregates cover {watermark['first_sale_date']} to {watermark['last_sale_date']}")
+        results = state_results(state_tables, totals, TOP_N)
+        cube = load_cube()
+        sketches = load_sketches()
+    else:
+        print("Loading data (this may take a few minutes due to the large file size)...")
+
+        # Load the data using Dask for better memory management with large files.
+        # The partitioned Parquet dataset is used when it exists, reading only
+        # the columns the analysis needs and only the rows in scope.
+        df = prepare_retail_data(read_retail_data(
+            columns=ANALYSIS_COLUMNS, start_date=start_date, end_date=end_date, commands=commands,
+            store_formats=store_formats, site_ids=site_ids, blocksize=blocksize))
+
+        # Every registered aggregation is evaluated over one shared graph, so the
+        # data is scanned and its dates parsed a single time
+        print("Computing all aggregations in a single pass...")
+        names = list(AGGREGATIONS)
+        if distinct_mode == 'approximate':
+            names = [name for name in names if name not in DISTINCT_AGGREGATIONS]
+        results = compute_aggregations(df, names)
+
+        # Top products: exact totals for the heavy-hitter candidates only in one
+        # more pass, instead of grouping the whole catalog
+        rankings, _ = verified_top_products(df, results, TOP_N)
+        results.update(rankings)
+
+        # The dashboard cube and sketches fall out of the same pass; persist
+        # them when the run covers all the data
+        cube = finalize_cube(results['cube'])
+        sketches = finalize_sketches(results['distinct_sketches'])
+        if not scope:
+            save_cube(cube)
+            print(f"Saved dashboard cube to {cube_path}")
+            save_sketches(sketches)
+            print(f"Saved distinct-count sketches to {sketch_path}")
+
+    # One row per receipt; basket size and value distributions are read from it
+    results['transactions'] = finalize_transactions(results['transactions'])
+    transactions_file = os.path.join(output_dir, os.path.basename(transactions_path))
+    saved_days = transaction_days(transactions_file)
+    if incremental and watermark is not None and saved_days <= set(watermark['ingested_days']):
+        # Incremental runs only write the days the table does not hold yet
+        sale_days = results['transactions']['SALE_DATE'].dt.strftime('%Y-%m-%d')
+        new_rows = results['transactions'][~sale_days.isin(sorted(saved_days))]
+        save_transactions(new_rows, transactions_file, append=True)
+        print(f"Added {new_rows['SALE_DATE'].nunique()} days to the transaction table in {transactions_file}")
+    else:
+        save_transactions(results['transactions'], transactions_file)
+        print(f"Saved transaction table to {transactions_file}")
+
+    # Every store's daily sales scored against its own day-of-week-adjusted
+    # baseline, from the site x day cells of the cube
+    anomalies_file = os.path.join(output_dir, os.path.basename(anomalies_path))
+    flagged = save_anomalies(detect_anomalies(cube), anomalies_file)
+    print(f"Saved {len(flagged):,} anomalous store-days to {anomalies_file}")
+
+    if distinct_mode == 'approximate':
+        for name, column in DISTINCT_AGGREGATIONS.items():
+            results[name] = count_distinct(sketches, column)
+    tables = build_tables(results)
+    summary = build_summary(results, tables)
+    summary['distinct_approximate'] = distinct_mode == 'approximate'
+    summary['scope'] = scope
+
+    print_summary(summary)
+
+    # Charts are drawn in worker processes; unchanged ones are skipped
+    print("\nRendering charts...")
+    rendered, skipped = render_charts(tables, output_dir, workers=chart_workers, force=redraw_charts)
+    print(f"Rendered {len(rendered)} charts, {len(skipped)} unchanged since the last run")
+
+    print("\nGenerating summary report...")
+    write_summary_report(summary, tables, os.path.join(output_dir, 'summary_report.txt'))
+
+    # Structured version of the report; retail_llm_insights builds its prompt
+    # from it and reuses a cached answer while the fingerprint is unchanged
+    fingerprint = metrics_fingerprint(source_fingerprint(), scope, distinct_mode, incremental)
+    metrics = build_metrics(summary, tables, fingerprint)
+    metrics_file = os.path.join(output_dir, os.path.basename(metrics_path))
+    save_metrics(metrics, metrics_file)
+    print(f"Saved summary metrics to {metrics_file}")
+
+    print(f"\nAnalysis complete! Results saved to '{output_dir}' directory.")
+    return {'results': results, 'tables': tables, 'summary': summary}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Analyze MCCS retail sales trends')
+    parser.add_argument('--start', type=str, default=None, help='First SALE_DATE to include (YYYY-MM-DD)')
+    parser.add_argument('--end', type=str, default=None, help='Last SALE_DATE to include (YYYY-MM-DD)')
+    parser.add_argument('--command', nargs='+', default=None, help='Only analyze these COMMAND_NAMEs')
+    parser.add_argument('--site', type=int, nargs='+', default=None, help='Only analyze these SITE_IDs')
+    parser.add_argument('--store-format', nargs='+', default=None, help='Only analyze these STORE_FORMATs')
+    parser.add_argument('--output-dir', type=str, default=OUTPUT_DIR,
+                        help='Directory for the charts, summary report and transaction table')
+    parser.add_argument('--distinct', choices=['exact', 'approximate'], default='exact',
+                        help='Count distinct transactions and items exactly or with HyperLogLog sketches')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only aggregate days added since the last incremental run and merge them into the stored aggregates')
+    parser.add_argument('--chart-workers', type=int, default=None,
+                        help='Processes rendering the charts (default: one per chart to draw, up to the CPU count)')
+    parser.add_argument('--redraw-charts', action='store_true',
+                        help='Redraw every chart, even those whose input tables have not changed')
+    add_cluster_arguments(parser)
+
+    args = parser.parse_args()
+    report_path = args.performance_report or os.path.join(args.output_dir, performance_report_name)
+    cluster = (dask_cluster(args.workers, args.threads_per_worker, args.memory_limit, args.spill_dir, report_path)
+               if args.cluster else contextlib.nullcontext())
+    with cluster:
+        run_analysis(start_date=args.start, end_date=args.end, commands=args.command, site_ids=args.site,
+                     store_formats=args.store_format, output_dir=args.output_dir, distinct_mode=args.distinct,
+                     incremental=args.incremental, chart_workers=args.chart_workers,
+                     redraw_charts=args.redraw_charts, blocksize=args.blocksize)
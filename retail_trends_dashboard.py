@@ -11,6 +11,14 @@ import dask.dataframe as dd
 from datetime import datetime, timedelta
 import warnings
 import retail_llm_insights
+from retail_data import (ANALYSIS_COLUMNS, DAY_NAMES, prepare_retail_data, read_retail_data,
+                         sample_parquet_path, with_item_descriptions)
+from retail_anomalies import THRESHOLD, detect_anomalies, flagged_days
+from retail_cube import build_cube, load_cube, query_cube, rollup
+from retail_query import query_rows, query_top_products
+from retail_filter_index import build_filter_index, select_rows
+from retail_sketches import build_sketches, count_distinct, load_sketches
+from retail_sampling import estimate_ratio, estimate_total, stratified_sample
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
@@ -54,6 +62,10 @@ st.markdown("""
         font-size: 1rem;
         color: #4B5563;
     }
+    .metric-ci {
+        font-size: 0.85rem;
+        color: #6B7280;
+    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -61,6 +73,9 @@ st.markdown("""
 st.markdown('<div class="main-header">MCCS Retail Sales Analysis Dashboard</div>', unsafe_allow_html=True)
 st.markdown('Interactive analysis of Marine Corps Community Services retail sales data (Dec 2024 - Jan 2025)')
 
+# Seed for the fast preview sample
+SAMPLE_SEED = 42
+
 # Sidebar
 st.sidebar.title("Filters & Controls")
 st.sidebar.markdown("Use these filters to explore the data")
@@ -68,50 +83,31 @@ st.sidebar.markdown("Use these filters to explore the data")
 # Function to load data
 @st.cache_data
 def load_data():
-    """Load the retail data and return as a pandas DataFrame"""
-    # For initial loading, we'll use a smaller sample to make the app responsive
-    # In a production environment, you might want to use Dask for the full dataset
-    
+    """Load a seeded, stratified 10% sample of the retail data for the fast preview mode"""
     st.info("Loading data... This may take a few minutes for the first run.")
     
     try:
-        # Try to load a cached version if it exists
-        if os.path.exists('retail_data_sample.parquet'):
-            df = pd.read_parquet('retail_data_sample.parquet')
-            st.success("Loaded data from cache.")
-        else:
-            # Define file paths
-            csv_path = 'data/convertedcsv/MCCS_RetailData.csv'
-            parquet_path = 'data/rawdata/MCCS_RetailData.parquet'
-            
-            # Try to load from CSV first, then Parquet if CSV doesn't exist
-            if os.path.exists(csv_path):
-                st.info(f"Loading from CSV file: {csv_path}")
-                ddf = dd.read_csv(csv_path, assume_missing=True, blocksize="64MB")
-            elif os.path.exists(parquet_path):
-                st.info(f"Loading from Parquet file: {parquet_path}")
-                ddf = dd.read_parquet(parquet_path)
+        # Try to load a cached version if it exists. Samples cached before the
+        # stratified sampler carry no weights, and older ones day names
+        # instead of day codes; both are rebuilt.
+        df = None
+        if os.path.exists(sample_parquet_path):
+            df = pd.read_parquet(sample_parquet_path)
+            if 'SAMPLE_WEIGHT' in df.columns and pd.api.types.is_numeric_dtype(df['DAY_OF_WEEK']):
+                st.success("Loaded data from cache.")
             else:
-                raise FileNotFoundError("Could not find retail data in CSV or Parquet format")
-            
-            # Take a sample for interactive analysis
-            # In a real app, you might want to use the full dataset with Dask
-            # or implement more sophisticated sampling
-            df = ddf.sample(frac=0.1).compute()
+                df = None
+        if df is None:
+            # Read the partitioned Parquet dataset if it has been built, falling
+            # back to the CSV or monolithic Parquet file
+            ddf = prepare_retail_data(read_retail_data(columns=ANALYSIS_COLUMNS))
             
-            # Convert date columns - using flexible format detection
-            df['SALE_DATE'] = pd.to_datetime(df['SALE_DATE'], errors='coerce')
-            df['SALE_DATE_TIME'] = pd.to_datetime(df['SALE_DATE_TIME'], errors='coerce')
-            
-            # Add derived columns
-            df['MONTH'] = df['SALE_DATE'].dt.month
-            df['MONTH_NAME'] = df['SALE_DATE'].dt.month_name()
-            df['DAY_OF_WEEK'] = df['SALE_DATE'].dt.day_name()
-            df['HOUR'] = df['SALE_DATE_TIME'].dt.hour
-            df['IS_RETURN'] = df['RETURN_IND'] == 'Y'
+            # Sample whole transactions within every store and day, with a
+            # fixed seed so the preview is reproducible
+            df = stratified_sample(ddf, frac=0.1, seed=SAMPLE_SEED)
             
             # Save to parquet for faster loading next time
-            df.to_parquet('retail_data_sample.parquet')
+            df.to_parquet(sample_parquet_path)
             st.success("Data loaded and cached for future use.")
     
     except Exception as e:
@@ -122,21 +118,110 @@ def load_data():
             'EXTENSION_AMOUNT': np.random.randint(10, 1000, size=62),
             'STORE_FORMAT': np.random.choice(['MAIN STORE', 'MARINE MART'], size=62),
             'COMMAND_NAME': np.random.choice(['29 PALMS', 'YUMA', 'CAMP PENDLETON'], size=62),
-            'ITEM_DESC': np.random.choice(['PRODUCT A', 'PRODUCT B', 'PRODUCT C'], size=62),
+            'ITEM_ID': np.random.choice([101, 102, 103], size=62),
             'QTY': np.random.randint(1, 10, size=62),
             'PRICE_STATUS': np.random.choice(['R', 'P', 'M'], size=62),
-            'IS_RETURN': np.random.choice([True, False], p=[0.05, 0.95], size=62)
+            'IS_RETURN': np.random.choice([True, False], p=[0.05, 0.95], size=62),
+            'SITE_ID': 1,
+            'SITE_NAME': 'DEMO STORE',
+            'SLIP_NO': np.arange(62),
+            'HOUR': np.random.randint(6, 22, size=62),
         })
+        df['DAY_OF_WEEK'] = df['SALE_DATE'].dt.dayofweek
+        # Every demo row stands for itself
+        df['STRATUM_POPULATION'] = 1
+        df['STRATUM_SAMPLED'] = 1
+        df['SAMPLE_WEIGHT'] = 1.0
         st.warning("Using demo data due to loading error.")
     
     return df
 
-# Load the data
-df = load_data()
+@st.cache_resource
+def get_filter_index():
+    """Sort the preview sample by date and build its filter bitmaps once per session"""
+    return build_filter_index(load_data())
+
+@st.cache_resource
+def get_cube():
+    """Load the pre-aggregated cube, building it from the full dataset on first use"""
+    cube = load_cube()
+    if cube is None:
+        with st.spinner("Building the retail cube from the full dataset. This only happens once..."):
+            cube = build_cube()
+    return cube
+
+@st.cache_resource
+def get_sketches():
+    """Load the per day/site distinct-count sketches, building them on first use"""
+    sketches = load_sketches()
+    if sketches is None:
+        with st.spinner("Building distinct-count sketches from the full dataset. This only happens once..."):
+            sketches = build_sketches()
+    return sketches
+
+@st.cache_data(show_spinner="Querying the full dataset...")
+def get_exact_aggregates(start_date, end_date, store_format, command, price_status, include_returns,
+                         count_transactions=True):
+    """Compute the receipt- and item-level aggregates the cube cannot answer"""
+    results = query_top_products(
+        10, ['total_transactions'] if count_transactions else [],
+        start_date=start_date, end_date=end_date, store_format=store_format,
+        command=command, price_status=price_status, include_returns=include_returns
+    )
+    # Only the counts and top products leave this function, keeping the cached result small
+    return {
+        'total_transactions': int(results['total_transactions']) if count_transactions else None,
+        'top_products_revenue': results['top_products_revenue'][['ITEM_DESC', 'EXTENSION_AMOUNT']],
+        'top_products_quantity': results['top_products_quantity'][['ITEM_DESC', 'QTY']],
+    }
+
+@st.cache_data(show_spinner="Fetching rows from the full dataset...")
+def get_exact_rows(start_date, end_date, store_format, command, price_status, include_returns):
+    """Fetch the first rows of the filtered full dataset for the data explorer"""
+    return query_rows(
+        start_date=start_date, end_date=end_date, store_format=store_format,
+        command=command, price_status=price_status, include_returns=include_returns
+    )
+
+# Data mode: the full dataset gives exact numbers for production reporting;
+# the fast preview works on an in-memory 10% sample
+data_mode = st.sidebar.radio(
+    "Data Mode",
+    ["Full dataset (exact)", "Fast preview (10% sample)"],
+    help="Full dataset mode answers every number from all rows: totals and charts from the pre-aggregated cube, "
+         "transactions and product rankings from one filtered query over the Parquet data, cached per filter. "
+         "Fast preview estimates everything from a stratified 10% sample of transactions held in memory, "
+         "with 95% confidence intervals."
+)
+full_mode = data_mode == "Full dataset (exact)"
+
+if full_mode:
+    try:
+        cube = get_cube()
+    except FileNotFoundError as e:
+        st.error(f"Full dataset not available ({e}). Falling back to the fast preview.")
+        full_mode = False
+
+if full_mode:
+    # Transaction counts can come from merged HyperLogLog sketches instead of
+    # an exact distinct count over the filtered rows
+    distinct_mode = st.sidebar.radio(
+        "Transaction Counts",
+        ["Exact", "Approximate (HyperLogLog)"],
+        help="Exact counts distinct receipts over the filtered rows. Approximate merges the stored per day/site "
+             "sketches (about 0.8% error) without counting rows. Price status and return filters are not "
+             "covered by the sketches and always use exact counts."
+    )
+    df = None
+    filter_source = cube
+else:
+    filter_index = get_filter_index()
+    df = filter_index['frame']
+    filter_source = df
 
 # Date range filter
-min_date = df['SALE_DATE'].min().date()
-max_date = df['SALE_DATE'].max().date()
+min_date = filter_source['SALE_DATE'].min().date()
+max_date = filter_source['SALE_DATE'].max().date()
 
 date_range = st.sidebar.date_input(
     "Select Date Range",
@@ -147,62 +232,140 @@ date_range = st.sidebar.date_input(
 
 if len(date_range) == 2:
     start_date, end_date = date_range
-    filtered_df = df[(df['SALE_DATE'].dt.date >= start_date) & 
-                     (df['SALE_DATE'].dt.date <= end_date)]
 else:
-    filtered_df = df
+    start_date, end_date = min_date, max_date
 
 # Store format filter
-store_formats = ['All'] + sorted(df['STORE_FORMAT'].unique().tolist())
+store_formats = ['All'] + sorted(filter_source['STORE_FORMAT'].dropna().unique().tolist())
 selected_format = st.sidebar.selectbox("Store Format", store_formats)
 
-if selected_format != 'All':
-    filtered_df = filtered_df[filtered_df['STORE_FORMAT'] == selected_format]
-
 # Command filter
-commands = ['All'] + sorted(df['COMMAND_NAME'].unique().tolist())
+commands = ['All'] + sorted(filter_source['COMMAND_NAME'].dropna().unique().tolist())
 selected_command = st.sidebar.selectbox("Command", commands)
 
-if selected_command != 'All':
-    filtered_df = filtered_df[filtered_df['COMMAND_NAME'] == selected_command]
-
 # Price status filter
-price_statuses = ['All'] + sorted(df['PRICE_STATUS'].unique().tolist())
+price_statuses = ['All'] + sorted(filter_source['PRICE_STATUS'].dropna().unique().tolist())
 selected_price_status = st.sidebar.selectbox("Price Status", price_statuses, 
                                             help="R=Regular, P=Promotion, M=Markdown")
 
-if selected_price_status != 'All':
-    filtered_df = filtered_df[filtered_df['PRICE_STATUS'] == selected_price_status]
-
 # Include/exclude returns
 include_returns = st.sidebar.checkbox("Include Returns", value=True)
-if not include_returns:
-    filtered_df = filtered_df[~filtered_df['IS_RETURN']]
+
+filters = {
+    'start_date': start_date,
+    'end_date': end_date,
+    'store_format': None if selected_format == 'All' else selected_format,
+    'command': None if selected_command == 'All' else selected_command,
+    'price_status': None if selected_price_status == 'All' else selected_price_status,
+    'include_returns': include_returns,
+}
+
+# Aggregates behind the metric cards and charts. In full dataset mode they are
+# roll-ups of the matching cube cells plus one cached filtered query for what
+# the cube cannot answer; only aggregated results reach Streamlit. In preview
+# mode they are computed from the filtered sample.
+if full_mode:
+    cells = query_cube(cube, **filters)
+    # Sketches are kept per day and site, so they answer date, store format
+    # and command filters (both follow from the site) but not line-level ones
+    sketch_covered = filters['price_status'] is None and filters['include_returns']
+    approximate_transactions = sketch_covered and distinct_mode != "Exact"
+    exact = get_exact_aggregates(**filters, count_transactions=not approximate_transactions)
+    row_count = int(cells['LINES'].sum())
+    total_sales = cells['EXTENSION_AMOUNT'].sum()
+    card_notes = {}
+    if sketch_covered:
+        estimate = count_distinct(get_sketches(), 'SLIP_NO', start_date, end_date,
+                                  site_ids=cells['SITE_ID'].unique())
+    if approximate_transactions:
+        total_transactions = estimate
+        card_notes['total_transactions'] = "HyperLogLog estimate"
+    else:
+        total_transactions = exact['total_transactions']
+        if sketch_covered:
+            card_notes['total_transactions'] = f"HyperLogLog estimate: {estimate:,}"
+        elif distinct_mode != "Exact":
+            card_notes['total_transactions'] = "Exact: filters not covered by the sketches"
+    return_lines = cells.loc[cells['IS_RETURN'].astype(bool), 'LINES'].sum()
+    return_rate = return_lines / row_count * 100 if row_count > 0 else 0
+    daily_sales = rollup(cells, 'SALE_DATE')
+    day_of_week_sales = daily_sales.groupby(daily_sales['SALE_DATE'].dt.dayofweek.rename('DAY_OF_WEEK'))['EXTENSION_AMOUNT'].sum().reset_index()
+    hourly_sales = rollup(cells, 'HOUR')
+    top_products_revenue = exact['top_products_revenue']
+    top_products_quantity = exact['top_products_quantity']
+    store_format_sales = rollup(cells, 'STORE_FORMAT')
+    store_sales = rollup(cells, 'SITE_NAME')
+    price_status_sales = rollup(cells, 'PRICE_STATUS')
+    price_status_count = price_status_sales.rename(columns={'LINES': 'COUNT'})
+else:
+    # The date range is a slice of the date-sorted sample and the other
+    # filters an AND of precomputed bitmaps (see retail_filter_index.py)
+    filtered_df = select_rows(filter_index, **filters)
+
+    # Sums over the sample are scaled back to population estimates with the
+    # stratum weights; MARGIN is the half-width of the 95% confidence interval
+    def estimate_by(column, by, name=None):
+        estimates = estimate_total(filtered_df, column, by=by)
+        return estimates.rename(columns={'ESTIMATE': name or column})[[by, name or column, 'MARGIN']]
+
+    row_count = len(filtered_df)
+    sales_estimate = estimate_total(filtered_df, 'EXTENSION_AMOUNT')
+    transactions_estimate = estimate_total(filtered_df, 'TRANSACTIONS')
+    avg_transaction_estimate = estimate_ratio(filtered_df, 'EXTENSION_AMOUNT', 'TRANSACTIONS')
+    return_rate_estimate = estimate_ratio(filtered_df, 'IS_RETURN', 'LINES') * 100
+    total_sales = sales_estimate['ESTIMATE']
+    total_transactions = int(round(transactions_estimate['ESTIMATE']))
+    return_rate = return_rate_estimate['ESTIMATE']
+    daily_sales = estimate_by('EXTENSION_AMOUNT', 'SALE_DATE')
+    day_of_week_sales = estimate_by('EXTENSION_AMOUNT', 'DAY_OF_WEEK')
+    hourly_sales = estimate_by('EXTENSION_AMOUNT', 'HOUR')
+    top_products_revenue = with_item_descriptions(estimate_by('EXTENSION_AMOUNT', 'ITEM_ID').nlargest(10, 'EXTENSION_AMOUNT'))
+    top_products_quantity = with_item_descriptions(estimate_by('QTY', 'ITEM_ID').nlargest(10, 'QTY'))
+    store_format_sales = estimate_by('EXTENSION_AMOUNT', 'STORE_FORMAT')
+    store_sales = estimate_by('EXTENSION_AMOUNT', 'SITE_NAME')
+    price_status_sales = estimate_by('EXTENSION_AMOUNT', 'PRICE_STATUS')
+    price_status_count = estimate_by('LINES', 'PRICE_STATUS', name='COUNT')
+
+    card_notes = {
+        'total_sales': f"±${sales_estimate['MARGIN']:,.2f} (95% CI)",
+        'total_transactions': f"±{transactions_estimate['MARGIN']:,.0f} (95% CI)",
+        'avg_transaction': f"±${avg_transaction_estimate['MARGIN']:,.2f} (95% CI)",
+        'return_rate': f"±{return_rate_estimate['MARGIN']:.2f} pts (95% CI)",
+    }
+
+# Preview mode shows 95% confidence intervals under the metric cards and as
+# error bars on the charts; the full dataset mode is exact and shows neither,
+# apart from flagging approximate transaction counts
+card_notes = {name: f'<div class="metric-ci">{note}</div>' for name, note in card_notes.items()}
+error_column = None if full_mode else 'MARGIN'
 
 # Display dataset info
 st.sidebar.markdown("---")
-st.sidebar.markdown(f"**Rows in filtered data:** {len(filtered_df):,}")
+st.sidebar.markdown(f"**Rows in filtered data:** {row_count:,}")
 st.sidebar.markdown(f"**Date range:** {start_date} to {end_date}")
+if not full_mode:
+    st.sidebar.caption("Fast preview: numbers are population estimates from a stratified 10% sample of "
+                       "transactions, shown with 95% confidence intervals. Row count is the sampled rows.")
 
 # Main dashboard content
 # Key metrics row
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_sales = filtered_df['EXTENSION_AMOUNT'].sum()
     st.markdown(f"""
     <div class="metric-card">
         <div class="metric-value">${total_sales:,.2f}</div>
         <div class="metric-label">Total Sales</div>
+        {card_notes.get('total_sales', '')}
     </div>
     """, unsafe_allow_html=True)
 
 with col2:
-    total_transactions = filtered_df['SLIP_NO'].nunique()
     st.markdown(f"""
     <div class="metric-card">
         <div class="metric-value">{total_transactions:,}</div>
         <div class="metric-label">Transactions</div>
+        {card_notes.get('total_transactions', '')}
     </div>
     """, unsafe_allow_html=True)
 
@@ -212,15 +375,16 @@ with col3:
     <div class="metric-card">
         <div class="metric-value">${avg_transaction:.2f}</div>
         <div class="metric-label">Avg Transaction Value</div>
+        {card_notes.get('avg_transaction', '')}
     </div>
     """, unsafe_allow_html=True)
 
 with col4:
-    return_rate = filtered_df['IS_RETURN'].mean() * 100
     st.markdown(f"""
     <div class="metric-card">
         <div class="metric-value">{return_rate:.2f}%</div>
         <div class="metric-label">Return Rate</div>
+        {card_notes.get('return_rate', '')}
     </div>
     """, unsafe_allow_html=True)
 
@@ -233,37 +397,35 @@ tab1, tab2, tab3 = st.tabs(["Daily Trends", "Weekly Patterns", "Hourly Analysis"
 
 with tab1:
     # Daily sales trend
-    daily_sales = filtered_df.groupby(filtered_df['SALE_DATE'].dt.date)['EXTENSION_AMOUNT'].sum().reset_index()
     daily_sales = daily_sales.sort_values('SALE_DATE')
     
     fig = px.line(daily_sales, x='SALE_DATE', y='EXTENSION_AMOUNT', 
                  title='Daily Sales Trend',
                  labels={'SALE_DATE': 'Date', 'EXTENSION_AMOUNT': 'Sales Amount ($)'},
-                 markers=True)
+                 markers=True, error_y=error_column)
     fig.update_layout(height=500)
     st.plotly_chart(fig, use_container_width=True)
 
 with tab2:
     # Day of week analysis
-    day_of_week_sales = filtered_df.groupby(filtered_df['DAY_OF_WEEK'])['EXTENSION_AMOUNT'].sum().reset_index()
-    # Reorder days
-    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    day_of_week_sales['DAY_OF_WEEK'] = pd.Categorical(day_of_week_sales['DAY_OF_WEEK'], categories=day_order, ordered=True)
+    # Day codes (Monday=0) become ordered day names
+    day_names = day_of_week_sales['DAY_OF_WEEK'].map(dict(enumerate(DAY_NAMES)))
+    day_of_week_sales['DAY_OF_WEEK'] = pd.Categorical(day_names, categories=DAY_NAMES, ordered=True)
     day_of_week_sales = day_of_week_sales.sort_values('DAY_OF_WEEK')
     
     fig = px.bar(day_of_week_sales, x='DAY_OF_WEEK', y='EXTENSION_AMOUNT',
                 title='Sales by Day of Week',
-                labels={'DAY_OF_WEEK': 'Day of Week', 'EXTENSION_AMOUNT': 'Sales Amount ($)'})
+                labels={'DAY_OF_WEEK': 'Day of Week', 'EXTENSION_AMOUNT': 'Sales Amount ($)'},
+                error_y=error_column)
     fig.update_layout(height=500)
     st.plotly_chart(fig, use_container_width=True)
 
 with tab3:
     # Hour of day analysis
-    hourly_sales = filtered_df.groupby(filtered_df['HOUR'])['EXTENSION_AMOUNT'].sum().reset_index()
-    
     fig = px.bar(hourly_sales, x='HOUR', y='EXTENSION_AMOUNT',
                 title='Sales by Hour of Day',
-                labels={'HOUR': 'Hour of Day (24h)', 'EXTENSION_AMOUNT': 'Sales Amount ($)'})
+                labels={'HOUR': 'Hour of Day (24h)', 'EXTENSION_AMOUNT': 'Sales Amount ($)'},
+                error_y=error_column)
     fig.update_layout(height=500)
     st.plotly_chart(fig, use_container_width=True)
 
@@ -276,23 +438,19 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Top products by revenue
-    top_products_revenue = filtered_df.groupby('ITEM_DESC')['EXTENSION_AMOUNT'].sum().reset_index()
-    top_products_revenue = top_products_revenue.sort_values('EXTENSION_AMOUNT', ascending=False).head(10)
-    
     fig = px.bar(top_products_revenue, y='ITEM_DESC', x='EXTENSION_AMOUNT', orientation='h',
                 title='Top 10 Products by Revenue',
-                labels={'ITEM_DESC': 'Product', 'EXTENSION_AMOUNT': 'Revenue ($)'})
+                labels={'ITEM_DESC': 'Product', 'EXTENSION_AMOUNT': 'Revenue ($)'},
+                error_x=error_column)
     fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     # Top products by quantity
-    top_products_quantity = filtered_df.groupby('ITEM_DESC')['QTY'].sum().reset_index()
-    top_products_quantity = top_products_quantity.sort_values('QTY', ascending=False).head(10)
-    
     fig = px.bar(top_products_quantity, y='ITEM_DESC', x='QTY', orientation='h',
                 title='Top 10 Products by Quantity Sold',
-                labels={'ITEM_DESC': 'Product', 'QTY': 'Quantity Sold'})
+                labels={'ITEM_DESC': 'Product', 'QTY': 'Quantity Sold'},
+                error_x=error_column)
     fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
     st.plotly_chart(fig, use_container_width=True)
 
@@ -305,8 +463,6 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Sales by store format
-    store_format_sales = filtered_df.groupby('STORE_FORMAT')['EXTENSION_AMOUNT'].sum().reset_index()
-    
     fig = px.pie(store_format_sales, values='EXTENSION_AMOUNT', names='STORE_FORMAT',
                 title='Sales by Store Format',
                 hole=0.4)
@@ -315,17 +471,60 @@ with col1:
 
 with col2:
     # Top stores
-    store_sales = filtered_df.groupby('SITE_NAME')['EXTENSION_AMOUNT'].sum().reset_index()
     store_sales = store_sales.sort_values('EXTENSION_AMOUNT', ascending=False).head(10)
     
     fig = px.bar(store_sales, y='SITE_NAME', x='EXTENSION_AMOUNT', orientation='h',
                 title='Top 10 Stores by Revenue',
-                labels={'SITE_NAME': 'Store', 'EXTENSION_AMOUNT': 'Revenue ($)'})
+                labels={'SITE_NAME': 'Store', 'EXTENSION_AMOUNT': 'Revenue ($)'},
+                error_x=error_column)
     fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
     st.plotly_chart(fig, use_container_width=True)
 
 st.markdown("---")
 
+# Store anomalies
+st.markdown('<div class="sub-header">Store Anomalies</div>', unsafe_allow_html=True)
+
+if full_mode:
+    # All stores are scored at once from the site x day cells of the cube;
+    # each day is compared with the store's trailing, day-of-week-adjusted baseline
+    threshold = st.slider("Z-score threshold", min_value=2.0, max_value=5.0, value=THRESHOLD, step=0.5,
+                          help="Days whose day-of-week-adjusted sales are this many standard deviations "
+                               "from the store's trailing 28-day baseline are flagged")
+    store_scores = detect_anomalies(cells, threshold=threshold) if len(cells) else None
+    if store_scores is None or not store_scores['IS_ANOMALY'].any():
+        st.info("No anomalous store-days in the selected data.")
+    else:
+        anomalies = flagged_days(store_scores)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            fig = px.scatter(anomalies, x='SALE_DATE', y='SITE_NAME', color='Z_SCORE', size=anomalies['Z_SCORE'].abs(),
+                             color_continuous_scale='RdBu_r', color_continuous_midpoint=0,
+                             title=f'Anomalous Store-Days ({len(anomalies):,})',
+                             labels={'SALE_DATE': 'Date', 'SITE_NAME': 'Store', 'Z_SCORE': 'Z-score'})
+            fig.update_layout(height=500)
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            selected_store = st.selectbox("Store", anomalies['SITE_NAME'].unique().tolist())
+            store_days = store_scores[store_scores['SITE_NAME'] == selected_store]
+            fig = px.line(store_days, x='SALE_DATE', y=['EXTENSION_AMOUNT', 'EXPECTED'],
+                          title=f'Daily Sales vs Expected: {selected_store}',
+                          labels={'SALE_DATE': 'Date', 'value': 'Sales Amount ($)', 'variable': ''})
+            flagged_store_days = store_days[store_days['IS_ANOMALY']]
+            fig.add_trace(go.Scatter(x=flagged_store_days['SALE_DATE'], y=flagged_store_days['EXTENSION_AMOUNT'],
+                                     mode='markers', marker={'size': 12, 'color': 'red'}, name='Anomaly'))
+            fig.update_layout(height=500)
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.dataframe(anomalies, use_container_width=True)
+else:
+    st.info("Store anomalies need every store's exact daily sales. Switch to the full dataset mode to see them.")
+
+st.markdown("---")
+
 # Price status analysis
 st.markdown('<div class="sub-header">Price Status Analysis</div>', unsafe_allow_html=True)
 
@@ -333,8 +532,6 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Sales by price status
-    price_status_sales = filtered_df.groupby('PRICE_STATUS')['EXTENSION_AMOUNT'].sum().reset_index()
-    
     fig = px.pie(price_status_sales, values='EXTENSION_AMOUNT', names='PRICE_STATUS',
                 title='Sales by Price Status',
                 labels={'PRICE_STATUS': 'Price Status (R=Regular, P=Promotion, M=Markdown)'},
@@ -344,11 +541,10 @@ with col1:
 
 with col2:
     # Transaction count by price status
-    price_status_count = filtered_df.groupby('PRICE_STATUS').size().reset_index(name='COUNT')
-    
     fig = px.bar(price_status_count, x='PRICE_STATUS', y='COUNT',
                 title='Transaction Count by Price Status',
-                labels={'PRICE_STATUS': 'Price Status (R=Regular, P=Promotion, M=Markdown)', 'COUNT': 'Number of Transactions'})
+                labels={'PRICE_STATUS': 'Price Status (R=Regular, P=Promotion, M=Markdown)', 'COUNT': 'Number of Transactions'},
+                error_y=error_column)
     fig.update_layout(height=400)
     st.plotly_chart(fig, use_container_width=True)
 
@@ -357,7 +553,10 @@ st.markdown("---")
 st.markdown('<div class="sub-header">Data Explorer</div>', unsafe_allow_html=True)
 
 if st.checkbox("Show Raw Data Sample"):
-    st.write(filtered_df.head(100))
+    if full_mode:
+        st.write(get_exact_rows(**filters))
+    else:
+        st.write(with_item_descriptions(filtered_df.head(100)))
 
 # AI Insights
 st.markdown("---")
@@ -384,18 +583,19 @@ with st.expander("Generate AI Insights", expanded=False):
         else:
             with st.spinner("Generating AI insights... This may take a moment."):
                 try:
-                    # Read the summary report
-                    summary_content = retail_llm_insights.read_summary_report()
+                    # The prompt is built from the summary metrics (or the plain-text
+                    # report); an unchanged question about unchanged data is served
+                    # from the insights cache without calling OpenAI
+                    metrics = retail_llm_insights.read_metrics()
+                    summary_content = None if metrics else retail_llm_insights.read_summary_report()
                     
-                    if summary_content:
-                        # Configure OpenAI client
-                        openai_client = retail_llm_insights.configure_openai_client(api_key)
-                        
+                    if metrics or summary_content:
                         # Generate insights
                         insights = retail_llm_insights.generate_retail_insights(
                             summary_content=summary_content,
                             question=question if question_type == "Specific Question" else None,
-                            openai_client=openai_client
+                            metrics=metrics,
+                            api_key=api_key
                         )
                         
                         # Display insights
@@ -54,12 +54,16 @@ fi
 echo "Dependencies installed successfully."
 
 # Check if the data files exist
+dataset_path="data/rawdata/MCCS_RetailData_dataset"
 csv_path="data/convertedcsv/MCCS_RetailData.csv"
 parquet_path="data/rawdata/MCCS_RetailData.parquet"
 sample_parquet_path="retail_data_sample.parquet"
 
-if [ -f "$csv_path" ]; then
+if [ -d "$dataset_path" ]; then
+    echo "Found partitioned retail Parquet dataset at: $dataset_path"
+elif [ -f "$csv_path" ]; then
     echo "Found retail data CSV file at: $csv_path"
+    echo "Tip: run 'python retail_data.py' once to build the faster partitioned Parquet dataset."
 elif [ -f "$parquet_path" ]; then
     echo "Found retail data Parquet file at: $parquet_path"
 elif [ -f "$sample_parquet_path" ]; then
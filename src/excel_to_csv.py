@@ -1,24 +1,94 @@
+import argparse
+import re
+import time
+import numpy as np
 import pandas as pd
 import os
 
+# Question categories
+RATING_QUESTIONS = ['Satisfaction', 'Cleanliness', 'Service', 'Price', 'Checkout', 'Store Atmosphere', 'Merchandise']
+BINARY_QUESTIONS = ['Contact?', 'Purchase All']
+MULTI_SELECT = ['MCX_Products Purchased', 'MCX_Program Awareness']
+DEMOGRAPHIC = ['Military Affiliation', 'Demos: Branch of Service', 'Demos: Gender']
+
+ANSWER_COLUMNS = ['answerLabels', 'answerDisplayLabels', 'answerTexts']
+
+# A questionLabel containing any of the category names
+RATING_LABEL = re.compile('|'.join(map(re.escape, RATING_QUESTIONS)))
+BINARY_LABEL = re.compile('|'.join(map(re.escape, BINARY_QUESTIONS)))
+
+# Rating answers at the ends of the 1-5 scale; the low end is checked first
+RATING_LOW = re.compile('1=|Poor|Very unlikely|Falls short')
+RATING_HIGH = re.compile('5=|Excellent|Very Likely|Strongly Agree')
+
+# Marks a rating answer that is left as it is
+_KEEP = object()
+
+excel_file = '../data/rawdata/CustomerSurveyResponses.xlsx'
+
 def to_filename(string):
     return "_".join(string.split())
 
+def _rating_value(value):
+    text = str(value)
+    if RATING_LOW.search(text):
+        return 1
+    if RATING_HIGH.search(text):
+        return 5
+    if text.isdigit():
+        return int(text)
+    return _KEEP
+
+def _label_mask(codes, uniques, pattern):
+    """Rows whose questionLabel matches pattern, testing each distinct label once"""
+    matches = np.array([isinstance(label, str) and pattern.search(label) is not None for label in uniques] + [False])
+    # Missing labels have code -1 and pick the trailing False
+    return matches[codes]
+
 def process_survey_responses(df):
-    # Question categories
-    RATING_QUESTIONS = ['Satisfaction', 'Cleanliness', 'Service', 'Price', 'Checkout', 'Store Atmosphere']
-    BINARY_QUESTIONS = ['Contact?', 'Purchase All'] 
-    MULTI_SELECT = ['MCX_Products Purchased', 'MCX_Program Awareness']
-    DEMOGRAPHIC = ['Military Affiliation', 'Demos: Branch of Service', 'Demos: Gender']
+    """Convert rating answers to 1-5 and Yes/No answers to 1/0, in place
+
+    Each distinct questionLabel is classified once. Rating answers are
+    mapped once per distinct answer and written back a whole column at a
+    time. Multi-select and demographic answers keep their text.
+
+    Args:
+        df (pd.DataFrame): Survey responses with questionLabel and the ANSWER_COLUMNS
+
+    Returns:
+        pd.DataFrame: The same frame, converted
+    """
+    codes, uniques = pd.factorize(df['questionLabel'])
+    rating = _label_mask(codes, uniques, RATING_LABEL)
+    # Labels matching both categories are ratings
+    binary = _label_mask(codes, uniques, BINARY_LABEL) & ~rating
+    rating_rows, binary_rows = np.flatnonzero(rating), np.flatnonzero(binary)
 
-    # Process answer columns based on question type
+    for col in ANSWER_COLUMNS:
+        values = df[col]
+        answer_codes, answers = pd.factorize(values.iloc[rating_rows].astype(str))
+        lookup = np.array([_rating_value(answer) for answer in answers] + [_KEEP], dtype=object)
+        new_ratings = lookup[answer_codes]
+        changed = new_ratings != _KEEP
+        rows = np.concatenate([rating_rows[changed], binary_rows])
+        if not len(rows):
+            continue
+        new_values = np.empty(len(rows), dtype=object)
+        new_values[:changed.sum()] = new_ratings[changed]
+        new_values[changed.sum():] = [1 if is_yes else 0 for is_yes in values.iloc[binary_rows].to_numpy() == 'Yes']
+        if pd.api.types.is_string_dtype(values.dtype) and values.dtype != object:
+            # Text columns hold the numbers alongside the answers they did not convert
+            df[col] = values.astype(object)
+        df.iloc[rows, df.columns.get_loc(col)] = new_values
+
+    return df
+
+def _process_survey_responses_iterrows(df):
+    """The row-by-row conversion process_survey_responses() replaced, kept for benchmark()"""
     for idx, row in df.iterrows():
-       
         question_label = row['questionLabel']
-        
         if any(qt in question_label for qt in RATING_QUESTIONS):
-            # Convert rating scales 
-            for col in ['answerLabels', 'answerDisplayLabels', 'answerTexts']:
+            for col in ANSWER_COLUMNS:
                 value = str(row[col])
                 if '1=' in value or 'Poor' in value or 'Very unlikely' in value or 'Falls short' in value:
                     df.loc[idx, col] = 1
@@ -26,115 +96,105 @@ def process_survey_responses(df):
                     df.loc[idx, col] = 5
                 elif value.isdigit():
                     df.loc[idx, col] = int(value)
-        
         elif any(qt in question_label for qt in BINARY_QUESTIONS):
-            # Convert Yes/No to 1/0
-            for col in ['answerLabels', 'answerDisplayLabels', 'answerTexts']:
+            for col in ANSWER_COLUMNS:
                 df.loc[idx, col] = 1 if row[col] == 'Yes' else 0
-                
     return df
 
-excel_file = '../data/rawdata/CustomerSurveyResponses.xlsx'
-xls = pd.ExcelFile(excel_file)
-
-for sheet_name in xls.sheet_names:
-    print(sheet_name)
-    df = pd.read_excel(xls, sheet_name=sheet_name, skiprows=0)
-    df = df.iloc[:, :-1]  # Remove last column
-    
-    # Process survey responses
-    df = process_survey_responses(df)
-    
-    # Process other columns    import pandas as pd
-    import os
-    
-    def to_filename(string):
-        return "_".join(string.split())
-    
-    def process_survey_responses(df):
-        # Question categories
-        RATING_QUESTIONS = ['Satisfaction', 'Cleanliness', 'Service', 'Price', 'Checkout', 'Store Atmosphere', 'Merchandise']
-        BINARY_QUESTIONS = ['Contact?', 'Purchase All']
-        MULTI_SELECT = ['MCX_Products Purchased', 'MCX_Program Awareness']
-        DEMOGRAPHIC = ['Military Affiliation', 'Demos: Branch of Service', 'Demos: Gender']
-        
-        # Process answer columns based on question type
-        for idx, row in df.iterrows():
-            question_label = row['questionLabel']
-            
-            # Handle Rating Questions (1-5 scale)
-            if any(qt in question_label for qt in RATING_QUESTIONS):
-                for col in ['answerLabels', 'answerDisplayLabels', 'answerTexts']:
-                    value = str(row[col])
-                    if '1=' in value or 'Poor' in value or 'Very unlikely' in value or 'Falls short' in value:
-                        df.loc[idx, col] = 1
-                    elif '5=' in value or 'Excellent' in value or 'Very Likely' in value or 'Strongly Agree' in value:
-                        df.loc[idx, col] = 5
-                    elif value.isdigit():
-                        df.loc[idx, col] = int(value)
-            
-            # Handle Binary Questions
-            elif any(qt in question_label for qt in BINARY_QUESTIONS):
-                for col in ['answerLabels', 'answerDisplayLabels', 'answerTexts']:
-                    df.loc[idx, col] = 1 if row[col] == 'Yes' else 0
-            
-            # Handle Multi-select Questions
-            elif any(qt in question_label for qt in MULTI_SELECT):
-                # Keep original text values
-                continue
-                
-            # Handle Demographics
-            elif any(qt in question_label for qt in DEMOGRAPHIC):
-                # Keep original text values
-                continue
-        
-        # Convert responseTime to datetime
-        df['responseTime'] = pd.to_datetime(df['responseTime'])
-        
-        return df
-    
-    def main():
-        excel_file = 'CustomerSurveyResponses.xlsx'
-        xls = pd.ExcelFile(excel_file)
-        
-        for sheet_name in xls.sheet_names:
-            print(f"Processing sheet: {sheet_name}")
-            
-            # Read sheet
-            df = pd.read_excel(xls, sheet_name=sheet_name)
-            
-            # Remove last column
-            df = df.iloc[:, :-1]
-            
-            # Process survey responses
-            df = process_survey_responses(df)
-            
-            # Export to CSV
-            output_filename = f"../data/convertedcsv/{excel_file}-{to_filename(sheet_name)}.csv"
-            df.to_csv(output_filename, index=False)
-            print(f"Exported to: {output_filename}")
-    
-    if __name__ == "__main__":
-        main()
-    for col in df.columns:
-        if col.endswith("Rate") or col.endswith("Diff") or col.startswith("%") or col.endswith("%"):
-            df[col] = df[col].astype(str)
-        elif col in ["responseTime"]:
-            df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-        elif col in ["Email Domain", "Audience Name", "Audience Type", "Message Name", 
-                    "Campaign", "Social Network", "Outbound Post", "Media Type", 
-                    "Email Content Name", "Day Of Week", "Time Of Day", "Email Subject",
-                    "respondentId", "questionId", "questionName", "questionPhrase", 
-                    "questionType", "questionLabel"]:
-            df[col] = df[col].astype(str)
-        else:
-            try:
-                df[col] = df[col].astype(int)
-            except:
+def synthetic_responses(rows, seed=0):
+    """A survey sheet of rows responses covering every question category and answer form"""
+    rng = np.random.default_rng(seed)
+    labels = np.array(['Overall Satisfaction', 'Store Cleanliness', 'Customer Service', 'Price Perception',
+                       'Checkout Speed', 'Store Atmosphere', 'Merchandise Selection', 'Contact?',
+                       'Purchase All Items?', 'MCX_Products Purchased', 'MCX_Program Awareness',
+                       'Military Affiliation', 'Demos: Branch of Service', 'Demos: Gender'], dtype=object)
+    answers = np.array(['1=Poor', '2', '3', '4', '5=Excellent', 'Very unlikely', 'Very Likely', 'Falls short',
+                        'Strongly Agree', 'Neutral', 'Yes', 'No', 'Marine Corps', 'Female', 3, 2.5, np.nan],
+                       dtype=object)
+    df = pd.DataFrame({
+        'respondentId': np.arange(rows),
+        'questionLabel': labels[rng.integers(0, len(labels), rows)],
+        'responseTime': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 86400 * 31, rows), unit='s'),
+    })
+    for col in ANSWER_COLUMNS:
+        df[col] = pd.Series(answers[rng.integers(0, len(answers), rows)], dtype=object)
+    return df
+
+def benchmark(rows=1_000_000, reference_rows=20_000, seed=0):
+    """Time the vectorized conversion on a synthetic sheet against the row-by-row one
+
+    The row-by-row conversion takes minutes on a million rows, so it runs on
+    the first reference_rows only; the vectorized result for those rows must
+    match it exactly. Each row is converted independently, so the speedup
+    is compared per row.
+
+    Returns:
+        pd.DataFrame: Rows, milliseconds and microseconds per row of each version
+    """
+    df = synthetic_responses(rows, seed)
+    start = time.perf_counter()
+    vectorized = process_survey_responses(df.copy())
+    vectorized_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    reference = _process_survey_responses_iterrows(df.head(reference_rows).copy())
+    reference_ms = (time.perf_counter() - start) * 1000
+    pd.testing.assert_frame_equal(vectorized.head(reference_rows), reference)
+
+    report = pd.DataFrame([
+        {'VERSION': 'iterrows', 'ROWS': reference_rows, 'MS': reference_ms},
+        {'VERSION': 'vectorized', 'ROWS': rows, 'MS': vectorized_ms},
+    ])
+    report['US_PER_ROW'] = report['MS'] * 1000 / report['ROWS']
+    report['SPEEDUP'] = report['US_PER_ROW'].iloc[0] / report['US_PER_ROW']
+    return report.round(2)
+
+def main():
+    xls = pd.ExcelFile(excel_file)
+
+    for sheet_name in xls.sheet_names:
+        print(sheet_name)
+        df = pd.read_excel(xls, sheet_name=sheet_name, skiprows=0)
+        df = df.iloc[:, :-1]  # Remove last column
+
+        # Process survey responses
+        df = process_survey_responses(df)
+
+        # Process other columns
+        for col in df.columns:
+            if col.endswith("Rate") or col.endswith("Diff") or col.startswith("%") or col.endswith("%"):
+                df[col] = df[col].astype(str)
+            elif col in ["responseTime"]:
+                df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
+            elif col in ["Email Domain", "Audience Name", "Audience Type", "Message Name",
+                        "Campaign", "Social Network", "Outbound Post", "Media Type",
+                        "Email Content Name", "Day Of Week", "Time Of Day", "Email Subject",
+                        "respondentId", "questionId", "questionName", "questionPhrase",
+                        "questionType", "questionLabel"]:
                 df[col] = df[col].astype(str)
+            else:
+                try:
+                    df[col] = df[col].astype(int)
+                except:
+                    df[col] = df[col].astype(str)
 
-    sheet_name = to_filename(sheet_name)
-    filename = '-'.join([excel_file, sheet_name])
-    output_file = f"{filename}.csv"
-    df.to_csv(output_file, index=False)
-    print(f"Exported {sheet_name} to {output_file}")
+        sheet_name = to_filename(sheet_name)
+        filename = '-'.join([excel_file, sheet_name])
+        output_file = f"{filename}.csv"
+        df.to_csv(output_file, index=False)
+        print(f"Exported {sheet_name} to {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert the customer survey workbook to CSV')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Instead of converting, benchmark process_survey_responses on synthetic data')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic responses for --benchmark')
+    parser.add_argument('--reference_rows', type=int, default=20_000,
+                        help='Responses also converted row by row for --benchmark')
+
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(benchmark(args.rows, args.reference_rows).to_string(index=False))
+    else:
+        main()
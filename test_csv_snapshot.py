@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+import csv_snapshot
+from csv_snapshot import build_snapshot, read_source, read_table, stale_tables
+
+
+@pytest.fixture
+def sheets(tmp_path, monkeypatch):
+    source = tmp_path / 'convertedcsv'
+    monkeypatch.setattr(csv_snapshot, 'source_dir', str(source))
+    monkeypatch.setattr(csv_snapshot, 'snapshot_dir', str(tmp_path / 'snapshot'))
+    monkeypatch.setattr(csv_snapshot, 'manifest_path', str(tmp_path / 'snapshot' / 'snapshot_manifest.json'))
+    os.makedirs(source / 'Workbook')
+    pd.DataFrame({'Send Date': ['2025-01-02', '2025-01-03'], 'Weekday': ['Thursday', 'Friday'],
+                  'Email Domain': ['gmail.com', 'usmc.mil'], 'Sends': [10, 12], 'Open Rate': [0.5, 0.25]}
+                 ).to_csv(source / 'Workbook' / 'Workbook-Sends.csv', index=False)
+    pd.DataFrame({'Date': ['2025-01-02'], 'Impressions': [100]}).to_csv(source / 'Workbook' / 'Workbook-Posts.csv',
+                                                                       index=False)
+    # Files directly under convertedcsv are not sheets
+    pd.DataFrame({'A': [1]}).to_csv(source / 'retail.csv', index=False)
+    return ['Workbook/Workbook-Posts.csv', 'Workbook/Workbook-Sends.csv']
+
+
+def test_snapshot_matches_the_csv(sheets):
+    assert sorted(build_snapshot()) == sheets
+    assert stale_tables() == []
+    for table in sheets:
+        pd.testing.assert_frame_equal(read_table(table), read_source(table))
+    sends = read_table('Workbook/Workbook-Sends.csv')
+    assert list(sends['Weekday'].cat.categories[:2]) == ['Monday', 'Tuesday']
+    assert pd.api.types.is_datetime64_any_dtype(sends['Send Date'])
+
+
+def test_changed_csv_is_read_until_rebuilt(sheets):
+    build_snapshot()
+    path = os.path.join(csv_snapshot.source_dir, sheets[1])
+    pd.DataFrame({'Send Date': ['2025-02-01'], 'Weekday': ['Saturday'], 'Email Domain': ['gmail.com'],
+                  'Sends': [99], 'Open Rate': [0.1]}).to_csv(path, index=False)
+
+    assert stale_tables() == [sheets[1]]
+    assert read_table(sheets[1])['Sends'].tolist() == [99]
+    assert build_snapshot() == [sheets[1]]
+    assert stale_tables() == []
@@ -0,0 +1,50 @@
+import pandas as pd
+
+import data_loader
+from data_loader import DataCatalog, _with_fallback, load_data
+
+
+def test_each_access_gets_its_own_copy():
+    data = load_data()
+    sends = data['summary']['sends']
+    sends.loc[0, 'Sends'] = -1
+    sends['Extra'] = 0
+
+    again = data['summary']['sends']
+    assert again['Sends'].iloc[0] != -1
+    assert 'Extra' not in again.columns
+
+
+def test_tables_load_on_first_access_only():
+    calls = []
+
+    def load():
+        calls.append(1)
+        return pd.DataFrame({'A': [1]})
+
+    data = DataCatalog({'group': {'table': load}})
+    assert 'table' in data['group'] and not calls
+    data['group']['table']
+    data['group']['table']
+    assert len(calls) == 1
+    assert data.loaded_tables() == ['group.table']
+
+
+def test_unreadable_breakdowns_and_details_fall_back_to_empty_frames(monkeypatch):
+    def missing(table, manifest=None):
+        raise FileNotFoundError(table)
+
+    monkeypatch.setattr(data_loader, 'read_table', missing)
+    data = load_data()
+    for group in ('breakdowns', 'details', 'time_series'):
+        for name in data[group]:
+            table = data[group][name]
+            assert table.empty and len(table.columns) > 0, f'{group}.{name}'
+
+
+def test_fallback_keeps_the_expected_columns():
+    def failing():
+        raise ValueError('bad sheet')
+
+    table = _with_fallback(failing, ['Weekday', 'Sends'])()
+    assert table.empty and list(table.columns) == ['Weekday', 'Sends']
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from excel_to_csv import _process_survey_responses_iterrows, process_survey_responses, synthetic_responses
+
+
+def test_vectorized_matches_iterrows():
+    df = synthetic_responses(5_000, seed=3)
+    pd.testing.assert_frame_equal(process_survey_responses(df.copy()),
+                                  _process_survey_responses_iterrows(df.copy()))
+
+
+def test_string_columns_keep_unconverted_answers():
+    df = pd.DataFrame({
+        'questionLabel': ['Overall Satisfaction', 'Contact?', 'Demos: Gender', 'Store Cleanliness'],
+        'answerLabels': ['5=Excellent', 'Yes', 'Female', 'Neutral'],
+        'answerDisplayLabels': ['Poor', 'No', 'Male', '4'],
+        'answerTexts': ['Very Likely', 'Yes', 'Other', np.nan],
+    }).astype({'answerLabels': 'str', 'answerDisplayLabels': 'str'})
+    converted = process_survey_responses(df)
+    assert converted['answerLabels'].tolist() == [5, 1, 'Female', 'Neutral']
+    assert converted['answerDisplayLabels'].tolist() == [1, 0, 'Male', 4]
+    assert converted['answerTexts'].iloc[:3].tolist() == [5, 1, 'Other']
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import hyperloglog
+from retail_sketches import count_distinct
+
+# Relative standard error of PRECISION registers; estimates are checked
+# against four of them, which a correct sketch exceeds about once in 15,000
+STANDARD_ERROR = 1.04 / np.sqrt(1 << hyperloglog.PRECISION)
+
+
+@pytest.mark.parametrize('cardinality', [1, 10, 1_000, 50_000, 500_000])
+def test_estimate_within_error_bound(cardinality):
+    values = np.arange(cardinality, dtype='int64') * 7919 + 13
+    estimate = hyperloglog.estimate(hyperloglog.sketch(values))
+    assert abs(estimate - cardinality) <= max(4 * STANDARD_ERROR * cardinality, 1)
+
+
+def test_duplicates_do_not_count():
+    values = np.repeat(np.arange(20_000, dtype='int64'), 5)
+    assert hyperloglog.sketch(values).tolist() == hyperloglog.sketch(np.unique(values)).tolist()
+
+
+def test_merge_equals_sketch_of_union():
+    first, second = np.arange(0, 60_000, dtype='int64'), np.arange(40_000, 100_000, dtype='int64')
+    merged = hyperloglog.merge(hyperloglog.sketch(first), hyperloglog.sketch(second))
+    assert merged.tolist() == hyperloglog.sketch(np.union1d(first, second)).tolist()
+
+
+def test_count_distinct_merges_selected_days_and_sites():
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame({
+        'SALE_DATE': pd.Timestamp('2024-12-01') + pd.to_timedelta(rng.integers(0, 10, 200_000), unit='D'),
+        'SITE_ID': rng.integers(1, 6, 200_000),
+        'SLIP_NO': rng.integers(0, 80_000, 200_000),
+    })
+    frames = []
+    for (day, site), group in rows.groupby(['SALE_DATE', 'SITE_ID']):
+        registers = hyperloglog.sketch(group['SLIP_NO'])
+        nonzero = np.flatnonzero(registers)
+        frames.append(pd.DataFrame({'SALE_DATE': day, 'SITE_ID': site, 'COLUMN': 'SLIP_NO',
+                                    'REGISTER': nonzero, 'RANK': registers[nonzero]}))
+    sketches = pd.concat(frames, ignore_index=True)
+
+    selected = rows[(rows['SALE_DATE'] <= '2024-12-05') & rows['SITE_ID'].isin([1, 2])]
+    exact = selected['SLIP_NO'].nunique()
+    estimate = count_distinct(sketches, 'SLIP_NO', end_date='2024-12-05', site_ids=[1, 2])
+    assert abs(estimate - exact) <= 4 * STANDARD_ERROR * exact
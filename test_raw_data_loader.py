@@ -0,0 +1,110 @@
+import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import raw_data_loader
+from raw_data_loader import (SocialMediaData, _load_raw_data_read_excel, get_media_type,
+                             get_social_engagement_by_time_of, load_raw_data, load_workbooks)
+
+METADATA = "\nDashboard: Social Engagement / Overview\nWidget: {}\nTIME_INTERVAL: From:01-01-25 To:01-31-25"
+
+
+def _sheets():
+    def sheet(data):
+        return {'dashboard_name': None, 'widget_name': None, 'time_range': (None, None), 'data': pd.DataFrame(data)}
+    return {
+        "Social Engagement by Time of": sheet({'Day Of Week': ['Monday', 'Tuesday'],
+                                               'Total Engagements (SUM)': [10, 20]}),
+        "Engagement Distribution by M": sheet({'Media Type': ['Photo', 'Video'], 'Post Shares (SUM)': [1, 2]}),
+        "Engagement Reach by Media Ty": sheet({'Media Type': ['Photo', 'Video'], 'Post Reach (SUM)': [5, 6]}),
+    }
+
+
+def test_changing_a_view_leaves_the_next_view_unchanged():
+    data = SocialMediaData(_sheets())
+    view = get_social_engagement_by_time_of(data)
+    view.loc[0, 'Total Engagements'] = -1
+    view.rename(columns=str.upper, inplace=True)
+    view['Extra'] = 0
+
+    again = get_social_engagement_by_time_of(data)
+    assert list(again.columns) == ['Day Of Week', 'Total Engagements']
+    assert again['Total Engagements'].tolist() == [10, 20]
+
+
+def test_views_never_modify_the_loaded_sheets():
+    sheets = _sheets()
+    data = SocialMediaData(sheets)
+    view = get_social_engagement_by_time_of(data)
+    view.iloc[0, 1] = -1
+    media_type = get_media_type(data)
+
+    assert list(sheets["Social Engagement by Time of"]['data'].columns) == ['Day Of Week', 'Total Engagements (SUM)']
+    assert sheets["Social Engagement by Time of"]['data']['Total Engagements (SUM)'].tolist() == [10, 20]
+    assert list(media_type.columns) == ['Media Type', 'Post Shares', 'Post Reach']
+
+
+def test_views_are_computed_once_per_data_version():
+    data = SocialMediaData(_sheets())
+    get_media_type(data)
+    cached = data._views['media_type']
+    get_media_type(data)
+    assert data._views['media_type'] is cached
+
+
+def _write_workbook(path, widgets, empty_sheet=False):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for widget in widgets:
+        sheet = workbook.create_sheet(widget[:28])
+        sheet.append([METADATA.format(widget)])
+        sheet.append([])
+        sheet.append(['Date', 'Media Type', 'Posts', 'Reach (SUM)', 'Note'])
+        for day in range(1, 6):
+            sheet.append([datetime.datetime(2025, 1, day), 'Photo' if day % 2 else 'Video', day, day * 1.5,
+                          None if day % 3 else 'boosted'])
+        # A blank row inside the data and a total row of another type
+        sheet.append([])
+        sheet.append(['Total', None, 15, 22.5])
+    if empty_sheet:
+        workbook.create_sheet('Empty')
+    workbook.save(path)
+
+
+@pytest.fixture
+def rawdata(tmp_path, monkeypatch):
+    monkeypatch.setattr(raw_data_loader, 'base_path', str(tmp_path))
+    _write_workbook(tmp_path / 'First.xlsx', ['Post Performance Summary', 'Engagement Reach by Media Type'])
+    _write_workbook(tmp_path / 'Second.xlsx', ['Media Type'])
+    # Excel's lock files are not workbooks
+    (tmp_path / '~$First.xlsx').write_bytes(b'')
+    return ['First.xlsx', 'Second.xlsx']
+
+
+def test_streaming_reader_matches_read_excel(rawdata):
+    for path in rawdata:
+        expected, actual = _load_raw_data_read_excel(path), load_raw_data(path)
+        assert list(actual) == list(expected)
+        for sheet_name, info in expected.items():
+            assert {**actual[sheet_name], 'data': None} == {**info, 'data': None}
+            pd.testing.assert_frame_equal(actual[sheet_name]['data'], info['data'], obj=sheet_name)
+
+def test_parallel_load_matches_sequential(rawdata):
+    loaded = load_workbooks(workers=3)
+    assert list(loaded) == rawdata
+    for path in rawdata:
+        expected = load_raw_data(path)
+        assert list(loaded[path]) == list(expected)
+        for sheet_name, info in expected.items():
+            pd.testing.assert_frame_equal(loaded[path][sheet_name]['data'], info['data'])
+
+
+def test_empty_sheet(tmp_path, monkeypatch):
+    monkeypatch.setattr(raw_data_loader, 'base_path', str(tmp_path))
+    _write_workbook(tmp_path / 'Empty.xlsx', ['Media Type'], empty_sheet=True)
+    sheets = load_raw_data('Empty.xlsx')
+    assert sheets['Empty']['data'].empty
+    assert sheets['Empty']['time_range'] == (None, None)
+    assert len(sheets['Media Type']['data']) == 7
@@ -0,0 +1,56 @@
+import dask
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from retail_aggregations import AGGREGATIONS, PRODUCT_RANKINGS, compute_aggregations, verified_top_products
+
+
+def test_results_match_pandas(prepared_lines):
+    lines = prepared_lines
+    results = compute_aggregations(dd.from_pandas(lines, npartitions=5), progress=False)
+    assert set(results) == set(AGGREGATIONS)
+
+    assert np.isclose(results['total_sales'], lines['EXTENSION_AMOUNT'].sum())
+    assert results['total_transactions'] == lines['SLIP_NO'].nunique()
+    assert results['total_items'] == lines['ITEM_ID'].nunique()
+    assert results['return_lines'] == lines['IS_RETURN'].sum()
+    pd.testing.assert_series_equal(results['daily_sales'].sort_index(),
+                                   lines.groupby('SALE_DATE')['EXTENSION_AMOUNT'].sum(), check_names=False)
+    pd.testing.assert_series_equal(results['command_sales'].sort_index(),
+                                   lines.groupby('COMMAND_NAME', observed=True)['EXTENSION_AMOUNT'].sum(),
+                                   check_names=False, check_categorical=False)
+    expected = lines.groupby(['SITE_ID', 'SITE_NAME'], observed=True)['IS_RETURN'].agg(['sum', 'count'])
+    stores = results['store_sales'].sort_index()
+    assert stores['RETURN_LINES'].tolist() == expected['sum'].tolist()
+    assert stores['LINES'].tolist() == expected['count'].tolist()
+
+
+def test_data_is_read_once(prepared_lines):
+    lines = prepared_lines
+    reads = []
+
+    def read_part(part):
+        reads.append(part)
+        return lines.iloc[part::4].sort_index()
+
+    df = dd.from_delayed([dask.delayed(read_part)(part) for part in range(4)], meta=lines.head(0))
+    with dask.config.set(scheduler='sync'):
+        compute_aggregations(df, progress=False)
+    assert sorted(reads) == [0, 1, 2, 3]
+
+
+def test_best_sellers_come_from_the_verification_pass(prepared_lines, tmp_path, monkeypatch):
+    # No item lookup table: descriptions fall back to the ITEM_ID
+    monkeypatch.chdir(tmp_path)
+    lines = prepared_lines
+    df = dd.from_pandas(lines, npartitions=5)
+    candidates = [summary for summary, _ in PRODUCT_RANKINGS.values()]
+    rankings, _ = verified_top_products(df, compute_aggregations(df, candidates, progress=False), 10,
+                                        best_sellers=50)
+
+    expected = lines.groupby('ITEM_ID').agg(EXTENSION_AMOUNT=('EXTENSION_AMOUNT', 'sum'),
+                                            RETURN_LINES=('IS_RETURN', 'sum')).nlargest(50, 'EXTENSION_AMOUNT')
+    best_sellers = rankings['best_seller_totals']
+    assert best_sellers['ITEM_ID'].tolist() == expected.index.tolist()
+    assert best_sellers['RETURN_LINES'].tolist() == expected['RETURN_LINES'].tolist()
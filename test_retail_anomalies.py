@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from retail_anomalies import detect_anomalies, flagged_days, site_daily_matrix
+
+
+def _cells(days=70, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-10-01', periods=days)
+    frames = []
+    for site in (1, 2):
+        # Weekend sales run at twice the weekday level
+        level = np.where(dates.dayofweek >= 5, 2000.0, 1000.0)
+        frames.append(pd.DataFrame({
+            'SITE_ID': site,
+            'SITE_NAME': f'STORE {site}',
+            'SALE_DATE': dates,
+            'EXTENSION_AMOUNT': level * rng.normal(1, 0.02, days),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_outlier_day_is_flagged():
+    cells = _cells()
+    spike = (cells['SITE_ID'] == 2) & (cells['SALE_DATE'] == '2024-11-20')
+    cells.loc[spike, 'EXTENSION_AMOUNT'] *= 3
+
+    flagged = flagged_days(detect_anomalies(cells))
+    assert (flagged['SITE_ID'].iloc[0], flagged['SALE_DATE'].iloc[0]) == (2, pd.Timestamp('2024-11-20'))
+
+
+def test_weekends_are_not_flagged_against_weekdays():
+    scores = detect_anomalies(_cells())
+    weekends = scores['SALE_DATE'].dt.dayofweek >= 5
+    assert scores.loc[weekends, 'Z_SCORE'].abs().max() < 3
+
+
+def test_days_outside_a_store_span_are_not_scored():
+    cells = _cells()
+    cells = cells[(cells['SITE_ID'] == 1) | (cells['SALE_DATE'] >= '2024-11-01')]
+    sites, days, sales = site_daily_matrix(cells)
+    assert np.isnan(sales[1, :31]).all() and not np.isnan(sales[1, 31:]).any()
+
+
+def test_empty_cells():
+    scores = detect_anomalies(_cells().head(0))
+    assert scores.empty
+    assert flagged_days(scores).empty
@@ -0,0 +1,66 @@
+import itertools
+from collections import Counter
+
+import dask
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from retail_basket import affinity_rules, cooccurrence_counts
+
+
+def _lines(receipts=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for slip in range(receipts):
+        store_format = 'MAIN STORE' if slip % 3 else 'MARINE MART'
+        items = rng.choice(12, rng.integers(1, 5), replace=False)
+        if rng.random() < 0.3:
+            # Items 100 and 101 are usually bought together
+            items = np.append(items, [100, 101])
+        for item in items:
+            rows.append((store_format, slip, int(item), 'Y' if rng.random() < 0.05 else 'N'))
+    lines = pd.DataFrame(rows, columns=['STORE_FORMAT', 'SLIP_NO', 'ITEM_ID', 'RETURN_IND'])
+    # read_retail_data() loads STORE_FORMAT with the shared dictionary
+    lines['STORE_FORMAT'] = lines['STORE_FORMAT'].astype(pd.CategoricalDtype(['MAIN STORE', 'MARINE MART']))
+    # Lines of a receipt end up in different partitions before the shuffle
+    return lines.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _brute_force(lines):
+    sold = lines[lines['RETURN_IND'] != 'Y'].drop_duplicates(['SLIP_NO', 'ITEM_ID'])
+    counts = Counter()
+    for (store_format, _), items in sold.groupby(['STORE_FORMAT', 'SLIP_NO'], observed=True)['ITEM_ID']:
+        for first, second in itertools.combinations_with_replacement(sorted(items), 2):
+            counts[store_format, first, second] += 1
+    return counts
+
+
+def test_counts_match_brute_force():
+    lines = _lines()
+    pairs, baskets = cooccurrence_counts(dd.from_pandas(lines, npartitions=4), min_baskets=1)
+    pairs, baskets = dask.compute(pairs, baskets)
+
+    counted = {(row.STORE_FORMAT, row.ITEM_A, row.ITEM_B): row.BASKETS for row in pairs.itertuples()}
+    assert counted == dict(_brute_force(lines))
+    sold = lines[lines['RETURN_IND'] != 'Y']
+    assert baskets.to_dict() == sold.groupby('STORE_FORMAT', observed=True)['SLIP_NO'].nunique().to_dict()
+
+
+def test_rare_pairs_are_dropped_but_item_counts_kept():
+    lines = _lines()
+    pairs, _ = dask.compute(*cooccurrence_counts(dd.from_pandas(lines, npartitions=4), min_baskets=200))
+    rules = pairs[pairs['ITEM_A'] != pairs['ITEM_B']]
+    assert (rules['BASKETS'] >= 200).all()
+    items = {key for key in _brute_force(lines) if key[1] == key[2]}
+    assert (pairs['ITEM_A'] == pairs['ITEM_B']).sum() == len(items)
+
+
+def test_bundled_items_have_the_highest_lift():
+    lines = _lines()
+    pairs, baskets = dask.compute(*cooccurrence_counts(dd.from_pandas(lines, npartitions=4), min_baskets=10))
+    lookup = pd.Series({item: f'ITEM {item}' for item in lines['ITEM_ID'].unique()})
+    rules = affinity_rules(pairs, baskets, top_n=5, lookup=lookup)
+    for _, top in rules.groupby('STORE_FORMAT', observed=True):
+        assert (top['ITEM_A'].iloc[0], top['ITEM_B'].iloc[0]) == (100, 101)
+        assert top['LIFT'].iloc[0] > 2
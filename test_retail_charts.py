@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+import pytest
+
+import retail_charts
+from retail_charts import period_label, register_chart, render_charts
+
+
+@pytest.fixture
+def charts(monkeypatch):
+    monkeypatch.setattr(retail_charts, 'CHARTS', {})
+
+    @register_chart('sales.png', 'sales', figsize=(4, 3))
+    def sales(fig, tables):
+        tables['sales'].plot(ax=fig.gca())
+
+    @register_chart('returns.png', 'returns', figsize=(4, 3))
+    def returns(fig, tables):
+        tables['returns'].plot(ax=fig.gca())
+
+    return {'sales': pd.DataFrame({'VALUE': [1.0, 2.0, 3.0]}), 'returns': pd.DataFrame({'VALUE': [0.1, 0.2]})}
+
+
+def test_only_changed_charts_are_redrawn(charts, tmp_path):
+    rendered, skipped = render_charts(charts, tmp_path, workers=1)
+    assert sorted(rendered) == ['returns.png', 'sales.png'] and not skipped
+
+    assert render_charts(charts, tmp_path, workers=1) == ([], ['sales.png', 'returns.png'])
+
+    charts['sales'] = pd.DataFrame({'VALUE': [1.0, 2.0, 4.0]})
+    assert render_charts(charts, tmp_path, workers=1) == (['sales.png'], ['returns.png'])
+
+    os.remove(tmp_path / 'returns.png')
+    assert render_charts(charts, tmp_path, workers=1) == (['returns.png'], ['sales.png'])
+
+    rendered, _ = render_charts(charts, tmp_path, workers=1, force=True)
+    assert sorted(rendered) == ['returns.png', 'sales.png']
+
+
+def test_period_label():
+    assert period_label(['2024-12-01', '2025-01-31']) == 'Dec 2024 - Jan 2025'
+    assert period_label(['2024-12-01', '2024-12-31']) == 'Dec 2024'
+    assert period_label([]) == 'no sales'
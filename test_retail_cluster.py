@@ -0,0 +1,25 @@
+import argparse
+
+import dask.array as da
+
+from retail_cluster import add_cluster_arguments, dask_cluster
+
+
+def test_cluster_runs_computations_and_uses_the_spill_dir(tmp_path):
+    spill_dir = tmp_path / 'spill'
+    with dask_cluster(workers=1, threads_per_worker=1, memory_limit='1GB', spill_dir=str(spill_dir)) as client:
+        assert len(client.scheduler_info()['workers']) == 1
+        assert da.ones(1_000, chunks=100).sum().compute() == 1_000
+    assert spill_dir.is_dir()
+
+
+def test_report_defaults_to_none():
+    args = add_cluster_arguments(argparse.ArgumentParser()).parse_args([])
+    assert args.performance_report is None and not args.cluster
+
+
+def test_flags_are_hyphenated():
+    args = add_cluster_arguments(argparse.ArgumentParser()).parse_args(
+        ['--threads-per-worker', '2', '--memory-limit', '1GB', '--spill-dir', 'spill', '--performance-report', 'r.html'])
+    assert (args.threads_per_worker, args.memory_limit, args.spill_dir, args.performance_report) == (
+        2, '1GB', 'spill', 'r.html')
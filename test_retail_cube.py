@@ -0,0 +1,47 @@
+import itertools
+
+import dask.dataframe as dd
+import pandas as pd
+
+from retail_aggregations import compute_aggregations
+from retail_cube import finalize_cube, query_cube, rollup
+
+FILTERS = {
+    'start_date': [None, '2024-12-03'],
+    'end_date': [None, '2024-12-07'],
+    'store_format': [None, 'MARINE MART'],
+    'command': [None, 'YUMA'],
+    'price_status': [None, 'P'],
+    'include_returns': [True, False],
+}
+
+
+def _mask_lines(lines, start_date=None, end_date=None, store_format=None, command=None,
+                price_status=None, include_returns=True):
+    mask = pd.Series(True, index=lines.index)
+    if start_date is not None:
+        mask &= lines['SALE_DATE'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= lines['SALE_DATE'] <= pd.Timestamp(end_date)
+    for column, value in (('STORE_FORMAT', store_format), ('COMMAND_NAME', command), ('PRICE_STATUS', price_status)):
+        if value is not None:
+            mask &= lines[column] == value
+    if not include_returns:
+        mask &= ~lines['IS_RETURN']
+    return lines[mask]
+
+
+def test_rollups_match_filtered_lines(prepared_lines):
+    lines = prepared_lines
+    df = dd.from_pandas(lines, npartitions=4)
+    cube = finalize_cube(compute_aggregations(df, ['cube'], progress=False)['cube'])
+
+    for values in itertools.product(*FILTERS.values()):
+        filters = dict(zip(FILTERS, values))
+        cells = query_cube(cube, **filters)
+        selected = _mask_lines(lines, **filters)
+        assert cells['LINES'].sum() == len(selected), filters
+        by_site = rollup(cells, 'SITE_ID').set_index('SITE_ID')['EXTENSION_AMOUNT']
+        expected = selected.groupby('SITE_ID')['EXTENSION_AMOUNT'].sum()
+        pd.testing.assert_series_equal(by_site, expected, check_names=False)
+
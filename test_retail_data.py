@@ -0,0 +1,134 @@
+import os
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pytest
+
+import retail_data
+from retail_data import _parse_dates, build_parquet_dataset, dataset_days, parse_datetimes, read_retail_data
+
+
+def _dates(rows=4000):
+    return pd.DataFrame({
+        'SALE_DATE': [f'12/{day % 28 + 1:02d}/2024' for day in range(rows)],
+        'SALE_DATE_TIME': [f'12/{day % 28 + 1:02d}/2024 {day % 24:02d}:15:00' for day in range(rows)],
+    })
+
+
+def test_format_is_detected_once_per_column(monkeypatch):
+    calls = []
+    detect = retail_data.detect_datetime_format
+    monkeypatch.setattr(retail_data, 'detect_datetime_format', lambda values: calls.append(1) or detect(values))
+
+    parsed = _parse_dates(dd.from_pandas(_dates(), npartitions=8)).compute()
+    assert len(calls) == 2
+    assert parsed['SALE_DATE'].iloc[0] == pd.Timestamp('2024-12-01')
+    assert parsed['SALE_DATE_TIME'].iloc[1] == pd.Timestamp('2024-12-02 01:15')
+    assert parsed.notna().all().all()
+
+
+def test_format_is_detected_once_per_source(tmp_path, monkeypatch, retail_extract):
+    monkeypatch.chdir(tmp_path)
+    retail_extract(pd.date_range('2024-12-01', periods=8), seed=8).to_csv('extract.csv', index=False)
+    calls = []
+    detect = retail_data.detect_datetime_format
+    monkeypatch.setattr(retail_data, 'detect_datetime_format', lambda values: calls.append(1) or detect(values))
+
+    # Small blocks split the extract into many CSV batches
+    build_parquet_dataset('extract.csv', block_size=4096)
+    assert len(calls) == 2
+    assert len(dataset_days()) == 8
+
+
+def test_parse_datetimes_maps_unparseable_values_to_nat():
+    values = pd.Series(['2024-12-01', 'not a date', None, '2024-12-01'])
+    parsed = parse_datetimes(values)
+    assert parsed.isna().tolist() == [False, True, True, False]
+    assert parsed.iloc[3] == pd.Timestamp('2024-12-01')
+
+
+def test_dataset_reads_match_the_csv(tmp_path, monkeypatch, retail_extract):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(retail_data.csv_path))
+    extract = retail_extract(pd.date_range('2024-11-29', periods=5), seed=3)
+    extract.to_csv(retail_data.csv_path, index=False)
+
+    assert build_parquet_dataset() > 0
+    assert dataset_days() == {f'2024-{day}' for day in ['11-29', '11-30', '12-01', '12-02', '12-03']}
+    assert os.path.isdir(os.path.join(retail_data.dataset_path, 'SALE_MONTH=2024-12', 'SALE_DAY=2024-12-01',
+                                      'COMMAND_NAME=YUMA'))
+
+    rows = read_retail_data(columns=['SLIP_NO', 'LINE', 'EXTENSION_AMOUNT']).compute()
+    assert sorted(zip(rows['SLIP_NO'], rows['LINE'])) == sorted(zip(extract['SLIP_NO'], extract['LINE']))
+    assert np.isclose(rows['EXTENSION_AMOUNT'].sum(), extract['EXTENSION_AMOUNT'].sum())
+
+
+def test_string_columns_share_the_persisted_dictionaries(tmp_path, monkeypatch, retail_extract):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(retail_data.csv_path))
+    retail_extract(pd.date_range('2024-12-01', periods=3), seed=4).to_csv(retail_data.csv_path, index=False)
+    build_parquet_dataset()
+
+    df = read_retail_data(columns=['COMMAND_NAME', 'STORE_FORMAT', 'ITEM_ID'], start_date='2024-12-03')
+    dictionaries = retail_data.load_dictionaries()
+    assert list(df['STORE_FORMAT'].dtype.categories) == dictionaries['STORE_FORMAT'] == ['MAIN STORE', 'MARINE MART']
+    # Every partition uses the same codes, whichever values it holds
+    for part in df.partitions:
+        assert list(part.compute()['COMMAND_NAME'].dtype.categories) == ['LEJEUNE', 'YUMA']
+    assert retail_data.load_item_lookup().loc[1] == 'ITEM'
+
+
+def test_scoped_reads_match_the_csv_fallback(tmp_path, monkeypatch, retail_extract):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(retail_data.csv_path))
+    retail_extract(pd.date_range('2024-12-01', periods=6), seed=5).to_csv(retail_data.csv_path, index=False)
+    scope = dict(start_date='2024-12-02', end_date='2024-12-04', commands=['YUMA'], site_ids=[101])
+    columns = ['SALE_DATE', 'SLIP_NO', 'LINE', 'SITE_ID']
+
+    def keys(df):
+        return sorted(zip(df['SLIP_NO'], df['LINE']))
+
+    from_csv = read_retail_data(columns=columns + ['COMMAND_NAME'], **scope).compute()
+    build_parquet_dataset()
+    from_dataset = read_retail_data(columns=columns, **scope).compute()
+    assert keys(from_dataset) == keys(from_csv)
+    assert len(from_csv) and set(from_csv['SITE_ID']) == {101}
+
+
+def test_dictionaries_are_rebuilt_when_the_data_changes(tmp_path, monkeypatch, retail_extract):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(retail_data.csv_path))
+    extract = retail_extract(pd.date_range('2024-12-01', periods=2), seed=6)
+    extract.to_csv(retail_data.csv_path, index=False)
+    assert retail_data.load_dictionaries()['COMMAND_NAME'] == ['LEJEUNE', 'YUMA']
+
+    # A new command shows up in a replaced extract: its rows keep their value
+    extract.loc[extract['SITE_ID'] == 101, 'COMMAND_NAME'] = 'OKINAWA'
+    extract.to_csv(retail_data.csv_path, index=False)
+    os.utime(retail_data.csv_path, ns=(0, 0))
+    commands = read_retail_data(columns=['COMMAND_NAME']).compute()['COMMAND_NAME']
+    assert commands.notna().all()
+    assert set(commands) == {'LEJEUNE', 'OKINAWA'}
+
+
+def test_unknown_categories_are_refused():
+    df = dd.from_pandas(pd.DataFrame({'COMMAND_NAME': ['YUMA', 'OKINAWA', None]}), npartitions=1)
+    df = retail_data.apply_dictionaries(df, {'COMMAND_NAME': ['LEJEUNE', 'YUMA']})
+    assert list(df['COMMAND_NAME'].dtype.categories) == ['LEJEUNE', 'YUMA']
+    with pytest.raises(ValueError, match='OKINAWA'):
+        df.compute()
+
+
+def test_dictionaries_live_in_a_custom_dataset(tmp_path, monkeypatch, retail_extract):
+    monkeypatch.chdir(tmp_path)
+    retail_extract(pd.date_range('2024-12-01', periods=2), seed=7).to_csv('extract.csv', index=False)
+    build_parquet_dataset('extract.csv', 'custom')
+    assert os.path.exists('custom' + retail_data.DICTIONARY_SUFFIX)
+    assert not os.path.exists(retail_data.dictionary_path)
+    assert not os.path.exists(retail_data.item_lookup_path)
+
+    df = read_retail_data(columns=['COMMAND_NAME', 'ITEM_ID'], dataset_dir='custom')
+    assert list(df['COMMAND_NAME'].dtype.categories) == ['LEJEUNE', 'YUMA']
+    assert df['COMMAND_NAME'].compute().notna().all()
+    assert retail_data.load_item_lookup('custom').loc[1] == 'ITEM'
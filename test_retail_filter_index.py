@@ -0,0 +1,41 @@
+import datetime
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from retail_filter_index import build_filter_index, mask_rows, select_rows
+
+
+def _rows(rows=5_003, seed=0):
+    rng = np.random.default_rng(seed)
+    sale_date = pd.Series(pd.Timestamp('2024-12-01') + pd.to_timedelta(rng.integers(0, 31, rows), unit='D'))
+    sale_date[rng.random(rows) < 0.01] = pd.NaT
+    return pd.DataFrame({
+        'ROW': np.arange(rows),
+        'SALE_DATE': sale_date,
+        'STORE_FORMAT': pd.Categorical(rng.choice(['MAIN STORE', 'MARINE MART', 'SPECIALTY'], rows)),
+        'COMMAND_NAME': pd.Categorical(rng.choice(['YUMA', 'LEJEUNE', 'PENDLETON'], rows)),
+        'PRICE_STATUS': pd.Categorical(rng.choice(['R', 'P', 'C'], rows)),
+        'IS_RETURN': rng.random(rows) < 0.1,
+    })
+
+
+def test_every_filter_combination_matches_boolean_masks():
+    df = _rows()
+    index = build_filter_index(df)
+    ranges = [(datetime.date(2024, 12, 1), datetime.date(2024, 12, 31)),
+              (datetime.date(2024, 12, 3), datetime.date(2024, 12, 3)),
+              (datetime.date(2024, 12, 10), datetime.date(2024, 12, 17))]
+    for (start, end), store_format, command, price_status, include_returns in itertools.product(
+            ranges, [None, 'MARINE MART'], [None, 'YUMA'], [None, 'P'], [True, False]):
+        filters = dict(start_date=start, end_date=end, store_format=store_format, command=command,
+                       price_status=price_status, include_returns=include_returns)
+        selected = select_rows(index, **filters)
+        expected = mask_rows(df, **filters)
+        assert sorted(selected['ROW']) == sorted(expected['ROW']), filters
+
+
+def test_unknown_value_selects_nothing():
+    index = build_filter_index(_rows())
+    assert select_rows(index, command='OKINAWA').empty
@@ -0,0 +1,79 @@
+import os
+
+import dask.dataframe as dd
+import pandas as pd
+import pytest
+
+import retail_incremental
+from retail_data import append_to_dataset, build_parquet_dataset
+from retail_incremental import TABLE_KEYS, load_watermark, update_aggregates
+
+
+def _sorted(table, name):
+    keys = TABLE_KEYS[name]
+    return table.sort_values(keys).reset_index(drop=True)[sorted(table.columns)]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('retail_analysis_results')
+    return tmp_path
+
+
+def test_incremental_update_matches_full_recompute(workdir, retail_extract):
+    days = pd.date_range('2024-12-01', periods=6)
+    retail_extract(days[:4], seed=1).to_csv('first.csv', index=False)
+    retail_extract(days[3:], seed=2).to_csv('second.csv', index=False)
+
+    build_parquet_dataset('first.csv')
+    update_aggregates()
+    # The overlapping day is skipped when appending, so the data only grows by two days
+    assert append_to_dataset('second.csv') == ['2024-12-05', '2024-12-06']
+    tables, totals, watermark = update_aggregates()
+    assert watermark['days_added'] == 2
+    assert watermark['last_sale_date'] == '2024-12-06'
+
+    full_tables, full_totals, _ = update_aggregates(full_rebuild=True)
+    for name in TABLE_KEYS:
+        pd.testing.assert_frame_equal(_sorted(tables[name], name), _sorted(full_tables[name], name),
+                                      check_dtype=False)
+    assert totals.keys() == full_totals.keys()
+    for name, value in full_totals.items():
+        assert totals[name] == pytest.approx(value) if isinstance(value, float) else totals[name] == value
+
+
+def test_backfilled_days_are_aggregated(workdir, retail_extract):
+    days = pd.date_range('2024-12-01', periods=6)
+    retail_extract(days[[0, 1, 4, 5]], seed=1).to_csv('first.csv', index=False)
+    retail_extract(days[2:4], seed=2).to_csv('late.csv', index=False)
+
+    build_parquet_dataset('first.csv')
+    update_aggregates()
+    # Days older than the latest aggregated one arrive late
+    assert append_to_dataset('late.csv') == ['2024-12-03', '2024-12-04']
+    tables, totals, watermark = update_aggregates()
+    assert watermark['days_added'] == 2
+    assert watermark['ingested_days'] == [day.strftime('%Y-%m-%d') for day in days]
+    # Nothing is left to aggregate afterwards
+    assert update_aggregates()[1] == totals
+
+    full_tables, full_totals, _ = update_aggregates(full_rebuild=True)
+    for name in TABLE_KEYS:
+        pd.testing.assert_frame_equal(_sorted(tables[name], name), _sorted(full_tables[name], name),
+                                      check_dtype=False)
+    assert totals['total_sales'] == pytest.approx(full_totals['total_sales'])
+
+
+def test_first_run_on_empty_data_leaves_no_watermark(workdir, retail_extract, monkeypatch):
+    retail_extract(pd.date_range('2024-12-01', periods=1), seed=1).to_csv('first.csv', index=False)
+    build_parquet_dataset('first.csv')
+    df = retail_incremental.read_retail_data(columns=retail_incremental.ANALYSIS_COLUMNS)
+    monkeypatch.setattr(retail_incremental, 'read_retail_data',
+                        lambda **kwargs: dd.from_pandas(df.head(0, npartitions=-1), npartitions=1))
+
+    tables, totals, watermark = update_aggregates()
+    assert watermark is None
+    assert load_watermark() is None
+    assert tables['daily_sales'].empty
+    assert totals['total_sales'] == 0
@@ -0,0 +1,17 @@
+from retail_metrics import metrics_fingerprint
+
+
+def test_fingerprint_changes_with_every_run_setting():
+    fingerprints = {
+        metrics_fingerprint('source'),
+        metrics_fingerprint('other source'),
+        metrics_fingerprint('source', scope='COMMAND_NAME in [A]'),
+        metrics_fingerprint('source', distinct_mode='approximate'),
+        metrics_fingerprint('source', incremental=True),
+        metrics_fingerprint('source', distinct_mode='approximate', incremental=True),
+    }
+    assert len(fingerprints) == 6
+
+
+def test_fingerprint_is_stable():
+    assert metrics_fingerprint('source', '', 'exact', False) == metrics_fingerprint('source')
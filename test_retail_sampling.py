@@ -0,0 +1,60 @@
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from retail_sampling import estimate_ratio, estimate_total, stratified_sample
+
+
+def _lines(transactions=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    slips = pd.DataFrame({
+        'SLIP_NO': np.arange(transactions),
+        'SITE_ID': rng.choice([1, 2, 3, 4], transactions, p=[0.5, 0.3, 0.19, 0.01]),
+        'SALE_DATE': pd.Timestamp('2024-12-01') + pd.to_timedelta(rng.integers(0, 5, transactions), unit='D'),
+    })
+    lines = slips.loc[slips.index.repeat(rng.integers(1, 6, transactions))].reset_index(drop=True)
+    lines['EXTENSION_AMOUNT'] = rng.gamma(2.0, 10.0, len(lines))
+    lines['IS_RETURN'] = rng.random(len(lines)) < 0.05
+    return lines
+
+
+def test_sample_is_reproducible_and_keeps_whole_transactions():
+    lines = _lines()
+    ddf = dd.from_pandas(lines, npartitions=4)
+    first = stratified_sample(ddf, frac=0.1, seed=7)
+    assert first.equals(stratified_sample(ddf, frac=0.1, seed=7))
+
+    sampled_lines = first.groupby('SLIP_NO').size()
+    all_lines = lines.groupby('SLIP_NO').size()
+    assert sampled_lines.equals(all_lines.loc[sampled_lines.index])
+
+
+def test_small_strata_keep_their_minimum():
+    sample = stratified_sample(dd.from_pandas(_lines(), npartitions=4), frac=0.01, seed=1, min_transactions=20)
+    sampled = sample.groupby(['SITE_ID', 'SALE_DATE'])['SLIP_NO'].nunique()
+    population = sample.groupby(['SITE_ID', 'SALE_DATE'])['STRATUM_POPULATION'].first()
+    assert (sampled >= np.minimum(population, 10)).all()
+
+
+def test_census_has_exact_totals_and_no_margin():
+    lines = _lines(2_000)
+    sample = stratified_sample(dd.from_pandas(lines, npartitions=2), frac=1.0)
+    total = estimate_total(sample, 'EXTENSION_AMOUNT')
+    assert np.isclose(total['ESTIMATE'], lines['EXTENSION_AMOUNT'].sum())
+    assert total['MARGIN'] == 0
+
+
+def test_intervals_cover_the_true_totals():
+    lines = _lines()
+    ddf = dd.from_pandas(lines, npartitions=4)
+    true_total = lines['EXTENSION_AMOUNT'].sum()
+    true_rate = lines['IS_RETURN'].sum() / len(lines)
+    covered_totals = covered_rates = 0
+    for seed in range(20):
+        sample = stratified_sample(ddf, frac=0.1, seed=seed)
+        total = estimate_total(sample, 'EXTENSION_AMOUNT')
+        rate = estimate_ratio(sample, 'IS_RETURN', 'LINES')
+        covered_totals += total['CI_LOW'] <= true_total <= total['CI_HIGH']
+        covered_rates += rate['CI_LOW'] <= true_rate <= rate['CI_HIGH']
+    # 95% intervals: missing more than 4 of 20 is very unlikely
+    assert covered_totals >= 16 and covered_rates >= 16
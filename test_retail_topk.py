@@ -0,0 +1,44 @@
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from retail_topk import heavy_hitter_candidates, merge_candidates, verified_top_k
+
+
+def _sales(rows=20_000, items=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Zipf-like item popularity with a share of negative return lines
+    item_ids = np.minimum(rng.zipf(1.3, rows), items)
+    amounts = rng.uniform(1, 50, rows) * np.where(rng.random(rows) < 0.05, -1, 1)
+    return pd.DataFrame({'ITEM_ID': item_ids, 'EXTENSION_AMOUNT': amounts})
+
+
+def _candidate_top_k(pdf, k, capacity, npartitions=8):
+    df = dd.from_pandas(pdf, npartitions=npartitions)
+    candidates, bound = merge_candidates(heavy_hitter_candidates(df, 'ITEM_ID', 'EXTENSION_AMOUNT', capacity).compute())
+    totals = pdf[pdf['ITEM_ID'].isin(candidates)].groupby('ITEM_ID', as_index=False)['EXTENSION_AMOUNT'].sum()
+    return verified_top_k(totals, 'EXTENSION_AMOUNT', k, bound), len(candidates)
+
+
+def test_verified_ranking_matches_full_groupby():
+    pdf = _sales()
+    top, candidates = _candidate_top_k(pdf, k=10, capacity=50)
+    assert top is not None
+    assert candidates <= 8 * 50
+    exact = pdf.groupby('ITEM_ID', as_index=False)['EXTENSION_AMOUNT'].sum().nlargest(10, 'EXTENSION_AMOUNT')
+    assert top['ITEM_ID'].tolist() == exact['ITEM_ID'].tolist()
+    np.testing.assert_allclose(top['EXTENSION_AMOUNT'], exact['EXTENSION_AMOUNT'])
+
+
+def test_uncertified_ranking_is_refused():
+    # Uniform weights: a dropped item could outrank any candidate
+    pdf = pd.DataFrame({'ITEM_ID': np.arange(1_000) % 500, 'EXTENSION_AMOUNT': 1.0})
+    top, _ = _candidate_top_k(pdf, k=10, capacity=5)
+    assert top is None
+
+
+def test_no_bound_when_every_key_fits():
+    pdf = _sales(rows=2_000, items=30)
+    top, _ = _candidate_top_k(pdf, k=5, capacity=100)
+    exact = pdf.groupby('ITEM_ID', as_index=False)['EXTENSION_AMOUNT'].sum().nlargest(5, 'EXTENSION_AMOUNT')
+    assert top['ITEM_ID'].tolist() == exact['ITEM_ID'].tolist()
@@ -0,0 +1,54 @@
+import os
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from retail_aggregations import compute_aggregations
+from retail_transactions import (finalize_transactions, load_transactions, save_transactions, transaction_days,
+                                 transaction_distribution)
+
+
+def test_one_row_per_receipt_matches_line_totals(prepared_lines):
+    lines = prepared_lines
+    # Lines of a receipt are spread over several partitions
+    shuffled = lines.sample(frac=1, random_state=0)
+    computed = compute_aggregations(dd.from_pandas(shuffled, npartitions=6, sort=False),
+                                    ['transactions'], progress=False)['transactions']
+    transactions = finalize_transactions(computed).set_index('SLIP_NO').sort_index()
+
+    by_slip = lines.groupby('SLIP_NO')
+    assert transactions.index.equals(pd.Index(sorted(lines['SLIP_NO'].unique())))
+    assert transactions['LINES'].tolist() == by_slip.size().tolist()
+    assert transactions['RETURN_LINES'].tolist() == by_slip['IS_RETURN'].sum().tolist()
+    np.testing.assert_allclose(transactions['EXTENSION_AMOUNT'], by_slip['EXTENSION_AMOUNT'].sum())
+    assert (transactions['SITE_ID'] == by_slip['SITE_ID'].first()).all()
+    assert (transactions['HOUR'] == by_slip['HOUR'].min()).all()
+
+
+def test_distribution_per_group():
+    transactions = pd.DataFrame({'SITE_ID': [1, 1, 2], 'LINES': [1, 3, 2], 'QTY': [1.0, 4.0, 2.0],
+                                 'EXTENSION_AMOUNT': [5.0, 20.0, 9.0]})
+    overall = transaction_distribution(transactions)
+    assert overall.loc['LINES', 'mean'] == 2
+    per_site = transaction_distribution(transactions, by='SITE_ID')
+    assert per_site.loc[(1, 'EXTENSION_AMOUNT'), 'max'] == 20
+
+
+def test_appending_days_keeps_the_stored_partitions(prepared_lines, tmp_path):
+    lines = prepared_lines
+    transactions = finalize_transactions(
+        compute_aggregations(dd.from_pandas(lines, npartitions=4), ['transactions'], progress=False)['transactions'])
+    early = transactions['SALE_DATE'] < pd.Timestamp('2024-12-06')
+    path = str(tmp_path / 'transactions')
+
+    save_transactions(transactions[early], path)
+    stored = {os.path.join(root, name): os.stat(os.path.join(root, name)).st_mtime_ns
+              for root, _, names in os.walk(path) for name in names}
+    save_transactions(transactions[~early], path, append=True)
+
+    assert transaction_days(path) == set(transactions['SALE_DATE'].dt.strftime('%Y-%m-%d'))
+    assert all(os.stat(file).st_mtime_ns == mtime for file, mtime in stored.items())
+    loaded = load_transactions(path).sort_values('SLIP_NO', ignore_index=True)
+    pd.testing.assert_frame_equal(loaded, transactions.sort_values('SLIP_NO', ignore_index=True)[loaded.columns],
+                                  check_dtype=False)
@@ -0,0 +1,36 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+import workbook_cache
+from workbook_cache import read_entry, write_entry
+
+
+def _sheets():
+    mixed = pd.Series(['Sends', 12, 0.25, np.nan, datetime.datetime(2025, 1, 3, 9, 30), True, None],
+                      dtype=object)
+    data = pd.DataFrame({'Unnamed: 0': mixed, 'Label': list('abcdefg'), 'Value': np.arange(7.0)})
+    return {'Sends': {'dashboard_name': 'Email', 'widget_name': 'Sends',
+                      'time_range': ('2025-01-01', '2025-01-31'), 'data': data}}
+
+
+def test_mixed_columns_round_trip_without_pickle(tmp_path, monkeypatch):
+    monkeypatch.setattr(workbook_cache, 'cache_dir', str(tmp_path))
+    sheets = _sheets()
+    write_entry('abc', 'workbook.xlsx', sheets)
+
+    files = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert not [name for name in files if name.endswith('.pkl')]
+
+    cached = read_entry('abc')['Sends']
+    expected = sheets['Sends']['data']
+    pd.testing.assert_frame_equal(cached['data'], expected)
+    assert [type(value) for value in cached['data']['Unnamed: 0']] == [type(value) for value in expected['Unnamed: 0']]
+    assert cached['time_range'] == ('2025-01-01', '2025-01-31')
+
+
+def test_missing_entry(tmp_path, monkeypatch):
+    monkeypatch.setattr(workbook_cache, 'cache_dir', str(tmp_path))
+    assert read_entry('missing') is None